@@ -0,0 +1,56 @@
+import logging
+from telegram.constants import ParseMode
+from telegram.ext import Application, Defaults
+from telegram.request import HTTPXRequest
+from config import BOT_TOKEN, BOT_API_URL, POLLING_TIMEOUT, ASYNC_CONCURRENT_UPDATES, ASYNC_CONNECTION_POOL
+
+logger = logging.getLogger(__name__)
+
+class AsyncBotRunner:
+    """Бот на python-telegram-bot: все обновления в одном event loop
+    
+    Обновления обрабатываются конкурентно (до ASYNC_CONCURRENT_UPDATES
+    одновременно), без отдельного потока на каждое.
+    """
+    
+    def __init__(self):
+        builder = Application.builder().token(BOT_TOKEN)
+        if BOT_API_URL:
+            builder = builder.base_url(BOT_API_URL.rstrip('/') + '/bot')
+            logger.info("Bot API: %s", BOT_API_URL)
+        self.application = (
+            builder
+            .defaults(Defaults(parse_mode=ParseMode.HTML))
+            .concurrent_updates(ASYNC_CONCURRENT_UPDATES)
+            .request(HTTPXRequest(
+                connection_pool_size=ASYNC_CONNECTION_POOL,
+                connect_timeout=10.0,
+                read_timeout=10.0,
+            ))
+            .get_updates_request(HTTPXRequest(
+                connect_timeout=10.0,
+                read_timeout=POLLING_TIMEOUT + 10.0,
+            ))
+            .post_init(self._post_init)
+            .build()
+        )
+        logger.info("✅ Бот создан (asyncio)")
+    
+    async def _post_init(self, application):
+        me = await application.bot.get_me()
+        logger.info("🤖 Бот: @%s (ID: %s)", me.username, me.id)
+    
+    def start(self):
+        """Запуск long polling; возвращается после SIGINT/SIGTERM"""
+        logger.info("=" * 50)
+        logger.info("ЗАПУСК БОТА (asyncio)")
+        logger.info("Long polling timeout: %sс", POLLING_TIMEOUT)
+        logger.info("Одновременных обновлений: %s", ASYNC_CONCURRENT_UPDATES)
+        logger.info("=" * 50)
+        self.application.run_polling(timeout=POLLING_TIMEOUT, poll_interval=0.0)
+    
+    def stop(self):
+        """Остановка бота"""
+        if self.application.running:
+            logger.info("Остановка бота...")
+            self.application.stop_running()
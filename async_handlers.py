@@ -0,0 +1,113 @@
+import asyncio
+import logging
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import BadRequest
+from telegram.ext import CallbackQueryHandler, CommandHandler
+import data_manager
+import handlers
+from config import REVEAL_DELAY
+
+logger = logging.getLogger(__name__)
+
+# Асинхронные обёртки над командами из handlers.py для python-telegram-bot:
+# текст ответа строится теми же функциями, меняется только отправка.
+
+async def reply(update, text, reply_markup=None):
+    await update.effective_message.reply_text(text, do_quote=True, reply_markup=reply_markup)
+
+def keyboard(buttons):
+    """Кнопки [(подпись, callback_data), ...] одной строкой inline-клавиатуры"""
+    if not buttons:
+        return None
+    return InlineKeyboardMarkup([[InlineKeyboardButton(label, callback_data=data) for label, data in buttons]])
+
+async def start(update, context):
+    logger.debug("/start от %s", update.effective_user.id, extra={'chat_id': update.effective_chat.id})
+    await reply(update, handlers.HELP_TEXT)
+
+async def clown(update, context):
+    chat_id = str(update.effective_chat.id)
+    today = data_manager.chat_today(chat_id)
+    
+    logger.debug("🎪 /clown от %s", update.effective_user.id, extra={'chat_id': chat_id})
+    
+    if data_manager.get_last_used(chat_id) == today:
+        logger.debug("Уже выбирали сегодня", extra={'chat_id': chat_id})
+        await reply(update, handlers.today_stats_text(chat_id))
+        return
+    
+    # Выбор фиксируется до первого await, чтобы параллельный /clown его увидел
+    drawn = handlers.draw_winner(chat_id, today)
+    if drawn is None:
+        await reply(update, handlers.NO_MEMBERS_TEXT)
+        return
+    
+    pre_text, result_text = drawn
+    await reply(update, pre_text)
+    await asyncio.sleep(REVEAL_DELAY)
+    await context.bot.send_message(update.effective_chat.id, result_text)
+
+async def stats_cmd(update, context):
+    text, buttons = handlers.stats_reply(str(update.effective_chat.id), context.args)
+    await reply(update, text, keyboard(buttons))
+
+async def stats_page(update, context):
+    query = update.callback_query
+    await query.answer()
+    if query.message is None:
+        return
+    result = handlers.stats_callback(str(query.message.chat.id), query.data)
+    if result is None:
+        return
+    text, buttons = result
+    try:
+        await query.edit_message_text(text, reply_markup=keyboard(buttons))
+    except BadRequest as e:
+        # Повторное нажатие той же кнопки — текст уже такой
+        if 'not modified' not in str(e):
+            raise
+
+async def register(update, context):
+    await reply(update, handlers.register_user(str(update.effective_chat.id), update.effective_user))
+
+async def unregister(update, context):
+    await reply(update, handlers.unregister_user(str(update.effective_chat.id), update.effective_user.id))
+
+async def addmember(update, context):
+    text = handlers.add_member_by_name(str(update.effective_chat.id), context.args, update.effective_user)
+    await reply(update, text)
+
+async def removemember(update, context):
+    await reply(update, handlers.remove_member_by_name(str(update.effective_chat.id), context.args))
+
+async def listmembers(update, context):
+    await reply(update, handlers.list_members_text(str(update.effective_chat.id)))
+
+async def initmembers(update, context):
+    try:
+        admins = await context.bot.get_chat_administrators(update.effective_chat.id)
+        await reply(update, handlers.add_admins(str(update.effective_chat.id), admins))
+    except Exception as e:
+        logger.error("initmembers error: %s", e)
+        await reply(update, "❌ Бот должен быть администратором чата!")
+
+async def setmode(update, context):
+    await reply(update, handlers.set_mode(str(update.effective_chat.id), context.args))
+
+async def settimezone(update, context):
+    await reply(update, handlers.set_timezone(str(update.effective_chat.id), context.args))
+
+def register_async_handlers(application):
+    """Регистрирует команды в telegram.ext.Application"""
+    application.add_handler(CommandHandler(['start', 'help'], start))
+    application.add_handler(CommandHandler(['clown', 'pidor'], clown))
+    application.add_handler(CommandHandler(['clownstats', 'pidorstats'], stats_cmd))
+    application.add_handler(CallbackQueryHandler(stats_page, pattern=f'^{handlers.STATS_CALLBACK}:'))
+    application.add_handler(CommandHandler('register', register))
+    application.add_handler(CommandHandler('unregister', unregister))
+    application.add_handler(CommandHandler('addmember', addmember))
+    application.add_handler(CommandHandler('removemember', removemember))
+    application.add_handler(CommandHandler('listmembers', listmembers))
+    application.add_handler(CommandHandler('initmembers', initmembers))
+    application.add_handler(CommandHandler('setmode', setmode))
+    application.add_handler(CommandHandler('settimezone', settimezone))
@@ -0,0 +1,23 @@
+import json
+import os
+import time
+from metrics import STORAGE_SECONDS, STORAGE_BYTES
+
+def write_json(path, data, label, indent=2):
+    """Пишет data в path целиком или никак, возвращает размер в байтах
+    
+    Сначала во временный файл с fsync, потом os.replace(), чтобы
+    падение не оставило полфайла. label — метка файла в метриках
+    clown_storage_* (имя файла или общая метка вроде 'chats').
+    """
+    start = time.perf_counter()
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=indent)
+        f.flush()
+        os.fsync(f.fileno())
+        size = f.tell()
+    os.replace(tmp_path, path)
+    STORAGE_SECONDS.observe(time.perf_counter() - start, 'save', label)
+    STORAGE_BYTES.inc('save', label, amount=size)
+    return size
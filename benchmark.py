@@ -0,0 +1,308 @@
+"""Офлайн-бенчмарк обработчиков и data_manager на синтетических данных
+
+Строит N чатов × M участников × K записей статистики (и один большой
+чат на --big участников) с историей розыгрышей за --history дней во
+временном DATA_DIR, прогоняет все команды из handlers.register_handlers
+через FakeBot (запоминает отправки, в сеть не ходит) и печатает ops/s
+и задержки p50/p99 для каждой операции. По умолчанию — режим хранения
+chats, как у бота; в режимах chats и sqlite load_all_data меряется
+вместе с подгрузкой --hot-chats чатов, потому что сами чаты грузятся
+лениво.
+    
+    python benchmark.py --chats 1000 --members 50 --stats 20
+    python benchmark.py --storage sqlite --json bench.json
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+DAY = str(date.today())
+
+class FakeBot:
+    """Вместо telebot.TeleBot: хранит обработчики и записывает отправки"""
+    
+    def __init__(self):
+        self.handlers = {}
+        self.sent = []
+        self._lock = threading.Lock()
+    
+    def message_handler(self, commands=None, **kwargs):
+        def decorator(func):
+            for command in commands or ():
+                self.handlers[command] = func
+            return func
+        return decorator
+    
+    def callback_query_handler(self, func=None, **kwargs):
+        def decorator(handler):
+            self.handlers['callback_query'] = handler
+            return handler
+        return decorator
+    
+    def send_message(self, chat_id, text, **kwargs):
+        with self._lock:
+            self.sent.append((chat_id, text))
+    
+    def edit_message_text(self, text, chat_id, **kwargs):
+        self.send_message(chat_id, text)
+    
+    def answer_callback_query(self, callback_query_id, **kwargs):
+        pass
+    
+    def reply_to(self, message, text, **kwargs):
+        self.send_message(message.chat.id, text, **kwargs)
+    
+    def get_chat_administrators(self, chat_id):
+        return [
+            SimpleNamespace(user=SimpleNamespace(id=900 + i, username=f"admin{i}", first_name=f"Admin {i}", is_bot=False))
+            for i in range(3)
+        ]
+
+_message_ids = itertools.count(1)
+
+def make_message(chat_id, text, user_id=1, username='bench'):
+    user = SimpleNamespace(id=user_id, username=username, first_name='Bench', last_name=None, is_bot=False)
+    return SimpleNamespace(
+        message_id=next(_message_ids),
+        chat=SimpleNamespace(id=int(chat_id)),
+        from_user=user,
+        text=text,
+    )
+
+def make_callback(chat_id, data):
+    return SimpleNamespace(id=str(next(_message_ids)), data=data, message=make_message(chat_id, ''))
+
+BIG_CHAT = '-1009999999999'
+TIMEZONES = ('Europe/Moscow', 'Asia/Yekaterinburg', 'Europe/Berlin', 'America/New_York', 'off')
+
+def chat_ids(chats):
+    return [str(-1000000000000 - i) for i in range(chats)]
+
+def build_dataset(data_dir, chats, members, stats, big=0):
+    """Пишет общие JSON-файлы; режимы chats/sqlite перенесут их при загрузке"""
+    all_members, all_stats, used = {}, {}, {}
+    sizes = [(chat_id, members, stats) for chat_id in chat_ids(chats)]
+    if big:
+        # Запись в большой чат не должна стоить копии всего чата
+        sizes.append((BIG_CHAT, big, big))
+    for c, (chat_id, members, stats) in enumerate(sizes):
+        chat_members = []
+        for j in range(members):
+            chat_members.append({
+                'id': c * members + j + 10000,
+                'username': f"u{c}_{j}",
+                'name': f"User {j}",
+                'active': True,
+                'added_by': 'system',
+                'added_date': DAY,
+            })
+        all_members[chat_id] = chat_members
+        all_stats[chat_id] = {
+            m['username']: {'name': m['name'], 'username': m['username'], 'count': random.randint(1, 100)}
+            for m in chat_members[:stats]
+        }
+        # Половина чатов уже выбирала сегодня: /clown отдаст статистику
+        if c % 2:
+            used[chat_id] = DAY
+    files = {
+        'chat_members.json': all_members,
+        'clown_stats.json': all_stats,
+        'last_used.json': used,
+        'group_settings.json': {},
+    }
+    for name, data in files.items():
+        with open(os.path.join(data_dir, name), 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+
+def build_history(data_manager, ids, days):
+    """История розыгрышей за days дней до сегодня, чтобы /clownstats week|month|year было что считать"""
+    today = date.today()
+    for chat_id in ids:
+        members = data_manager.get_members_for_chat(chat_id)
+        if not members:
+            continue
+        for d in range(days, 0, -1):
+            winner = random.choice(members)
+            data_manager.record_draw(chat_id, str(today - timedelta(days=d)), winner)
+    data_manager.persist(force=True)
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def measure(name, func, args_list):
+    samples = []
+    start = time.perf_counter()
+    for args in args_list:
+        t0 = time.perf_counter()
+        func(*args)
+        samples.append(time.perf_counter() - t0)
+    total = time.perf_counter() - start
+    return {
+        'op': name,
+        'count': len(samples),
+        'ops_per_sec': len(samples) / total if total else 0.0,
+        'p50_ms': percentile(samples, 0.50) * 1000,
+        'p99_ms': percentile(samples, 0.99) * 1000,
+    }
+
+def run(args):
+    data_dir = tempfile.mkdtemp(prefix='clown-bench-')
+    # data_manager считает пути при импорте, поэтому окружение — до импорта
+    os.environ['DATA_DIR'] = data_dir
+    os.environ.setdefault('BOT_TOKEN', '123:benchmark')
+    import data_manager
+    import handlers
+    from outbox import Outbox
+    from timers import TimerQueue
+    
+    try:
+        build_dataset(data_dir, args.chats, args.members, args.stats, args.big)
+        data_manager.configure_storage(args.storage, hot_chats=args.hot_chats)
+        data_manager.load_all_data()
+        build_history(data_manager, chat_ids(args.chats), args.history)
+        
+        bot = FakeBot()
+        timers = TimerQueue()
+        timers.start()
+        # Лимиты Telegram здесь не нужны: меряем обработчики, а не отправку
+        outbox = Outbox(bot, global_rate=1e9, chat_rate=1e9, chat_burst=1e9)
+        outbox.start()
+        handlers.register_handlers(bot, timers, outbox)
+        h = bot.handlers
+        
+        ids = chat_ids(args.chats)
+        ops = min(args.ops, args.chats)
+        fresh = [c for c in ids if data_manager.get_last_used(c) != DAY][:ops]
+        drawn = [c for c in ids if data_manager.get_last_used(c) == DAY][:ops]
+        registered = [(random.choice(ids), 10 ** 9 + i) for i in range(args.ops)]
+        added = [(random.choice(ids), f"a{i}") for i in range(args.ops)]
+        
+        results = [
+            measure('/start', h['start'], [(make_message(random.choice(ids), '/start'),) for _ in range(args.ops)]),
+            measure('/help', h['help'], [(make_message(random.choice(ids), '/help'),) for _ in range(args.ops)]),
+            measure('/clown (розыгрыш)', h['clown'], [(make_message(c, '/clown'),) for c in fresh]),
+            measure('/clown (повтор)', h['clown'], [(make_message(c, '/clown'),) for c in drawn]),
+            measure('/register', h['register'], [
+                (make_message(c, '/register', user_id=uid, username=f"r{uid}"),) for c, uid in registered
+            ]),
+            measure('/unregister', h['unregister'], [
+                (make_message(c, '/unregister', user_id=uid),) for c, uid in registered
+            ]),
+            measure('/addmember', h['addmember'], [
+                (make_message(c, f"/addmember @{name} {name}"),) for c, name in added
+            ]),
+            measure('/removemember', h['removemember'], [
+                (make_message(c, f"/removemember @{name}"),) for c, name in added
+            ]),
+            measure('/initmembers', h['initmembers'], [(make_message(c, '/initmembers'),) for c in ids[:ops]]),
+            measure('/setmode', h['setmode'], [
+                (make_message(random.choice(ids), f"/setmode {random.choice(('clown', 'pidor'))}"),)
+                for _ in range(args.ops)
+            ]),
+            measure('/clownstats', h['clownstats'], [
+                (make_message(random.choice(ids), '/clownstats'),) for _ in range(args.ops)
+            ]),
+            measure('/clownstats (страница)', h['callback_query'], [
+                (make_callback(random.choice(ids), f"stats:{random.randrange(3)}"),) for _ in range(args.ops)
+            ]),
+            measure('/clownstats week|month|year', h['clownstats'], [
+                (make_message(random.choice(ids), f"/clownstats {random.choice(('week', 'month', 'year'))}"),)
+                for _ in range(args.ops)
+            ]),
+            measure('/listmembers', h['listmembers'], [
+                (make_message(random.choice(ids), '/listmembers'),) for _ in range(args.ops)
+            ]),
+            # Последней: часовой пояс меняет «сегодня» чата для /clown
+            measure('/settimezone', h['settimezone'], [
+                (make_message(random.choice(ids), f"/settimezone {random.choice(TIMEZONES)}"),)
+                for _ in range(args.ops)
+            ]),
+        ]
+        if args.big:
+            big_added = [f"b{i}" for i in range(args.ops)]
+            winners = [data_manager.find_member(BIG_CHAT, username=f"u{args.chats}_{j}")
+                       for j in range(min(args.ops, args.big))]
+            results += [
+                measure(f'/addmember ({args.big})', h['addmember'], [
+                    (make_message(BIG_CHAT, f"/addmember @{name} {name}"),) for name in big_added
+                ]),
+                measure(f'/removemember ({args.big})', h['removemember'], [
+                    (make_message(BIG_CHAT, f"/removemember @{name}"),) for name in big_added
+                ]),
+                measure(f'/clownstats ({args.big})', h['clownstats'], [
+                    (make_message(BIG_CHAT, '/clownstats'),) for _ in range(args.ops)
+                ]),
+                # Таблица уже построена: победа сдвигает в ней одну запись
+                measure(f'increment_win ({args.big})', data_manager.increment_win, [
+                    (BIG_CHAT, winner) for winner in winners
+                ]),
+            ]
+        
+        timers.stop()
+        outbox.stop()
+        
+        if data_manager.storage_mode in ('json', 'journal'):
+            results.append(measure('save_all_data', data_manager.save_all_data, [()] * args.repeat))
+        results.append(measure('persist(force)', data_manager.persist, [(True,)] * args.repeat))
+        
+        # chats/sqlite при загрузке только открывают хранилище, чаты грузятся
+        # при первом обращении — меряем вместе с подгрузкой рабочего набора
+        lazy = data_manager.storage_mode in ('chats', 'sqlite')
+        sample = random.sample(ids, min(args.hot_chats, len(ids))) if lazy else []
+        
+        def reload():
+            data_manager.close_storage()
+            data_manager.load_all_data()
+            for chat_id in sample:
+                data_manager.get_all_members(chat_id)
+        name = f'load_all_data + {len(sample)} чатов' if lazy else 'load_all_data'
+        results.append(measure(name, reload, [()] * args.repeat))
+        data_manager.close_storage()
+        
+        return results, len(bot.sent)
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--chats', type=int, default=1000, help='число чатов')
+    parser.add_argument('--members', type=int, default=50, help='участников в чате')
+    parser.add_argument('--stats', type=int, default=20, help='записей статистики в чате')
+    parser.add_argument('--big', type=int, default=10000, help='участников в большом чате (0 — без него)')
+    parser.add_argument('--history', type=int, default=30, help='дней истории розыгрышей в каждом чате')
+    parser.add_argument('--ops', type=int, default=1000, help='вызовов каждой команды')
+    parser.add_argument('--repeat', type=int, default=5, help='повторов save/load')
+    parser.add_argument('--storage', default='chats', choices=('chats', 'json', 'journal', 'sqlite'))
+    parser.add_argument('--hot-chats', type=int, default=1000, help='LRU для chats/sqlite')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', metavar='PATH', help='сохранить результаты в JSON')
+    args = parser.parse_args()
+    
+    random.seed(args.seed)
+    logging.basicConfig(level=logging.WARNING)
+    
+    results, sent = run(args)
+    
+    print(f"chats={args.chats} members={args.members} stats={args.stats} big={args.big} storage={args.storage}")
+    print(f"{'операция':<30} {'N':>6} {'ops/s':>10} {'p50, мс':>9} {'p99, мс':>9}")
+    for r in results:
+        print(f"{r['op']:<30} {r['count']:>6} {r['ops_per_sec']:>10.0f} {r['p50_ms']:>9.3f} {r['p99_ms']:>9.3f}")
+    print(f"Отправлено сообщений: {sent}")
+    
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'params': vars(args), 'results': results}, f, ensure_ascii=False, indent=2)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,61 +1,163 @@
-import logging
-import time
-import telebot
-from telebot import apihelper
-from config import BOT_TOKEN, POLLING_TIMEOUT, POLLING_INTERVAL
-
-logger = logging.getLogger(__name__)
-
-class BotRunner:
-    """Управление ботом и polling с паузами"""
-    
-    def __init__(self):
-        self.bot = telebot.TeleBot(BOT_TOKEN, parse_mode='HTML')
-        self._running = False
-        
-        # Настройка таймаутов
-        apihelper.READ_TIMEOUT = POLLING_TIMEOUT
-        apihelper.CONNECT_TIMEOUT = 10
-        
-        logger.info("✅ Бот создан")
-    
-    def start(self):
-        """Запуск бота с кастомным polling"""
-        logger.info("=" * 50)
-        logger.info("ЗАПУСК БОТА")
-        logger.info(f"Long polling timeout: {POLLING_TIMEOUT}с")
-        logger.info(f"Пауза между запросами: {POLLING_INTERVAL}с")
-        logger.info("=" * 50)
-        
-        self._running = True
-        
-        # Получаем информацию о боте
-        try:
-            me = self.bot.get_me()
-            logger.info(f"🤖 Бот: @{me.username} (ID: {me.id})")
-        except Exception as e:
-            logger.error(f"❌ Ошибка подключения: {e}")
-            return
-        
-        logger.info("🚀 Бот слушает команды...")
-        
-        # Кастомный polling с паузами
-        while self._running:
-            try:
-                logger.debug("Запрос обновлений...")
-                self.bot.polling(
-                    none_stop=False,
-                    timeout=POLLING_TIMEOUT,
-                    long_polling_timeout=POLLING_TIMEOUT
-                )
-            except Exception as e:
-                logger.error(f"Ошибка polling: {e}")
-                logger.info(f"Пауза {POLLING_INTERVAL}с перед повтором...")
-                time.sleep(POLLING_INTERVAL)
-    
-    def stop(self):
-        """Остановка бота"""
-        logger.info("Остановка бота...")
-        self._running = False
-        self.bot.stop_polling()
+import logging
+import random
+import threading
+import time
+import telebot
+from telebot import apihelper
+from config import (
+    BOT_TOKEN, BOT_API_URL, POLLING_TIMEOUT, POLLING_INTERVAL, POLLING_BACKOFF_MAX, TIMER_WORKERS, UPDATE_MODE,
+    WEBHOOK_URL, WEBHOOK_LISTEN, WEBHOOK_PORT, WEBHOOK_PATH, WEBHOOK_SECRET,
+    SHARDS, SHARD_QUEUE_SIZE,
+    OUTBOX_GLOBAL_RATE, OUTBOX_CHAT_RATE, OUTBOX_CHAT_BURST, OUTBOX_WORKERS, OUTBOX_FLOOD_CHATS,
+)
+from timers import TimerQueue
+from dispatcher import ChatDispatcher
+from outbox import Outbox
+from webhook import WebhookServer
+from update_tracker import UpdateTracker
+from metrics import Gauge, POLL_SECONDS, POLL_ERRORS, UPDATE_LAG_SECONDS
+
+logger = logging.getLogger(__name__)
+
+class BotRunner:
+    """Управление ботом: polling с паузами или приём обновлений через webhook"""
+    
+    def __init__(self):
+        # Обработчики вызываются в потоках шардов, собственный пул telebot не нужен
+        self.bot = telebot.TeleBot(BOT_TOKEN, parse_mode='HTML', threaded=False)
+        self.tracker = UpdateTracker()
+        self.dispatcher = ChatDispatcher(self.bot.process_new_updates, SHARDS, SHARD_QUEUE_SIZE,
+                                         done=self.tracker.done)
+        self._running = False
+        self.timers = TimerQueue(workers=TIMER_WORKERS)
+        self.outbox = Outbox(self.bot, OUTBOX_GLOBAL_RATE, OUTBOX_CHAT_RATE, OUTBOX_CHAT_BURST, OUTBOX_WORKERS,
+                             OUTBOX_FLOOD_CHATS)
+        self.webhook = None
+        self._wakeup = threading.Event()
+        
+        Gauge('clown_dispatch_queue', 'Обновлений в очереди шарда', self._queue_depths, ['shard'])
+        Gauge('clown_outbox_pending', 'Сообщений в очереди отправки', self.outbox.pending)
+        
+        # Настройка таймаутов
+        apihelper.READ_TIMEOUT = POLLING_TIMEOUT
+        apihelper.CONNECT_TIMEOUT = 10
+        if BOT_API_URL:
+            apihelper.API_URL = BOT_API_URL.rstrip('/') + '/bot{0}/{1}'
+            logger.info("Bot API: %s", BOT_API_URL)
+        
+        logger.info("✅ Бот создан")
+    
+    def start(self):
+        """Запуск бота в режиме UPDATE_MODE"""
+        logger.info("=" * 50)
+        logger.info("ЗАПУСК БОТА")
+        if UPDATE_MODE == 'webhook':
+            logger.info("Webhook: %s", WEBHOOK_URL)
+        else:
+            logger.info("Long polling timeout: %sс", POLLING_TIMEOUT)
+            logger.info("Пауза между запросами: %sс", POLLING_INTERVAL)
+        logger.info("=" * 50)
+        
+        self._running = True
+        self._wakeup.clear()
+        self.timers.start()
+        self.outbox.start()
+        self.dispatcher.start()
+        self.tracker.load()
+        
+        # Получаем информацию о боте
+        try:
+            me = self.bot.get_me()
+            logger.info("🤖 Бот: @%s (ID: %s)", me.username, me.id)
+        except Exception as e:
+            logger.error("❌ Ошибка подключения: %s", e)
+            return
+        
+        logger.info("🚀 Бот слушает команды...")
+        
+        if UPDATE_MODE == 'webhook':
+            self._run_webhook()
+        else:
+            self._run_polling()
+    
+    def _run_webhook(self):
+        """Регистрирует webhook в Telegram и принимает обновления до stop()"""
+        self.webhook = WebhookServer(self.bot, WEBHOOK_LISTEN, WEBHOOK_PORT, WEBHOOK_PATH, WEBHOOK_SECRET,
+                                     tracker=self.tracker, dispatch=self._dispatch)
+        self.webhook.start()
+        self.bot.set_webhook(url=WEBHOOK_URL, secret_token=WEBHOOK_SECRET)
+        logger.info("✅ Webhook зарегистрирован: %s", WEBHOOK_URL)
+        
+        # Сервер работает в своём потоке, основной поток ждёт остановки
+        while self._running:
+            self._wakeup.wait(1)
+    
+    def _run_polling(self):
+        """Свой цикл getUpdates: offset на диске, отсев повторов, backoff при ошибках"""
+        # Если раньше был webhook, getUpdates без этого вернёт 409
+        try:
+            self.bot.remove_webhook()
+        except Exception as e:
+            logger.warning("Не удалось снять webhook: %s", e)
+        
+        failures = 0
+        while self._running:
+            start = time.perf_counter()
+            try:
+                logger.debug("Запрос обновлений...")
+                updates = self.bot.get_updates(
+                    offset=self.tracker.offset,
+                    timeout=POLLING_TIMEOUT,
+                    long_polling_timeout=POLLING_TIMEOUT
+                )
+                failures = 0
+                POLL_SECONDS.observe(time.perf_counter() - start)
+            except Exception as e:
+                POLL_ERRORS.inc()
+                failures += 1
+                delay = self._backoff_delay(e, failures)
+                logger.error("Ошибка polling: %s", e)
+                logger.info("Пауза %.1fс перед повтором (попытка %s)...", delay, failures)
+                self._wakeup.wait(delay)
+                continue
+            
+            # offset на диске сохраняет PersistenceScheduler после сброса данных
+            fresh = self.tracker.fresh(updates)
+            if fresh:
+                self._dispatch(fresh)
+    
+    def _dispatch(self, updates):
+        """Передаёт обновления в шарды, отмечая, как давно отправлены сообщения"""
+        now = time.time()
+        for update in updates:
+            message = update.message or update.edited_message or update.channel_post
+            if message is not None:
+                UPDATE_LAG_SECONDS.observe(max(0.0, now - (message.edit_date or message.date)))
+        self.dispatcher.submit(updates)
+    
+    def _queue_depths(self):
+        """{(номер шарда,): длина очереди} для метрики clown_dispatch_queue"""
+        return {(str(shard),): depth for shard, depth in enumerate(self.dispatcher.depths())}
+    
+    @staticmethod
+    def _backoff_delay(error, failures):
+        """retry_after от Telegram или экспоненциальная пауза со случайным разбросом"""
+        if isinstance(error, apihelper.ApiTelegramException):
+            retry_after = (error.result_json.get('parameters') or {}).get('retry_after')
+            if retry_after:
+                return float(retry_after)
+        cap = min(POLLING_BACKOFF_MAX, POLLING_INTERVAL * 2 ** (failures - 1))
+        return random.uniform(cap / 2, cap)
+    
+    def stop(self):
+        """Остановка бота"""
+        logger.info("Остановка бота...")
+        self._running = False
+        self._wakeup.set()
+        if self.webhook:
+            self.webhook.stop()
+            self.webhook = None
+        self.dispatcher.stop()
+        self.timers.stop()
+        self.outbox.stop()
         logger.info("✅ Бот остановлен")
\ No newline at end of file
@@ -0,0 +1,92 @@
+import json
+import logging
+import os
+import time
+from metrics import STORAGE_SECONDS, STORAGE_BYTES
+from atomic_write import write_json
+
+logger = logging.getLogger(__name__)
+
+class ChatFileStore:
+    """Данные каждого чата в отдельном файле DATA_DIR/chats/<chat_id>.json
+    
+    Файл чата: {"members": [...], "stats": {...}, "last_used": "...",
+    "settings": {"mode": "...", "timezone": "..."}}. Запись — во временный файл и os.replace(), так что
+    изменение одного чата переписывает только его файл, а испорченный
+    файл затрагивает только этот чат.
+    """
+    
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        logger.info("📁 Файлы чатов: %s", directory)
+    
+    def path(self, chat_id):
+        return os.path.join(self.directory, f"{chat_id}.json")
+    
+    def is_empty(self):
+        return not any(name.endswith('.json') for name in os.listdir(self.directory))
+    
+    def load_chat(self, chat_id):
+        """Возвращает (members, stats, last_used, settings) одного чата"""
+        path = self.path(chat_id)
+        start = time.perf_counter()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+                size = f.tell()
+        except FileNotFoundError:
+            return [], {}, None, None
+        except Exception as e:
+            # Откладываем испорченный файл в сторону, чтобы не затереть его пустым чатом
+            logger.error("❌ Файл чата %s испорчен, переименован в .bad: %s", path, e)
+            os.replace(path, path + '.bad')
+            return [], {}, None, None
+        # Метки без chat_id: все файлы чатов — один ряд метрики
+        STORAGE_SECONDS.observe(time.perf_counter() - start, 'load', 'chats')
+        STORAGE_BYTES.inc('load', 'chats', amount=size)
+        return data.get('members', []), data.get('stats', {}), data.get('last_used'), _settings(data)
+    
+    def save_chat(self, chat_id, members, stats, day, settings):
+        data = {'members': members, 'stats': stats}
+        if day:
+            data['last_used'] = day
+        if settings:
+            data['settings'] = settings
+        # Метки без chat_id: все файлы чатов — один ряд метрики
+        write_json(self.path(chat_id), data, 'chats')
+    
+    def timezones(self):
+        """{chat_id: timezone} по всем файлам чатов; читает каждый файл, нужно только при запуске"""
+        zones = {}
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), 'r', encoding='utf-8') as f:
+                    timezone = _settings(json.load(f)).get('timezone')
+            except Exception as e:
+                logger.error("❌ Не удалось прочитать %s: %s", name, e)
+                continue
+            if timezone:
+                zones[name[:-len('.json')]] = timezone
+        return zones
+    
+    def import_data(self, chat_members, clown_stats, last_used, group_settings):
+        """Разносит общие JSON-файлы по файлам чатов, возвращает число чатов"""
+        chat_ids = set(chat_members) | set(clown_stats) | set(last_used) | set(group_settings)
+        for chat_id in chat_ids:
+            self.save_chat(
+                chat_id,
+                chat_members.get(chat_id, []),
+                clown_stats.get(chat_id, {}),
+                last_used.get(chat_id),
+                group_settings.get(chat_id),
+            )
+        return len(chat_ids)
+
+def _settings(data):
+    # Файлы до появления настроек хранили только режим
+    if 'settings' in data:
+        return data['settings']
+    return {'mode': data['mode']} if data.get('mode') else {}
@@ -1,28 +1,102 @@
-import os
-import logging
-from dotenv import load_dotenv
-
-load_dotenv()
-
-BOT_TOKEN = os.getenv('BOT_TOKEN')
-if not BOT_TOKEN:
-    raise ValueError("BOT_TOKEN не найден в .env файле!")
-
-# Файлы для данных
-STATS_FILE = "clown_stats.json"
-LAST_USED_FILE = "last_used.json"
-MEMBERS_FILE = "chat_members.json"
-PHRASES_FILE = "phrases.json"
-GROUP_SETTINGS_FILE = "group_settings.json"
-
-# Настройки polling
-POLLING_TIMEOUT = 30  # long polling timeout
-POLLING_INTERVAL = 5  # пауза между запросами (сек)
-
-# Настройки логирования
-LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-LOG_LEVEL = logging.DEBUG
-
-def setup_logging():
-    logging.basicConfig(format=LOG_FORMAT, level=LOG_LEVEL)
+import os
+import logging
+from dotenv import load_dotenv
+from log_queue import start_logging
+
+load_dotenv()
+
+BOT_TOKEN = os.getenv('BOT_TOKEN')
+if not BOT_TOKEN:
+    raise ValueError("BOT_TOKEN не найден в .env файле!")
+
+# Адрес Bot API; для нагрузочных тестов — поддельный сервер из fake_api.py
+BOT_API_URL = os.getenv('BOT_API_URL')
+
+# Файлы для данных
+STATS_FILE = "clown_stats.json"
+LAST_USED_FILE = "last_used.json"
+MEMBERS_FILE = "chat_members.json"
+PHRASES_FILE = "phrases.json"
+GROUP_SETTINGS_FILE = "group_settings.json"
+
+# Движок бота: telebot (pyTelegramBotAPI, потоки) или async (python-telegram-bot, asyncio)
+BOT_RUNTIME = os.getenv('BOT_RUNTIME', 'telebot')
+ASYNC_CONCURRENT_UPDATES = 256  # сколько обновлений обрабатывать одновременно
+ASYNC_CONNECTION_POOL = 64  # соединений к Bot API для отправки
+
+# Настройки polling
+POLLING_TIMEOUT = 30  # long polling timeout
+POLLING_INTERVAL = 5  # первая пауза после ошибки, дальше растёт вдвое (сек)
+POLLING_BACKOFF_MAX = 300  # максимальная пауза между повторами (сек)
+
+# Способ получения обновлений: polling (long polling) или webhook
+UPDATE_MODE = os.getenv('UPDATE_MODE', 'polling')
+WEBHOOK_URL = os.getenv('WEBHOOK_URL')  # публичный https-адрес, который регистрируется в Telegram
+WEBHOOK_LISTEN = os.getenv('WEBHOOK_LISTEN', '0.0.0.0')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', '8080'))
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/telegram')
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET')  # заголовок X-Telegram-Bot-Api-Secret-Token
+if UPDATE_MODE == 'webhook' and not WEBHOOK_URL:
+    raise ValueError("Для UPDATE_MODE=webhook нужен WEBHOOK_URL в .env файле!")
+# Без секрета любой, кто узнал адрес, сможет присылать поддельные обновления
+if UPDATE_MODE == 'webhook' and not WEBHOOK_SECRET:
+    raise ValueError("Для UPDATE_MODE=webhook нужен WEBHOOK_SECRET в .env файле (A-Z, a-z, 0-9, _ и -)!")
+
+# Шарды обработки: обновления одного чата идут по порядку в своём потоке,
+# разные чаты — параллельно
+SHARDS = int(os.getenv('SHARDS', str(os.cpu_count() or 4)))
+SHARD_QUEUE_SIZE = 1000  # обновлений в очереди шарда, дальше приём ждёт
+
+# Метрики в формате Prometheus на http://METRICS_LISTEN:METRICS_PORT/metrics (0 — выключены)
+METRICS_LISTEN = os.getenv('METRICS_LISTEN', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))
+
+# Очередь исходящих сообщений (лимиты Telegram)
+OUTBOX_GLOBAL_RATE = 30  # сообщений в секунду на весь бот
+OUTBOX_CHAT_RATE = 20 / 60  # сообщений в секунду в один чат (20 в минуту)
+OUTBOX_CHAT_BURST = 3  # сколько можно отправить в чат подряд без паузы
+OUTBOX_WORKERS = 8  # одновременных запросов sendMessage
+# 429 из стольких разных чатов, пока не кончился прошлый retry_after, —
+# это ограничение всего бота: на retry_after встаёт вся отправка
+OUTBOX_FLOOD_CHATS = 2
+
+# /clownstats по страницам с кнопками «назад»/«вперёд»
+STATS_PAGE_SIZE = 15  # строк таблицы на странице (в 4096 символов входят и длинные имена)
+
+# Отложенная отправка результата /clown
+REVEAL_DELAY = 1  # пауза между "интригой" и результатом (сек)
+TIMER_WORKERS = 4  # потоков для отправки отложенных сообщений
+
+# Автоматический розыгрыш в полночь по часовому поясу чата (/settimezone),
+# только для BOT_RUNTIME=telebot; чаты без часового пояса разыгрывают вручную
+AUTO_DRAW = os.getenv('AUTO_DRAW', '0') == '1'
+AUTO_DRAW_WINDOW = 600  # на сколько секунд после полуночи растянуть розыгрыши
+AUTO_DRAW_BATCH = 50  # чатов за раз
+AUTO_DRAW_PAUSE = 1  # пауза между пачками (сек)
+
+# Настройки отложенного сохранения (write-behind)
+FLUSH_INTERVAL = 5  # как часто сбрасывать изменения на диск (сек)
+FLUSH_MAX_DIRTY = 100  # сбросить раньше, если накопилось столько изменений
+
+# История розыгрышей (DATA_DIR/history): сегменты по месяцам старше
+# HISTORY_KEEP_MONTHS сжимаются в .gz раз в HISTORY_COMPACT_INTERVAL секунд
+HISTORY_KEEP_MONTHS = 12
+HISTORY_COMPACT_INTERVAL = 24 * 60 * 60
+
+# Режим хранения: chats (файл на чат в DATA_DIR/chats, при первом запуске
+# разносит по ним общие JSON-файлы), json (общие файлы целиком), journal
+# (журнал изменений + снимки) или sqlite (clown.db, переносит данные из JSON)
+STORAGE_MODE = os.getenv('STORAGE_MODE', 'chats')
+JOURNAL_COMPACT_BYTES = 1024 * 1024  # сжимать журнал, когда он больше (байт)
+HOT_CHATS = int(os.getenv('HOT_CHATS', '1000'))  # chats/sqlite: сколько чатов держать в памяти
+
+# Настройки логирования
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_RATE = 20  # записей в секунду с одним шаблоном, дальше отбрасываются (0 — без ограничения)
+LOG_BURST = 100  # сколько таких записей можно выдать подряд
+
+def setup_logging():
+    # Запись в лог — только постановка в очередь, пишет фоновый поток
+    start_logging(LOG_LEVEL, LOG_FORMAT, LOG_RATE, LOG_BURST)
     logging.getLogger(__name__).info("Логирование настроено")
\ No newline at end of file
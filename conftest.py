@@ -0,0 +1,3 @@
+# Тесты лежат в tests/; test_bot.py — ручная проверка токена через сеть,
+# при импорте он сразу ходит в Telegram, поэтому pytest его не собирает
+collect_ignore = ['test_bot.py']
@@ -1,123 +1,712 @@
-import json
-import os
-import logging
-
-APP_DIR = os.path.dirname(os.path.abspath(__file__))
-DATA_DIR = os.environ.get('DATA_DIR', os.path.dirname(os.path.abspath(__file__)))
-
-def get_path(filename):
-    return os.path.join(DATA_DIR, filename)
-
-STATS_FILE = get_path("clown_stats.json")
-LAST_USED_FILE = get_path("last_used.json")
-MEMBERS_FILE = get_path("chat_members.json")
-PHRASES_FILE = os.path.join(APP_DIR, "phrases.json")
-GROUP_SETTINGS_FILE = get_path("group_settings.json")
-
-logger = logging.getLogger(__name__)
-
-last_used = {}
-chat_members = {}
-phrases_data = {}
-group_settings = {}
-
-def load_json_file(filepath, default=None):
-    if default is None:
-        default = {}
-    logger.info(f"Загрузка {filepath}...")
-    try:
-        if os.path.exists(filepath):
-            with open(filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                logger.info(f"✅ Загружен {filepath}: {len(data)} записей")
-                return data
-    except Exception as e:
-        logger.error(f"❌ Ошибка загрузки {filepath}: {e}")
-    logger.info(f"⚠️ Файл {filepath} не найден")
-    return default
-
-def save_json_file(filepath, data):
-    logger.info(f"💾 Сохранение {filepath}...")  # DEBUG → INFO
-    logger.info(f"  Данных: {len(data)} записей")  # показываем что сохраняем
-    try:
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-        logger.info(f"✅ Сохранён {filepath}")  # DEBUG → INFO
-    except Exception as e:
-        logger.error(f"❌ Ошибка сохранения {filepath}: {e}")
-        logger.error(f"  Данные: {data}")  # покажем что пытались сохранить
-
-def load_members():
-    global chat_members
-    chat_members = load_json_file(MEMBERS_FILE)
-    if chat_members:
-        for chat_id, members in chat_members.items():
-            active = len([m for m in members if m.get('active', True)])
-            logger.info(f"  Чат {chat_id}: {active} активных из {len(members)}")
-
-def save_members():
-    save_json_file(MEMBERS_FILE, chat_members)
-
-def load_stats():
-    return load_json_file(STATS_FILE)
-
-def save_stats(stats):
-    save_json_file(STATS_FILE, stats)
-
-def load_last_used():
-    global last_used
-    last_used = load_json_file(LAST_USED_FILE)
-    return last_used
-
-def save_last_used():
-    save_json_file(LAST_USED_FILE, last_used)
-
-def load_phrases():
-    global phrases_data
-    phrases_data = load_json_file(PHRASES_FILE)
-    if phrases_data:
-        logger.info(f"Загружены режимы фраз: {list(phrases_data.keys())}")
-    return phrases_data
-
-def load_group_settings():
-    global group_settings
-    group_settings = load_json_file(GROUP_SETTINGS_FILE)
-    return group_settings
-
-def save_group_settings():
-    save_json_file(GROUP_SETTINGS_FILE, group_settings)
-
-def get_members_for_chat(chat_id):
-    chat_id_str = str(chat_id)
-    if chat_id_str in chat_members:
-        members = chat_members[chat_id_str]
-        active_members = [m for m in members if m.get('active', True)]
-        logger.info(f"Чат {chat_id_str}: {len(active_members)} активных")
-        return active_members
-    logger.warning(f"Чат {chat_id_str}: нет участников")
-    return []
-
-def get_chat_mode(chat_id):
-    chat_id_str = str(chat_id)
-    mode = group_settings.get(chat_id_str, 'clown')
-    if mode not in phrases_data:
-        mode = 'default'
-    return mode
-
-def get_phrases_for_chat(chat_id):
-    mode = get_chat_mode(chat_id)
-    return phrases_data.get(mode, phrases_data.get('default', {}))
-
-def load_all_data():
-    load_last_used()
-    load_members()
-    load_phrases()
-    load_group_settings()
-
-def save_all_data():
-    save_last_used()
-    save_members()
-    save_group_settings()
-    
-def get_chat_members():
+import json
+import os
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import date, datetime
+from zoneinfo import ZoneInfo
+from journal import Journal
+from sqlite_storage import SqliteStorage
+from chat_files import ChatFileStore
+from member_index import MemberIndex
+from leaderboard import Leaderboard
+from phrases import PhraseBook
+from records import StatsEntry, stats_from_dicts, stats_to_dicts
+from persistent import EMPTY
+from history import DrawHistory, period_keys
+from metrics import STORAGE_SECONDS, STORAGE_BYTES
+from atomic_write import write_json
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.environ.get('DATA_DIR', os.path.dirname(os.path.abspath(__file__)))
+
+def get_path(filename):
+    return os.path.join(DATA_DIR, filename)
+
+STATS_FILE = get_path("clown_stats.json")
+LAST_USED_FILE = get_path("last_used.json")
+MEMBERS_FILE = get_path("chat_members.json")
+PHRASES_FILE = os.path.join(APP_DIR, "phrases.json")
+GROUP_SETTINGS_FILE = get_path("group_settings.json")
+JOURNAL_FILE = get_path("journal.log")
+SQLITE_FILE = get_path("clown.db")
+CHATS_DIR = get_path("chats")
+HISTORY_DIR = get_path("history")
+
+logger = logging.getLogger(__name__)
+
+# Данные чатов копируются при записи: значение чата в словарях ниже
+# после публикации не меняется, запись строит новое и подменяет его
+# одним присваиванием. Читатели и сохранение работают без блокировок
+# с тем значением, которое успели взять. Участники и статистика —
+# неизменяемые словари со структурным разделением (PersistentMap),
+# так что новая версия стоит O(log n), а не копию всего чата.
+last_used = {}
+chat_members = {}  # chat_id -> MemberIndex
+clown_stats = {}  # chat_id -> PersistentMap {user_key: StatsEntry}
+_leaderboards = {}  # chat_id -> Leaderboard, строится при первом запросе
+_period_boards = {}  # chat_id -> {(period, key): Leaderboard} по итогам истории
+phrase_book = PhraseBook(PHRASES_FILE)  # перечитывается при изменении файла
+group_settings = {}  # chat_id -> {'mode': ..., 'timezone': ...}
+_publish_lock = threading.Lock()  # только между писателями
+
+# Отложенное сохранение: какие хранилища изменены с последнего сброса
+_dirty_stores = set()
+_dirty_chats = set()  # режим chats: чаты, чьи файлы нужно переписать
+_dirty_count = 0
+_dirty_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_dirty_listener = None
+_chat_write_lock = threading.Lock()
+_timezone_listener = None
+
+# Режим хранения: 'chats' (файл на чат в DATA_DIR/chats), 'json' (общие
+# файлы целиком), 'journal' (журнал + снимки) или 'sqlite' (база).
+# В режимах chats и sqlite чаты подгружаются в память при первом
+# обращении, в памяти остаются hot_chats последних, остальные вытесняются
+STORAGE_MODES = ('chats', 'json', 'journal', 'sqlite')
+storage_mode = 'chats'
+journal_compact_bytes = 1024 * 1024
+hot_chats_limit = 1000
+_journal = None
+_sqlite = None
+_chat_files = None
+draw_history = None  # история розыгрышей и итоги по периодам, во всех режимах
+_loaded_chats = OrderedDict()  # chat_id -> True, от давно не нужных к недавним
+_load_lock = threading.Lock()
+
+def load_json_file(filepath, default=None):
+    if default is None:
+        default = {}
+    logger.debug("Загрузка %s...", filepath)
+    try:
+        if os.path.exists(filepath):
+            start = time.perf_counter()
+            with open(filepath, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+                size = f.tell()
+            name = os.path.basename(filepath)
+            STORAGE_SECONDS.observe(time.perf_counter() - start, 'load', name)
+            STORAGE_BYTES.inc('load', name, amount=size)
+            logger.info("✅ Загружен %s: %d записей", filepath, len(data))
+            return data
+    except Exception as e:
+        logger.error("❌ Ошибка загрузки %s: %s", filepath, e)
+    logger.info("⚠️ Файл %s не найден", filepath)
+    return default
+
+def save_json_file(filepath, data):
+    try:
+        size = write_json(filepath, data, os.path.basename(filepath))
+        logger.debug("💾 Сохранён %s: %d записей, %d байт", filepath, len(data), size)
+    except Exception as e:
+        # Сами данные не выводим: в больших чатах это мегабайты в логе
+        logger.error("❌ Ошибка сохранения %s (%d записей): %s", filepath, len(data), e)
+
+def load_members():
+    global chat_members
+    chat_members = {
+        chat_id: MemberIndex(members)
+        for chat_id, members in load_json_file(MEMBERS_FILE).items()
+    }
+    for chat_id, index in chat_members.items():
+        logger.debug("  Чат %s: %d активных из %d", chat_id, len(index.active()), len(index))
+
+def save_members():
+    members = _snapshot(chat_members)
+    save_json_file(MEMBERS_FILE, {chat_id: index.to_list() for chat_id, index in members.items()})
+
+def load_stats():
+    global clown_stats
+    clown_stats = {
+        chat_id: stats_from_dicts(entries)
+        for chat_id, entries in load_json_file(STATS_FILE).items()
+    }
+    _leaderboards.clear()
+    return clown_stats
+
+def save_stats():
+    save_json_file(STATS_FILE, {chat_id: stats_to_dicts(entries) for chat_id, entries in _snapshot(clown_stats).items()})
+
+def get_chat_stats(chat_id):
+    """Статистика чата из памяти: {user_key: StatsEntry(name, username, count)}"""
+    chat_id_str = str(chat_id)
+    _ensure_chat(chat_id_str)
+    return clown_stats.get(chat_id_str, EMPTY)
+
+def get_leaderboard(chat_id):
+    """Отсортированная статистика чата (Leaderboard) или None, если она пуста"""
+    chat_id_str = str(chat_id)
+    _ensure_chat(chat_id_str)
+    entries = clown_stats.get(chat_id_str)
+    if not entries:
+        return None
+    board = _leaderboards.get(chat_id_str)
+    if board is None or board.entries is not entries:
+        # Таблицы ещё нет или она от прошлой версии статистики
+        board = _leaderboards[chat_id_str] = Leaderboard(entries)
+    return board
+
+def increment_win(chat_id, winner):
+    """Засчитывает победу участнику и возвращает обновлённую запись"""
+    chat_id_str = str(chat_id)
+    winner_name = winner.get('name', 'Неизвестный')
+    winner_username = winner.get('username', '')
+    user_key = _user_key(winner)
+    
+    with _writing(chat_id_str):
+        entry = clown_stats.get(chat_id_str, EMPTY).get(user_key)
+        if entry is None:
+            entry = StatsEntry(winner_name, winner_username)
+        entry = entry.won()
+        _publish_win(chat_id_str, user_key, entry)
+    _record('win', chat_id_str, {'key': user_key, 'entry': entry.to_dict()}, 'stats')
+    return entry
+
+def _user_key(winner):
+    """Ключ участника в статистике: username, иначе id, иначе имя"""
+    return winner.get('username', '') or str(winner.get('id', winner.get('name', 'Неизвестный')))
+
+def record_draw(chat_id, day, winner):
+    """Дописывает розыгрыш в историю чата и итоги недели, месяца и года"""
+    if draw_history is None:
+        return
+    chat_id_str = str(chat_id)
+    try:
+        draw_history.record(chat_id_str, day, _user_key(winner), winner, get_chat_mode(chat_id_str))
+    except Exception as e:
+        # Общая статистика уже записана, история — дополнение к ней
+        logger.error("❌ Ошибка записи истории чата %s: %s", chat_id_str, e)
+
+def get_period_leaderboard(chat_id, period, key=None):
+    """(key, Leaderboard или None) за период 'week'/'month'/'year'
+
+    Без key — текущий период по дню чата. Читаются итоги в памяти, не история.
+    """
+    if key is None:
+        key = period_keys(chat_today(chat_id))[period]
+    chat_id_str = str(chat_id)
+    entries = draw_history.rollup(chat_id_str, period, key) if draw_history is not None else {}
+    if not entries:
+        return key, None
+    boards = _period_boards.get(chat_id_str, {})
+    board = boards.get((period, key))
+    if board is None or board.entries is not entries:
+        # Итоги публикуются новым словарём при каждой победе, старая таблица устарела
+        board = Leaderboard(entries)
+        with _publish_lock:
+            boards = dict(_period_boards.get(chat_id_str, {}))
+            boards[(period, key)] = board
+            _period_boards[chat_id_str] = boards
+    return key, board
+
+def compact_history(keep_months):
+    """Сжимает сегменты истории старше keep_months месяцев"""
+    if draw_history is None:
+        return 0
+    return draw_history.compact(keep_months)
+
+def load_last_used():
+    global last_used
+    last_used = load_json_file(LAST_USED_FILE)
+    return last_used
+
+def save_last_used():
+    save_json_file(LAST_USED_FILE, _snapshot(last_used))
+
+def load_phrases():
+    phrase_book.load()
+    return phrase_book
+
+def settings_of(value):
+    """Настройки чата словарём; раньше в group_settings хранилась только строка режима"""
+    if isinstance(value, str):
+        return {'mode': value}
+    return dict(value or {})
+
+def load_group_settings():
+    global group_settings
+    group_settings = {
+        chat_id: settings_of(value)
+        for chat_id, value in load_json_file(GROUP_SETTINGS_FILE).items()
+    }
+    return group_settings
+
+def save_group_settings():
+    save_json_file(GROUP_SETTINGS_FILE, _snapshot(group_settings))
+
+def get_members_for_chat(chat_id):
+    chat_id_str = str(chat_id)
+    _ensure_chat(chat_id_str)
+    if chat_id_str in chat_members:
+        active_members = chat_members[chat_id_str].active()
+        logger.debug("Чат %s: %d активных", chat_id_str, len(active_members), extra={'chat_id': chat_id_str})
+        return active_members
+    logger.info("Чат %s: нет участников", chat_id_str, extra={'chat_id': chat_id_str})
+    return ()
+
+def get_all_members(chat_id):
+    """Все участники чата, включая неактивных (MemberIndex или пустой кортеж)"""
+    chat_id_str = str(chat_id)
+    _ensure_chat(chat_id_str)
+    return chat_members.get(chat_id_str, ())
+
+def find_member(chat_id, user_id=None, username=None):
+    """Ищет участника по id или username"""
+    index = get_all_members(chat_id)
+    if not index:
+        return None
+    if user_id is not None:
+        return index.find('id', user_id)
+    return index.find('username', username)
+
+def get_last_used(chat_id):
+    """День последнего выбора в чате (строка YYYY-MM-DD) или None"""
+    chat_id_str = str(chat_id)
+    _ensure_chat(chat_id_str)
+    return last_used.get(chat_id_str)
+
+def get_chat_mode(chat_id):
+    chat_id_str = str(chat_id)
+    _ensure_chat(chat_id_str)
+    mode = group_settings.get(chat_id_str, {}).get('mode', 'clown')
+    if mode not in phrase_book:
+        mode = 'default'
+    return mode
+
+def get_chat_timezone(chat_id):
+    """Часовой пояс чата (имя IANA, например Europe/Moscow) или None"""
+    chat_id_str = str(chat_id)
+    _ensure_chat(chat_id_str)
+    return group_settings.get(chat_id_str, {}).get('timezone')
+
+def chat_today(chat_id):
+    """Сегодняшний день чата (YYYY-MM-DD): по его часовому поясу, без него — по часам сервера"""
+    timezone = get_chat_timezone(chat_id)
+    if timezone:
+        try:
+            return str(datetime.now(ZoneInfo(timezone)).date())
+        except Exception as e:
+            logger.error("❌ Часовой пояс %s чата %s: %s", timezone, chat_id, e)
+    return str(date.today())
+
+def get_phrases_for_chat(chat_id):
+    """Разобранные фразы режима чата (phrases.Phrases)"""
+    return phrase_book.get(get_chat_mode(chat_id))
+
+def add_member(chat_id, member):
+    """Добавляет участника в список чата"""
+    chat_id_str = str(chat_id)
+    with _writing(chat_id_str):
+        index = _chat_index(chat_id_str).copy()
+        index.add(member)
+        _publish(chat_members, chat_id_str, index)
+    _record('member_add', chat_id_str, {'member': member}, 'members')
+
+def remove_member(chat_id, user_id=None, username=None):
+    """Удаляет участника по id или username, возвращает число удалённых"""
+    chat_id_str = str(chat_id)
+    if user_id is not None:
+        payload = {'id': user_id}
+    else:
+        payload = {'username': username}
+    removed = _apply_member_remove(chat_id_str, payload)
+    if removed:
+        _record('member_remove', chat_id_str, payload, 'members')
+    return removed
+
+def set_last_used(chat_id, day):
+    """Запоминает день последнего выбора в чате"""
+    chat_id_str = str(chat_id)
+    _apply_last_used(chat_id_str, {'day': day})
+    _record('last_used', chat_id_str, {'day': day}, 'last_used')
+
+def set_chat_mode(chat_id, mode):
+    """Сохраняет режим фраз для чата"""
+    chat_id_str = str(chat_id)
+    _apply_mode(chat_id_str, {'mode': mode})
+    _record('mode', chat_id_str, {'mode': mode}, 'settings')
+
+def set_chat_timezone(chat_id, timezone):
+    """Сохраняет часовой пояс чата (None — убрать) и сообщает о нём планировщику"""
+    chat_id_str = str(chat_id)
+    _apply_timezone(chat_id_str, {'timezone': timezone})
+    _record('timezone', chat_id_str, {'timezone': timezone}, 'settings')
+    if _timezone_listener:
+        _timezone_listener(chat_id_str, timezone)
+
+def set_timezone_listener(listener):
+    """Колбэк listener(chat_id, timezone) вызывается при смене часового пояса чата"""
+    global _timezone_listener
+    _timezone_listener = listener
+
+def scheduled_chats():
+    """{chat_id: timezone} всех чатов с часовым поясом, включая не загруженные в память"""
+    if _sqlite is not None:
+        zones = _sqlite.timezones()
+    elif _chat_files is not None:
+        zones = _chat_files.timezones()
+    else:
+        zones = {}
+    # В памяти могут быть ещё не записанные изменения
+    with _publish_lock:
+        for chat_id, settings in group_settings.items():
+            zones[chat_id] = settings.get('timezone')
+    return {chat_id: zone for chat_id, zone in zones.items() if zone}
+
+def _record(op, chat_id, payload, store):
+    """Фиксирует изменение: запись в журнал или пометка хранилища"""
+    if _journal is not None:
+        _journal.append(op, chat_id, payload)
+    elif _sqlite is not None:
+        _sqlite.apply(op, chat_id, payload)
+    elif _chat_files is not None:
+        pass  # файл чата помечен изменённым ещё в _writing()
+    else:
+        mark_dirty(store)
+
+def _ensure_chat(chat_id):
+    """В режимах sqlite и chats подгружает чат при первом обращении
+
+    Чат становится самым свежим в LRU; если чатов в памяти больше
+    hot_chats_limit, давно не нужные выгружаются — в том числе, может
+    быть, чат, который другой шард как раз собирается менять; поэтому
+    запись идёт только через _writing().
+    """
+    store = _sqlite if _sqlite is not None else _chat_files
+    if store is None:
+        return
+    if chat_id in _loaded_chats:
+        try:
+            _loaded_chats.move_to_end(chat_id)
+            return
+        except KeyError:
+            pass  # только что вытеснен — загрузим заново
+    with _load_lock:
+        if chat_id in _loaded_chats:
+            _loaded_chats.move_to_end(chat_id)
+            return
+        members, stats, day, settings = store.load_chat(chat_id)
+        with _publish_lock:
+            if members:
+                chat_members[chat_id] = MemberIndex(members)
+            if stats:
+                clown_stats[chat_id] = stats_from_dicts(stats)
+            if day:
+                last_used[chat_id] = day
+            if settings:
+                group_settings[chat_id] = settings
+        _loaded_chats[chat_id] = True
+        # Каждый лишний чат — одна попытка: незаписанный остаётся в памяти
+        for old in list(_loaded_chats)[:max(0, len(_loaded_chats) - hot_chats_limit)]:
+            _evict_chat(old)
+
+@contextmanager
+def _writing(chat_id):
+    """_publish_lock для записи в чат, который точно загружен в память
+
+    Между _ensure_chat() и записью чат могли вытеснить: тогда изменение
+    попало бы в пустой чат без участников и настроек, а его файл был бы
+    затёрт. Поэтому загрузка перепроверяется под замком (вытеснение
+    сначала убирает чат из _loaded_chats), и при необходимости чат
+    загружается заново. В режиме chats файл чата помечается изменённым
+    здесь же, под замком, чтобы вытеснение не пропустило его сохранение.
+    """
+    lazy = _sqlite is not None or _chat_files is not None
+    while True:
+        _ensure_chat(chat_id)
+        _publish_lock.acquire()
+        if not lazy or chat_id in _loaded_chats:
+            break
+        _publish_lock.release()
+    try:
+        yield
+    finally:
+        if _chat_files is not None:
+            mark_dirty(chat_id=chat_id)
+        _publish_lock.release()
+
+def _evict_chat(chat_id):
+    """Выгружает чат из памяти, перед этим дописав его файл; False, если файл не записан
+
+    Снятие с учёта загруженных, проверка изменённости, запись файла и
+    удаление из памяти идут под одним _publish_lock: запись, уже
+    прошедшая проверку в _writing(), целиком попадёт в файл, а
+    следующая увидит, что чат выгружен, и подождёт его загрузки.
+    """
+    with _chat_write_lock:
+        with _publish_lock:
+            _loaded_chats.pop(chat_id, None)
+            if _chat_files is not None:
+                with _dirty_lock:
+                    dirty = chat_id in _dirty_chats
+                    _dirty_chats.discard(chat_id)
+                if dirty and not _write_chat_file(chat_id, chat_members.get(chat_id), clown_stats.get(chat_id, EMPTY),
+                                                  last_used.get(chat_id), group_settings.get(chat_id)):
+                    # Остаётся в памяти изменённым — запишется при следующем сбросе
+                    with _dirty_lock:
+                        _dirty_chats.add(chat_id)
+                    _loaded_chats[chat_id] = True
+                    return False
+            for store in (chat_members, clown_stats, last_used, group_settings, _leaderboards, _period_boards):
+                store.pop(chat_id, None)
+    logger.debug("Чат %s выгружен из памяти", chat_id)
+    return True
+
+def _snapshot(store):
+    """Неизменный срез хранилища для сохранения: значения чатов не меняются"""
+    with _publish_lock:
+        return dict(store)
+
+def _publish(store, chat_id, value):
+    """Подменяет значение чата новой версией (под _publish_lock)"""
+    store[chat_id] = value
+
+def _publish_win(chat_id, key, entry):
+    old = clown_stats.get(chat_id, EMPTY)
+    entries = old.set(key, entry)
+    board = _leaderboards.get(chat_id)
+    _publish(clown_stats, chat_id, entries)
+    if board is not None and board.entries is old:
+        _leaderboards[chat_id] = board.updated(entries, key)
+
+def _chat_index(chat_id):
+    return chat_members.get(chat_id) or MemberIndex()
+
+def _apply_member_add(chat_id, data):
+    with _writing(chat_id):
+        index = _chat_index(chat_id)
+        # При повторном проигрывании журнала участник может уже быть в снимке
+        if index.contains(data['member']):
+            return
+        index = index.copy()
+        index.add(data['member'])
+        _publish(chat_members, chat_id, index)
+
+def _apply_member_remove(chat_id, data):
+    field, value = next(iter(data.items()))
+    with _writing(chat_id):
+        index = chat_members.get(chat_id)
+        if not index:
+            return 0
+        index = index.copy()
+        removed = index.remove(field, value)
+        if removed:
+            _publish(chat_members, chat_id, index)
+        return removed
+
+def _apply_win(chat_id, data):
+    with _writing(chat_id):
+        _publish_win(chat_id, data['key'], StatsEntry.of(data['entry']))
+
+def _apply_last_used(chat_id, data):
+    with _writing(chat_id):
+        _publish(last_used, chat_id, data['day'])
+
+def _apply_mode(chat_id, data):
+    # Кеш текстов таблицы разделён по режиму, сбрасывать его не нужно
+    with _writing(chat_id):
+        settings = dict(group_settings.get(chat_id, {}))
+        settings['mode'] = data['mode']
+        _publish(group_settings, chat_id, settings)
+
+def _apply_timezone(chat_id, data):
+    with _writing(chat_id):
+        settings = dict(group_settings.get(chat_id, {}))
+        if data['timezone']:
+            settings['timezone'] = data['timezone']
+        else:
+            settings.pop('timezone', None)
+        _publish(group_settings, chat_id, settings)
+
+_APPLIERS = {
+    'member_add': _apply_member_add,
+    'member_remove': _apply_member_remove,
+    'win': _apply_win,
+    'last_used': _apply_last_used,
+    'mode': _apply_mode,
+    'timezone': _apply_timezone,
+}
+
+def apply_record(record):
+    """Применяет запись журнала к данным в памяти"""
+    data = dict(record)
+    op = data.pop('op')
+    chat_id = data.pop('chat')
+    _APPLIERS[op](chat_id, data)
+
+def set_dirty_listener(listener):
+    """Колбэк listener(dirty_count) вызывается при каждой пометке изменений"""
+    global _dirty_listener
+    _dirty_listener = listener
+
+def mark_dirty(*stores, chat_id=None):
+    """Помечает хранилища ('members', 'stats', 'last_used', 'settings')
+    или файл чата chat_id изменёнными"""
+    global _dirty_count
+    with _dirty_lock:
+        _dirty_stores.update(stores)
+        if chat_id is not None:
+            _dirty_chats.add(chat_id)
+        _dirty_count += 1
+        count = _dirty_count
+    if _dirty_listener:
+        _dirty_listener(count)
+
+def flush_dirty():
+    """Сохраняет только изменённые хранилища и файлы чатов, возвращает их список"""
+    global _dirty_count
+    with _flush_lock:
+        with _dirty_lock:
+            stores = sorted(_dirty_stores)
+            _dirty_stores.clear()
+            chats = sorted(_dirty_chats)
+            _dirty_count = 0
+        for store in stores:
+            STORE_SAVERS[store]()
+        return stores + [chat_id for chat_id in chats if _save_chat(chat_id)]
+
+def _save_chat(chat_id):
+    """Переписывает файл чата, если он изменён; True, если записан"""
+    with _chat_write_lock:
+        with _dirty_lock:
+            if chat_id not in _dirty_chats:
+                return False
+            _dirty_chats.discard(chat_id)
+        with _publish_lock:
+            index = chat_members.get(chat_id)
+            stats = clown_stats.get(chat_id, EMPTY)
+            day = last_used.get(chat_id)
+            settings = group_settings.get(chat_id)
+        if not _write_chat_file(chat_id, index, stats, day, settings):
+            with _dirty_lock:
+                _dirty_chats.add(chat_id)
+            return False
+        return True
+
+def _write_chat_file(chat_id, index, stats, day, settings):
+    """Пишет файл чата из взятых значений; False (и ошибка в лог), если не вышло"""
+    try:
+        _chat_files.save_chat(chat_id, index.to_list() if index else [], stats_to_dicts(stats), day, settings)
+    except Exception as e:
+        logger.error("❌ Ошибка сохранения чата %s: %s", chat_id, e)
+        return False
+    return True
+
+def configure_storage(mode='chats', compact_bytes=None, hot_chats=None):
+    """Выбор режима хранения, вызывается до load_all_data()"""
+    global storage_mode, journal_compact_bytes, hot_chats_limit
+    if mode not in STORAGE_MODES:
+        raise ValueError(f"Неизвестный режим хранения: {mode}")
+    storage_mode = mode
+    if compact_bytes is not None:
+        journal_compact_bytes = compact_bytes
+    if hot_chats is not None:
+        hot_chats_limit = hot_chats
+
+def compact_journal():
+    """Сворачивает журнал в снимки JSON-файлов"""
+    if _journal is None:
+        return
+    with _flush_lock:
+        records = _journal.records
+        _journal.compact(save_all_data)
+        logger.info("🗜 Журнал сжат: %d записей перенесено в снимки", records)
+
+def persist(force=False):
+    """Фоновое сохранение: сброс изменённых файлов или сжатие журнала
+    и итогов истории розыгрышей (во всех режимах)"""
+    flushed = ['history'] if draw_history is not None and draw_history.flush() else []
+    if _journal is not None:
+        if force or _journal.size >= journal_compact_bytes:
+            compact_journal()
+        return flushed
+    if _sqlite is not None:
+        # Каждое изменение уже закоммичено в базу
+        return flushed
+    return flushed + flush_dirty()
+
+def migrate_json_to_sqlite(storage):
+    """Одноразовый перенос JSON-файлов в базу SQLite"""
+    members = load_json_file(MEMBERS_FILE)
+    stats = load_json_file(STATS_FILE)
+    used = load_json_file(LAST_USED_FILE)
+    settings = {chat_id: settings_of(value) for chat_id, value in load_json_file(GROUP_SETTINGS_FILE).items()}
+    storage.import_data(members, stats, used, settings)
+    logger.info("✅ Перенесено в SQLite: %d чатов с участниками, %d со статистикой", len(members), len(stats))
+
+def migrate_json_to_chats(store):
+    """Одноразовое разделение общих JSON-файлов по файлам чатов"""
+    members = load_json_file(MEMBERS_FILE)
+    stats = load_json_file(STATS_FILE)
+    used = load_json_file(LAST_USED_FILE)
+    settings = {chat_id: settings_of(value) for chat_id, value in load_json_file(GROUP_SETTINGS_FILE).items()}
+    count = store.import_data(members, stats, used, settings)
+    logger.info("✅ Общие файлы разделены по чатам: %d файлов в %s", count, store.directory)
+
+def _has_json_files():
+    return any(os.path.exists(p) for p in (MEMBERS_FILE, STATS_FILE, LAST_USED_FILE, GROUP_SETTINGS_FILE))
+
+def close_storage():
+    """Закрывает журнал или базу при завершении"""
+    global _journal, _sqlite, _chat_files, draw_history
+    draw_history = None
+    if _journal is not None:
+        _journal.close()
+        _journal = None
+    if _sqlite is not None:
+        _sqlite.close()
+        _sqlite = None
+    _chat_files = None
+    _loaded_chats.clear()
+
+def load_all_data():
+    global _journal, _sqlite, _chat_files, draw_history
+    draw_history = DrawHistory(HISTORY_DIR, hot_chats_limit)
+    if storage_mode == 'sqlite':
+        load_phrases()
+        _sqlite = SqliteStorage(SQLITE_FILE)
+        if _sqlite.is_empty() and _has_json_files():
+            migrate_json_to_sqlite(_sqlite)
+        return
+    if storage_mode == 'chats':
+        load_phrases()
+        _chat_files = ChatFileStore(CHATS_DIR)
+        if _chat_files.is_empty() and _has_json_files():
+            migrate_json_to_chats(_chat_files)
+        return
+    
+    load_last_used()
+    load_members()
+    load_stats()
+    load_phrases()
+    load_group_settings()
+    
+    if storage_mode == 'journal':
+        _journal = Journal(JOURNAL_FILE)
+        replayed = _journal.replay(apply_record)
+        _journal.open()
+        logger.info("📜 Журнал %s: применено %d записей", JOURNAL_FILE, replayed)
+        if replayed:
+            compact_journal()
+
+def save_all_data():
+    if _sqlite is not None or _chat_files is not None:
+        # В памяти только часть чатов — общие JSON-файлы перезаписывать нельзя
+        return
+    save_last_used()
+    save_members()
+    save_stats()
+    save_group_settings()
+
+STORE_SAVERS = {
+    'members': save_members,
+    'stats': save_stats,
+    'last_used': save_last_used,
+    'settings': save_group_settings,
+}
+    
+def get_chat_members():
     return chat_members
\ No newline at end of file
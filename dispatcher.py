@@ -0,0 +1,109 @@
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+class _Call:
+    """Задача для шарда чата вместо обновления (см. ChatDispatcher.call)"""
+    
+    __slots__ = ('func', 'args')
+    
+    def __init__(self, func, args):
+        self.func = func
+        self.args = args
+
+def update_chat_id(update):
+    """id чата, к которому относится обновление, или None"""
+    for field in ('message', 'edited_message', 'channel_post', 'edited_channel_post',
+                  'my_chat_member', 'chat_member', 'chat_join_request'):
+        obj = getattr(update, field, None)
+        if obj is not None:
+            return obj.chat.id
+    callback = getattr(update, 'callback_query', None)
+    if callback is not None and callback.message is not None:
+        return callback.message.chat.id
+    return None
+
+class ChatDispatcher:
+    """Раздача обновлений по шардам: очередь и поток на каждый шард
+    
+    Шард выбирается по chat.id, поэтому обновления одного чата
+    обрабатываются строго по очереди, а разные чаты — параллельно.
+    Проверка last_used и запись победителя в /clown не могут
+    пересечься для одного чата.
+    
+    done(update_id) вызывается, когда обновление обработано (в том
+    числе с ошибкой) — по нему UpdateTracker двигает сохраняемый offset.
+    """
+    
+    def __init__(self, handle, shards=4, max_queue=1000, done=None):
+        self.handle = handle
+        self.done = done
+        self._queues = [queue.Queue(maxsize=max_queue) for _ in range(shards)]
+        self._threads = []
+    
+    @property
+    def shards(self):
+        return len(self._queues)
+    
+    def start(self):
+        if self._threads:
+            return
+        for i, q in enumerate(self._queues):
+            thread = threading.Thread(target=self._run, args=(q,), name=f'shard-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info("Шардов обработки: %d", self.shards)
+    
+    def shard_for(self, update):
+        chat_id = update_chat_id(update)
+        key = chat_id if chat_id is not None else update.update_id
+        return key % self.shards
+    
+    def submit(self, updates):
+        """Ставит обновления в очереди шардов; при переполнении ждёт"""
+        for update in updates:
+            q = self._queues[self.shard_for(update)]
+            if q.full():
+                logger.debug("Очередь шарда переполнена (%d), ждём...", q.qsize())
+            q.put(update)
+    
+    def call(self, chat_id, func, *args):
+        """Выполняет func(*args) в шарде чата, по очереди с его обновлениями"""
+        q = self._queues[int(chat_id) % self.shards]
+        if q.full():
+            logger.debug("Очередь шарда переполнена (%d), ждём...", q.qsize())
+        q.put(_Call(func, args))
+    
+    def depths(self):
+        """Длина очереди каждого шарда"""
+        return [q.qsize() for q in self._queues]
+    
+    def stop(self):
+        """Остановка; уже принятые обновления обрабатываются до конца"""
+        for q in self._queues:
+            q.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+    
+    def _run(self, q):
+        while True:
+            update = q.get()
+            if update is _STOP:
+                return
+            if isinstance(update, _Call):
+                try:
+                    update.func(*update.args)
+                except Exception as e:
+                    logger.error("❌ Ошибка задачи %s: %s", update.func.__name__, e)
+                continue
+            try:
+                self.handle([update])
+            except Exception as e:
+                logger.error("❌ Ошибка обработки обновления %s: %s", update.update_id, e)
+            if self.done is not None:
+                self.done(update.update_id)
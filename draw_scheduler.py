@@ -0,0 +1,146 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta, time as day_start
+from zoneinfo import ZoneInfo
+import data_manager
+
+logger = logging.getLogger(__name__)
+
+MAX_WAIT = 60  # перепроверять очередь не реже (сек), на случай перевода часов
+
+class DrawScheduler:
+    """Автоматический розыгрыш дня в полночь по часам каждого чата
+    
+    В расписании только чаты с часовым поясом (/settimezone). Для
+    каждого заранее считается следующая полночь по его времени плюс
+    постоянный сдвиг до window секунд по хешу chat_id, чтобы чаты
+    одного пояса не разыгрывались в одну секунду. Созревшие чаты
+    берутся пачками по batch штук с паузой pause между пачками и
+    передаются в draw(chat_id); draw сам проверяет last_used, так что
+    чат, где уже выбирали сегодня вручную, пропускается.
+    """
+    
+    def __init__(self, draw, window=600, batch=50, pause=1.0):
+        self.draw = draw
+        self.window = window
+        self.batch = batch
+        self.pause = pause
+        self._heap = []  # (время запуска, seq, chat_id, timezone)
+        self._current = {}  # chat_id -> seq действующей записи в куче
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+    
+    def start(self):
+        """Строит расписание по сохранённым часовым поясам и запускает поток"""
+        zones = data_manager.scheduled_chats()
+        now = time.time()
+        with self._cond:
+            for chat_id, timezone in zones.items():
+                # После перезапуска сегодняшний розыгрыш догоняется сразу
+                self._add(chat_id, timezone, now, catch_up=True)
+            self._running = True
+        data_manager.set_timezone_listener(self.schedule)
+        self._thread = threading.Thread(target=self._run, name='draws', daemon=True)
+        self._thread.start()
+        logger.info("⏰ Автоматический розыгрыш: %s чатов, окно %sс, пачки по %s", len(self._current), self.window, self.batch)
+    
+    def stop(self):
+        data_manager.set_timezone_listener(None)
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+    
+    def scheduled(self):
+        with self._cond:
+            return len(self._current)
+    
+    def schedule(self, chat_id, timezone):
+        """Ставит чат в расписание по новому часовому поясу или убирает (timezone=None)"""
+        with self._cond:
+            if timezone:
+                self._add(chat_id, timezone, time.time())
+            else:
+                self._current.pop(chat_id, None)
+            self._cond.notify()
+    
+    def next_run(self, chat_id, timezone, now, catch_up=False):
+        """Момент (unix time) ближайшего розыгрыша чата после now
+        
+        catch_up — если сегодняшний момент уже прошёл, вернуть now,
+        а не завтрашнюю полночь.
+        """
+        zone = ZoneInfo(timezone)
+        offset = zlib.crc32(chat_id.encode()) % self.window if self.window else 0
+        today = datetime.fromtimestamp(now, zone).date()
+        when = datetime.combine(today, day_start(0), tzinfo=zone).timestamp() + offset
+        if when > now:
+            return when
+        if catch_up:
+            return now
+        tomorrow = today + timedelta(days=1)
+        return datetime.combine(tomorrow, day_start(0), tzinfo=zone).timestamp() + offset
+    
+    def _add(self, chat_id, timezone, now, catch_up=False):
+        try:
+            when = self.next_run(chat_id, timezone, now, catch_up)
+        except Exception as e:
+            logger.error("❌ Часовой пояс %s чата %s: %s", timezone, chat_id, e)
+            self._current.pop(chat_id, None)
+            return
+        seq = next(self._seq)
+        # Старая запись чата остаётся в куче и пропускается по seq
+        self._current[chat_id] = seq
+        heapq.heappush(self._heap, (when, seq, chat_id, timezone))
+    
+    def _take_due(self):
+        """Ждёт созревшие чаты и возвращает пачку; None после stop()"""
+        with self._cond:
+            while self._running:
+                now = time.time()
+                while self._heap and self._current.get(self._heap[0][2]) != self._heap[0][1]:
+                    heapq.heappop(self._heap)
+                if self._heap and self._heap[0][0] <= now:
+                    break
+                timeout = min(self._heap[0][0] - now, MAX_WAIT) if self._heap else MAX_WAIT
+                self._cond.wait(timeout)
+            else:
+                return None
+            
+            due = []
+            while self._heap and self._heap[0][0] <= now and len(due) < self.batch:
+                _, seq, chat_id, timezone = heapq.heappop(self._heap)
+                if self._current.get(chat_id) != seq:
+                    continue
+                due.append(chat_id)
+                self._add(chat_id, timezone, now)
+            more = bool(self._heap) and self._heap[0][0] <= now
+            return due, more
+    
+    def _run(self):
+        while True:
+            taken = self._take_due()
+            if taken is None:
+                return
+            due, more = taken
+            for chat_id in due:
+                try:
+                    self.draw(chat_id)
+                except Exception as e:
+                    logger.error("❌ Автоматический розыгрыш в чате %s: %s", chat_id, e)
+            logger.debug("Автоматический розыгрыш: пачка из %d чатов", len(due))
+            if more:
+                # Остальные созревшие чаты — следующей пачкой, не все сразу
+                deadline = time.monotonic() + self.pause
+                with self._cond:
+                    # schedule() тоже будит поток, паузу дожидаемся до конца
+                    while self._running and time.monotonic() < deadline:
+                        self._cond.wait(deadline - time.monotonic())
@@ -0,0 +1,339 @@
+"""Локальный поддельный сервер Telegram Bot API для нагрузочных тестов
+
+Понимает getMe, getUpdates (long polling), sendMessage и
+getChatAdministrators (плюс deleteWebhook/setWebhook как заглушки),
+умеет добавлять задержку, отвечать 429 и ошибками 500 с заданной
+вероятностью, генерировать команды от участников многих чатов и мерить
+время от появления обновления до ответа бота на него.
+    
+    python fake_api.py --port 8081 --chats 100 --rate 20 --rate-limit 0.01
+    BOT_API_URL=http://127.0.0.1:8081 BOT_TOKEN=123:fake python main.py
+"""
+import argparse
+import itertools
+import json
+import logging
+import random
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import parse_qsl, urlsplit
+
+logger = logging.getLogger(__name__)
+
+BOT_USER = {
+    'id': 1, 'is_bot': True, 'first_name': 'Clown', 'username': 'fake_clown_bot',
+    'can_join_groups': True, 'can_read_all_group_messages': False, 'supports_inline_queries': False,
+}
+ADMIN_RIGHTS = (
+    'can_be_edited', 'is_anonymous', 'can_manage_chat', 'can_delete_messages',
+    'can_manage_video_chats', 'can_restrict_members', 'can_promote_members',
+    'can_change_info', 'can_invite_users', 'can_post_stories', 'can_edit_stories',
+    'can_delete_stories',
+)
+# Команды генератора и их доля в трафике
+TRAFFIC = (
+    ('/register', 4),
+    ('/clown', 3),
+    ('/clownstats', 2),
+    ('/listmembers', 1),
+)
+
+def _percentile(samples, q):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+class FakeBotAPI:
+    """HTTP-сервер вида /bot<token>/<method> с очередью обновлений
+    
+    latency/jitter — задержка каждого ответа (сек), rate_limit и
+    error_rate — доля запросов (кроме getMe), на которые вернётся 429
+    с retry_after или 500.
+    """
+    
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, jitter=0.0,
+                 rate_limit=0.0, error_rate=0.0, retry_after=1, admins=3):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.admins = admins
+        self._updates = []
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+        self._cond = threading.Condition()
+        self._waiting = {}  # (chat_id, message_id) -> время появления обновления
+        self._latencies = []
+        self.counters = {'updates': 0, 'sends': 0, 'replies': 0, 'rate_limited': 0, 'errors': 0}
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+    
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fake-api', daemon=True)
+        self._thread.start()
+        logger.info("🧪 Поддельный Bot API: %s", self.url)
+    
+    def stop(self):
+        with self._cond:
+            self._cond.notify_all()
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join()
+    
+    def push_message(self, chat_id, text, user_id, username=None, first_name='User'):
+        """Добавляет обновление с сообщением от участника чата"""
+        now = time.monotonic()
+        message_id = next(self._message_ids)
+        command = text.split()[0] if text.startswith('/') else None
+        message = {
+            'message_id': message_id,
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'supergroup', 'title': f"Chat {chat_id}"},
+            'from': {'id': user_id, 'is_bot': False, 'first_name': first_name, 'username': username or f"user{user_id}"},
+            'text': text,
+        }
+        if command:
+            message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(command)}]
+        with self._cond:
+            self._updates.append({'update_id': next(self._update_ids), 'message': message})
+            self._waiting[(chat_id, message_id)] = now
+            self.counters['updates'] += 1
+            self._cond.notify_all()
+        return message_id
+    
+    def stats(self):
+        """Счётчики и задержка обновление → ответ (мс)"""
+        with self._cond:
+            latencies = list(self._latencies)
+            result = dict(self.counters)
+            result['unanswered'] = len(self._waiting)
+        result['reply_p50_ms'] = _percentile(latencies, 0.50) * 1000
+        result['reply_p99_ms'] = _percentile(latencies, 0.99) * 1000
+        return result
+    
+    # Методы Bot API
+    
+    def get_me(self, params):
+        return BOT_USER
+    
+    def get_updates(self, params):
+        offset = int(params.get('offset') or 0)
+        limit = int(params.get('limit') or 100)
+        deadline = time.monotonic() + float(params.get('timeout') or 0)
+        with self._cond:
+            # offset подтверждает всё, что раньше него
+            self._updates = [u for u in self._updates if u['update_id'] >= offset]
+            while not self._updates:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            return self._updates[:limit]
+    
+    def send_message(self, params):
+        chat_id = int(params['chat_id'])
+        reply_to = params.get('reply_to_message_id')
+        reply_parameters = params.get('reply_parameters')
+        if isinstance(reply_parameters, dict):
+            reply_to = reply_parameters.get('message_id')
+        now = time.monotonic()
+        with self._cond:
+            self.counters['sends'] += 1
+            if reply_to is not None:
+                started = self._waiting.pop((chat_id, int(reply_to)), None)
+                if started is not None:
+                    self.counters['replies'] += 1
+                    self._latencies.append(now - started)
+        return {
+            'message_id': next(self._message_ids),
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'supergroup', 'title': f"Chat {chat_id}"},
+            'from': BOT_USER,
+            'text': params.get('text', ''),
+        }
+    
+    def get_chat_administrators(self, params):
+        members = []
+        for i in range(self.admins):
+            user = {'id': 900 + i, 'is_bot': False, 'first_name': f"Admin {i}", 'username': f"admin{i}"}
+            if i == 0:
+                members.append({'status': 'creator', 'user': user, 'is_anonymous': False})
+            else:
+                member = {'status': 'administrator', 'user': user}
+                member.update({right: False for right in ADMIN_RIGHTS})
+                members.append(member)
+        return members
+    
+    def set_webhook(self, params):
+        return True
+    
+    METHODS = {
+        'getme': get_me,
+        'getupdates': get_updates,
+        'sendmessage': send_message,
+        'getchatadministrators': get_chat_administrators,
+        'deletewebhook': set_webhook,
+        'setwebhook': set_webhook,
+    }
+    
+    def call(self, method, params):
+        """(HTTP-код, тело ответа) для вызова method"""
+        if self.latency or self.jitter:
+            time.sleep(self.latency + random.uniform(0, self.jitter))
+        handler = self.METHODS.get(method.lower())
+        if handler is None:
+            return 404, {'ok': False, 'error_code': 404, 'description': 'Not Found: method not found'}
+        if method.lower() != 'getme':
+            roll = random.random()
+            if roll < self.rate_limit:
+                with self._cond:
+                    self.counters['rate_limited'] += 1
+                return 429, {
+                    'ok': False, 'error_code': 429,
+                    'description': f"Too Many Requests: retry after {self.retry_after}",
+                    'parameters': {'retry_after': self.retry_after},
+                }
+            if roll < self.rate_limit + self.error_rate:
+                with self._cond:
+                    self.counters['errors'] += 1
+                return 500, {'ok': False, 'error_code': 500, 'description': 'Internal Server Error'}
+        return 200, {'ok': True, 'result': handler(self, params)}
+    
+    def _make_handler(self):
+        api = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            
+            def do_GET(self):
+                self._handle()
+            
+            def do_POST(self):
+                self._handle()
+            
+            def _handle(self):
+                parts = urlsplit(self.path)
+                segments = parts.path.strip('/').split('/')
+                if len(segments) != 2 or not segments[0].startswith('bot'):
+                    self._respond(404, {'ok': False, 'error_code': 404, 'description': 'Not Found'})
+                    return
+                params = dict(parse_qsl(parts.query))
+                params.update(self._read_body())
+                # Вложенные объекты (reply_parameters и т. п.) приходят JSON-строкой
+                for key, value in params.items():
+                    if isinstance(value, str) and value[:1] in '{[':
+                        try:
+                            params[key] = json.loads(value)
+                        except ValueError:
+                            pass
+                try:
+                    code, body = api.call(segments[1], params)
+                except Exception as e:
+                    logger.error("Поддельный API: ошибка %s: %s", segments[1], e)
+                    code, body = 400, {'ok': False, 'error_code': 400, 'description': f"Bad Request: {e}"}
+                self._respond(code, body)
+            
+            def _read_body(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                if not length:
+                    return {}
+                raw = self.rfile.read(length)
+                content_type = self.headers.get('Content-Type', '')
+                if content_type.startswith('application/json'):
+                    return json.loads(raw)
+                if content_type.startswith('application/x-www-form-urlencoded'):
+                    return dict(parse_qsl(raw.decode('utf-8')))
+                return {}
+            
+            def _respond(self, code, body):
+                data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+                self.send_response(code)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            
+            def log_message(self, format, *args):
+                logger.debug("Поддельный API: " + format % args)
+        
+        return Handler
+
+class TrafficGenerator:
+    """Поток, который шлёт rate команд в секунду от участников chats чатов"""
+    
+    def __init__(self, api, chats=100, users=20, rate=10.0, traffic=TRAFFIC):
+        self.api = api
+        self.chats = [-1000000000000 - i for i in range(chats)]
+        self.users = users
+        self.rate = rate
+        self._commands = [command for command, weight in traffic for _ in range(weight)]
+        self._stopped = threading.Event()
+        self._thread = None
+    
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='traffic', daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        self._stopped.set()
+        if self._thread:
+            self._thread.join()
+    
+    def _run(self):
+        interval = 1.0 / self.rate
+        next_at = time.monotonic()
+        while not self._stopped.is_set():
+            chat_id = random.choice(self.chats)
+            user_id = abs(chat_id) % 100000 * self.users + random.randrange(self.users)
+            self.api.push_message(chat_id, random.choice(self._commands), user_id)
+            next_at += interval
+            self._stopped.wait(max(0.0, next_at - time.monotonic()))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--chats', type=int, default=100, help='чатов в генераторе')
+    parser.add_argument('--users', type=int, default=20, help='участников в чате')
+    parser.add_argument('--rate', type=float, default=10.0, help='команд в секунду (0 — без генератора)')
+    parser.add_argument('--latency', type=float, default=0.0, help='задержка ответа (сек)')
+    parser.add_argument('--jitter', type=float, default=0.0, help='случайная добавка к задержке (сек)')
+    parser.add_argument('--rate-limit', type=float, default=0.0, help='доля ответов 429')
+    parser.add_argument('--errors', type=float, default=0.0, help='доля ответов 500')
+    parser.add_argument('--retry-after', type=int, default=1, help='retry_after в ответах 429')
+    parser.add_argument('--duration', type=float, default=0.0, help='сколько работать (сек, 0 — до Ctrl+C)')
+    parser.add_argument('--report', type=float, default=10.0, help='как часто печатать статистику (сек)')
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
+    api = FakeBotAPI(args.host, args.port, args.latency, args.jitter, args.rate_limit, args.errors, args.retry_after)
+    api.start()
+    generator = None
+    if args.rate > 0:
+        generator = TrafficGenerator(api, args.chats, args.users, args.rate)
+        generator.start()
+    
+    deadline = time.monotonic() + args.duration if args.duration else None
+    try:
+        while deadline is None or time.monotonic() < deadline:
+            time.sleep(args.report if deadline is None else min(args.report, max(0.0, deadline - time.monotonic())))
+            logger.info(json.dumps(api.stats()))
+    except KeyboardInterrupt:
+        pass
+    if generator:
+        generator.stop()
+    api.stop()
+    logger.info(json.dumps(api.stats()))
+
+if __name__ == '__main__':
+    main()
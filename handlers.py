@@ -1,322 +1,484 @@
-import logging
-import random
-import time
-import json
-import os
-from datetime import date
-import data_manager
-from config import MEMBERS_FILE
-
-logger = logging.getLogger(__name__)
-
-def register_handlers(bot):
-    """Регистрирует все обработчики команд"""
-    
-    @bot.message_handler(commands=['start'])
-    def start(message):
-        logger.info(f"/start от {message.from_user.id} в чате {message.chat.id}")
-        help_text = """
-🤖 <b>Бот для определения клоуна/пидора дня!</b>
-
-🎪 <b>Основные команды:</b>
-/clown или /pidor - Определить победителя дня (раз в сутки)
-/clownstats или /pidorstats - Показать полную статистику
-
-📝 <b>Саморегистрация:</b>
-/register - Добавить себя в список участников
-/unregister - Удалить себя из списка участников
-
-⚙️ <b>Настройка режима:</b>
-/setmode clown - режим "Клоун дня"
-/setmode pidor - режим "Пидор дня"
-
-👥 <b>Управление участниками:</b>
-/addmember @username имя - добавить участника
-/removemember @username - удалить участника
-/listmembers - показать список участников
-/initmembers - создать список из администраторов
-"""
-        bot.reply_to(message, help_text)
-
-    @bot.message_handler(commands=['help'])
-    def help_cmd(message):
-        start(message)
-
-    @bot.message_handler(commands=['clown', 'pidor'])
-    def clown(message):
-        chat_id = str(message.chat.id)
-        today = str(date.today())
-        
-        logger.info(f"🎪 /clown от {message.from_user.id} в чате {chat_id}")
-        
-        # Используем data_manager.last_used ВЕЗДЕ
-        if chat_id in data_manager.last_used and data_manager.last_used[chat_id] == today:
-            logger.info(f"В чате {chat_id} уже выбирали сегодня")
-            show_stats(message, chat_id)
-            return
-        
-        members = data_manager.get_members_for_chat(chat_id)
-        if not members:
-            bot.reply_to(message, 
-                "❌ Нет списка участников!\n"
-                "/addmember @username - добавить участника\n"
-                "/initmembers - создать список из админов"
-            )
-            return
-        
-        winner = random.choice(members)
-        logger.info(f"Победитель: {winner.get('name')} (@{winner.get('username')})")
-        
-        phrases = data_manager.get_phrases_for_chat(message.chat.id)
-        pre_phrases = phrases.get('pre', ["Кто же сегодня будет выбран? 🤔"])
-        bot.reply_to(message, random.choice(pre_phrases))
-        
-        time.sleep(1)
-        
-        winner_name = winner.get('name', 'Неизвестный')
-        winner_username = winner.get('username', '')
-        username_display = f"@{winner_username}" if winner_username else winner_name
-        
-        result_template = phrases.get('result', "{name} ({username})")
-        result_text = result_template.format(name=winner_name, username=username_display)
-        bot.send_message(message.chat.id, result_text)
-        
-        stats = data_manager.load_stats()
-        if chat_id not in stats:
-            stats[chat_id] = {}
-        
-        user_key = winner_username or str(winner.get('id', winner_name))
-        if user_key not in stats[chat_id]:
-            stats[chat_id][user_key] = {
-                'name': winner_name,
-                'username': winner_username,
-                'count': 0
-            }
-        stats[chat_id][user_key]['count'] += 1
-        data_manager.save_stats(stats)
-        
-        data_manager.last_used[chat_id] = today
-        data_manager.save_all_data()
-        logger.info(f"✅ clown выполнен для чата {chat_id}")
-
-    def show_stats(message, chat_id):
-        stats = data_manager.load_stats()
-        if chat_id not in stats or not stats[chat_id]:
-            bot.reply_to(message, "Статистика пока пуста!")
-            return
-        
-        sorted_stats = sorted(stats[chat_id].items(), key=lambda x: x[1]['count'], reverse=True)
-        mode = data_manager.get_chat_mode(chat_id)
-        mode_names = {'clown': '🤡 клоун', 'pidor': '🏳️‍🌈 пидор', 'default': '🎯 победитель'}
-        mode_name = mode_names.get(mode, 'победитель')
-        
-        response = f"📊 Сегодняшний {mode_name} уже выбран!\n\nСтатистика:\n"
-        for i, (uid, udata) in enumerate(sorted_stats[:10], 1):
-            uname = f"@{udata['username']}" if udata.get('username') else udata['name']
-            response += f"{i}. {udata['name']} ({uname}) - {udata['count']} раз(а)\n"
-        bot.reply_to(message, response)
-
-    @bot.message_handler(commands=['clownstats', 'pidorstats'])
-    def stats_cmd(message):
-        chat_id = str(message.chat.id)
-        stats = data_manager.load_stats()
-        
-        if chat_id not in stats or not stats[chat_id]:
-            bot.reply_to(message, "Статистика пока пуста! Используйте /clown")
-            return
-        
-        sorted_stats = sorted(stats[chat_id].items(), key=lambda x: x[1]['count'], reverse=True)
-        mode = data_manager.get_chat_mode(chat_id)
-        mode_names = {'clown': '🤡 клоунов', 'pidor': '🏳️‍🌈 пидоров', 'default': '🎯 победителей'}
-        mode_name = mode_names.get(mode, 'победителей')
-        
-        response = f"🏆 Статистика {mode_name}:\n\n"
-        for i, (uid, udata) in enumerate(sorted_stats, 1):
-            uname = f"@{udata['username']}" if udata.get('username') else udata['name']
-            response += f"{i}. {udata['name']} ({uname}) - {udata['count']} раз(а)\n"
-        bot.reply_to(message, response)
-
-    @bot.message_handler(commands=['register'])
-    def register(message):
-        chat_id = str(message.chat.id)
-        user = message.from_user
-        
-        logger.info(f"📝 /register: user={user.id} (@{user.username}) в чате {chat_id}")
-        
-        if user.is_bot:
-            bot.reply_to(message, "❌ Боты не могут регистрироваться!")
-            return
-        
-        if chat_id not in data_manager.chat_members:
-            data_manager.chat_members[chat_id] = []
-            logger.info(f"  Создан новый список для чата {chat_id}")
-        
-        for member in data_manager.chat_members[chat_id]:
-            if member.get('id') == user.id:
-                bot.reply_to(message, "❌ Вы уже зарегистрированы!")
-                return
-        
-        new_member = {
-            'id': user.id,
-            'username': user.username or "",
-            'name': f"{user.first_name or ''} {user.last_name or ''}".strip() or "Без имени",
-            'active': True,
-            'added_by': 'self_registration',
-            'added_date': str(date.today())
-        }
-        data_manager.chat_members[chat_id].append(new_member)
-        data_manager.save_all_data()
-        
-        logger.info(f"  ✅ Зарегистрирован: {new_member['name']}")
-        logger.info(f"  Всего в чате {chat_id}: {len(data_manager.chat_members[chat_id])} участников")
-        bot.reply_to(message, f"✅ Зарегистрирован: {new_member['name']}")
-
-    @bot.message_handler(commands=['unregister'])
-    def unregister(message):
-        chat_id = str(message.chat.id)
-        user_id = message.from_user.id
-        
-        if chat_id not in data_manager.chat_members:
-            bot.reply_to(message, "❌ Нет списка участников!")
-            return
-        
-        old_len = len(data_manager.chat_members[chat_id])
-        data_manager.chat_members[chat_id] = [
-            m for m in data_manager.chat_members[chat_id] 
-            if m.get('id') != user_id
-        ]
-        
-        if len(data_manager.chat_members[chat_id]) < old_len:
-            data_manager.save_all_data()
-            bot.reply_to(message, "✅ Вы удалены из списка")
-        else:
-            bot.reply_to(message, "❌ Вы не найдены в списке")
-
-    @bot.message_handler(commands=['addmember'])
-    def addmember(message):
-        chat_id = str(message.chat.id)
-        args = message.text.split()[1:]
-        
-        if not args:
-            bot.reply_to(message, "/addmember @username [имя]")
-            return
-        
-        username = args[0].replace('@', '')
-        name = args[1] if len(args) > 1 else username
-        
-        if chat_id not in data_manager.chat_members:
-            data_manager.chat_members[chat_id] = []
-        
-        for member in data_manager.chat_members[chat_id]:
-            if member.get('username') == username:
-                bot.reply_to(message, f"❌ @{username} уже в списке!")
-                return
-        
-        data_manager.chat_members[chat_id].append({
-            'username': username,
-            'name': name,
-            'active': True,
-            'added_by': message.from_user.username or message.from_user.first_name,
-            'added_date': str(date.today())
-        })
-        data_manager.save_all_data()
-        bot.reply_to(message, f"✅ Добавлен: {name} (@{username})")
-
-    @bot.message_handler(commands=['removemember'])
-    def removemember(message):
-        chat_id = str(message.chat.id)
-        args = message.text.split()[1:]
-        
-        if not args:
-            bot.reply_to(message, "/removemember @username")
-            return
-        
-        username = args[0].replace('@', '')
-        
-        if chat_id not in data_manager.chat_members:
-            bot.reply_to(message, "❌ Нет списка участников!")
-            return
-        
-        old_len = len(data_manager.chat_members[chat_id])
-        data_manager.chat_members[chat_id] = [
-            m for m in data_manager.chat_members[chat_id] 
-            if m.get('username') != username
-        ]
-        
-        if len(data_manager.chat_members[chat_id]) < old_len:
-            data_manager.save_all_data()
-            bot.reply_to(message, f"✅ @{username} удалён")
-        else:
-            bot.reply_to(message, f"❌ @{username} не найден")
-
-    @bot.message_handler(commands=['listmembers'])
-    def listmembers(message):
-        chat_id = str(message.chat.id)
-        
-        if chat_id not in data_manager.chat_members or not data_manager.chat_members[chat_id]:
-            bot.reply_to(message, "📭 Список пуст!")
-            return
-        
-        members = data_manager.chat_members[chat_id]
-        active = len([m for m in members if m.get('active', True)])
-        
-        response = f"👥 Участники ({active} из {len(members)}):\n\n"
-        for i, m in enumerate(members, 1):
-            status = "✅" if m.get('active', True) else "❌"
-            username = f"@{m['username']}" if m.get('username') else "без @"
-            response += f"{i}. {status} {m.get('name', '?')} {username}\n"
-        
-        bot.reply_to(message, response)
-
-    @bot.message_handler(commands=['initmembers'])
-    def initmembers(message):
-        chat_id = str(message.chat.id)
-        
-        try:
-            admins = bot.get_chat_administrators(message.chat.id)
-            
-            if chat_id not in data_manager.chat_members:
-                data_manager.chat_members[chat_id] = []
-            
-            added = 0
-            for admin in admins:
-                user = admin.user
-                if user.is_bot or not user.username:
-                    continue
-                
-                if not any(m.get('username') == user.username for m in data_manager.chat_members[chat_id]):
-                    data_manager.chat_members[chat_id].append({
-                        'id': user.id,
-                        'username': user.username,
-                        'name': user.first_name or "Без имени",
-                        'active': True,
-                        'added_by': 'system',
-                        'added_date': str(date.today())
-                    })
-                    added += 1
-            
-            data_manager.save_all_data()
-            bot.reply_to(message, f"✅ Добавлено {added} администраторов" if added else "ℹ️ Все уже в списке")
-            
-        except Exception as e:
-            logger.error(f"initmembers error: {e}")
-            bot.reply_to(message, "❌ Бот должен быть администратором чата!")
-
-    @bot.message_handler(commands=['setmode'])
-    def setmode(message):
-        chat_id = str(message.chat.id)
-        args = message.text.split()[1:]
-        
-        if not args:
-            mode = data_manager.get_chat_mode(chat_id)
-            bot.reply_to(message, f"Текущий режим: {mode}\nДоступные: clown, pidor")
-            return
-        
-        mode = args[0].lower()
-        if mode not in ['clown', 'pidor']:
-            bot.reply_to(message, "❌ clown или pidor")
-            return
-        
-        data_manager.group_settings[chat_id] = mode
-        data_manager.save_group_settings()
-        bot.reply_to(message, f"✅ Режим: {mode}")
\ No newline at end of file
+import functools
+import html
+import logging
+import random
+import json
+import os
+import re
+import time
+from datetime import date
+from zoneinfo import ZoneInfo
+import data_manager
+from telebot import types
+from config import MEMBERS_FILE, REVEAL_DELAY, STATS_PAGE_SIZE
+from timers import TimerQueue
+from outbox import Outbox, PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW
+from metrics import HANDLER_SECONDS
+
+logger = logging.getLogger(__name__)
+
+HELP_TEXT = """
+🤖 <b>Бот для определения клоуна/пидора дня!</b>
+
+🎪 <b>Основные команды:</b>
+/clown или /pidor - Определить победителя дня (раз в сутки)
+/clownstats или /pidorstats - Показать полную статистику
+/clownstats week|month|year - Статистика за неделю, месяц или год
+
+📝 <b>Саморегистрация:</b>
+/register - Добавить себя в список участников
+/unregister - Удалить себя из списка участников
+
+⚙️ <b>Настройка режима:</b>
+/setmode clown - режим "Клоун дня"
+/setmode pidor - режим "Пидор дня"
+/settimezone Europe/Moscow - часовой пояс чата (день считается по нему)
+
+👥 <b>Управление участниками:</b>
+/addmember @username имя - добавить участника
+/removemember @username - удалить участника
+/listmembers - показать список участников
+/initmembers - создать список из администраторов
+"""
+
+NO_MEMBERS_TEXT = (
+    "❌ Нет списка участников!\n"
+    "/addmember @username - добавить участника\n"
+    "/initmembers - создать список из админов"
+)
+
+MAX_MESSAGE_LENGTH = 4096  # ограничение Telegram на текст сообщения
+
+# Логика команд не зависит от библиотеки: функции ниже возвращают текст
+# ответа, а обёртки в register_handlers (telebot) и в async_handlers
+# (python-telegram-bot) только отправляют его. Сообщения уходят с
+# parse_mode HTML, поэтому имена и username экранируются через esc().
+
+def esc(text):
+    return html.escape(str(text), quote=False)
+
+def format_stats_lines(entries, start=1):
+    """Строки вида '1. Имя (@username) - N раз(а)', нумерация с start"""
+    lines = []
+    for i, (uid, udata) in enumerate(entries, start):
+        uname = f"@{udata['username']}" if udata.get('username') else udata['name']
+        lines.append(f"{i}. {esc(udata['name'])} ({esc(uname)}) - {udata['count']} раз(а)\n")
+    return lines
+
+def render_today_stats(board, mode):
+    """Ответ на повторный /clown: топ-10"""
+    mode_names = {'clown': '🤡 клоун', 'pidor': '🏳️‍🌈 пидор', 'default': '🎯 победитель'}
+    mode_name = mode_names.get(mode, 'победитель')
+    header = f"📊 Сегодняшний {mode_name} уже выбран!\n\nСтатистика:\n"
+    return header + ''.join(format_stats_lines(board.top(10)))
+
+PERIOD_ALIASES = {
+    'week': 'week', 'неделя': 'week',
+    'month': 'month', 'месяц': 'month',
+    'year': 'year', 'год': 'year',
+}
+PERIOD_NAMES = {'week': 'неделю', 'month': 'месяц', 'year': 'год'}
+
+def render_stats_page(board, mode, page, period=None, key=None):
+    """Страница /clownstats: STATS_PAGE_SIZE строк таблицы и номер страницы"""
+    mode_names = {'clown': '🤡 клоунов', 'pidor': '🏳️‍🌈 пидоров', 'default': '🎯 победителей'}
+    mode_name = mode_names.get(mode, 'победителей')
+    if period is None:
+        header = f"🏆 Статистика {mode_name}:\n\n"
+    else:
+        header = f"🏆 Статистика {mode_name} за {PERIOD_NAMES[period]} {esc(key)}:\n\n"
+    entries = board.page(page, STATS_PAGE_SIZE)
+    text = header + ''.join(format_stats_lines(entries, page * STATS_PAGE_SIZE + 1))
+    pages = board.pages(STATS_PAGE_SIZE)
+    if pages > 1:
+        text += f"\nСтраница {page + 1} из {pages}"
+    if len(text) > MAX_MESSAGE_LENGTH:
+        # Очень длинные имена: обрезаем по последней целой строке
+        text = text[:text.rfind('\n', 0, MAX_MESSAGE_LENGTH)]
+    return text
+
+def today_stats_text(chat_id):
+    board = data_manager.get_leaderboard(chat_id)
+    if not board:
+        return "Статистика пока пуста!"
+    mode = data_manager.get_chat_mode(chat_id)
+    return board.render(('today', mode), lambda: render_today_stats(board, mode))
+
+PERIOD_KEY_PATTERNS = {
+    'week': re.compile(r'\d{4}-W\d{2}'),
+    'month': re.compile(r'\d{4}-\d{2}'),
+    'year': re.compile(r'\d{4}'),
+}
+STATS_CALLBACK = 'stats'
+
+def stats_page(chat_id, page=0, period=None, key=None):
+    """(текст, кнопки) страницы статистики; кнопки — [(подпись, callback_data), ...]
+
+    Текст страницы берётся из кеша таблицы: он строится один раз и
+    сбрасывается вместе с таблицей, когда засчитывается победа.
+    """
+    if period is None:
+        board = data_manager.get_leaderboard(chat_id)
+        if not board:
+            return "Статистика пока пуста! Используйте /clown", []
+    else:
+        key, board = data_manager.get_period_leaderboard(chat_id, period, key)
+        if not board:
+            return f"За {PERIOD_NAMES[period]} {esc(key)} побед пока нет", []
+    
+    pages = board.pages(STATS_PAGE_SIZE)
+    page = min(max(page, 0), pages - 1)
+    mode = data_manager.get_chat_mode(chat_id)
+    text = board.render(('page', mode, page), lambda: render_stats_page(board, mode, page, period, key))
+    
+    suffix = f":{period}:{key}" if period is not None else ''
+    buttons = []
+    if page > 0:
+        buttons.append(("◀️ Назад", f"{STATS_CALLBACK}:{page - 1}{suffix}"))
+    if page < pages - 1:
+        buttons.append(("Вперёд ▶️", f"{STATS_CALLBACK}:{page + 1}{suffix}"))
+    return text, buttons
+
+def stats_reply(chat_id, args=()):
+    """/clownstats [week|month|year [ключ периода: 2026-W42, 2026-10, 2026]] — первая страница"""
+    if not args:
+        return stats_page(chat_id)
+    period = PERIOD_ALIASES.get(args[0].lower())
+    if period is None:
+        return "❌ Период: week, month или year (можно с ключом: /clownstats month 2026-10)", []
+    key = args[1] if len(args) > 1 else None
+    if key is not None and not PERIOD_KEY_PATTERNS[period].fullmatch(key):
+        return "❌ Ключ периода: 2026-W42 для week, 2026-10 для month, 2026 для year", []
+    return stats_page(chat_id, 0, period, key)
+
+def stats_callback(chat_id, data):
+    """(текст, кнопки) по callback_data кнопки страницы или None, если данные чужие"""
+    parts = data.split(':')
+    if parts[0] != STATS_CALLBACK or len(parts) not in (2, 4) or not parts[1].isdigit():
+        return None
+    if len(parts) == 2:
+        return stats_page(chat_id, int(parts[1]))
+    period, key = parts[2], parts[3]
+    if period not in PERIOD_KEY_PATTERNS or not PERIOD_KEY_PATTERNS[period].fullmatch(key):
+        return None
+    return stats_page(chat_id, int(parts[1]), period, key)
+
+def draw_winner(chat_id, today):
+    """Выбирает и сразу засчитывает победителя дня
+    
+    Возвращает (pre_text, result_text) или None, если участников нет.
+    """
+    members = data_manager.get_members_for_chat(chat_id)
+    if not members:
+        return None
+    
+    winner = random.choice(members)
+    logger.info("Победитель: %s (@%s)", winner.get('name'), winner.get('username'), extra={'chat_id': chat_id})
+    
+    phrases = data_manager.get_phrases_for_chat(chat_id)
+    
+    # Фиксируем выбор сразу, чтобы повторный /clown не прошёл проверку
+    data_manager.increment_win(chat_id, winner)
+    data_manager.set_last_used(chat_id, today)
+    data_manager.record_draw(chat_id, today, winner)
+    
+    winner_name = winner.get('name', 'Неизвестный')
+    winner_username = winner.get('username', '')
+    username_display = f"@{winner_username}" if winner_username else winner_name
+    
+    result_text = phrases.render_result(name=winner_name, username=username_display)
+    return phrases.random_pre(), result_text
+
+def register_user(chat_id, user):
+    logger.debug("📝 /register: user=%s (@%s)", user.id, user.username, extra={'chat_id': chat_id})
+    
+    if user.is_bot:
+        return "❌ Боты не могут регистрироваться!"
+    
+    if data_manager.find_member(chat_id, user_id=user.id):
+        return "❌ Вы уже зарегистрированы!"
+    
+    new_member = {
+        'id': user.id,
+        'username': user.username or "",
+        'name': f"{user.first_name or ''} {user.last_name or ''}".strip() or "Без имени",
+        'active': True,
+        'added_by': 'self_registration',
+        'added_date': str(date.today())
+    }
+    data_manager.add_member(chat_id, new_member)
+    
+    logger.info("✅ Зарегистрирован: %s, всего участников: %d", new_member['name'],
+                len(data_manager.get_all_members(chat_id)), extra={'chat_id': chat_id})
+    return f"✅ Зарегистрирован: {esc(new_member['name'])}"
+
+def unregister_user(chat_id, user_id):
+    if not data_manager.get_all_members(chat_id):
+        return "❌ Нет списка участников!"
+    
+    if data_manager.remove_member(chat_id, user_id=user_id):
+        return "✅ Вы удалены из списка"
+    return "❌ Вы не найдены в списке"
+
+def add_member_by_name(chat_id, args, from_user):
+    if not args:
+        return "/addmember @username [имя]"
+    
+    username = args[0].replace('@', '')
+    name = args[1] if len(args) > 1 else username
+    
+    if data_manager.find_member(chat_id, username=username):
+        return f"❌ @{esc(username)} уже в списке!"
+    
+    data_manager.add_member(chat_id, {
+        'username': username,
+        'name': name,
+        'active': True,
+        'added_by': from_user.username or from_user.first_name,
+        'added_date': str(date.today())
+    })
+    return f"✅ Добавлен: {esc(name)} (@{esc(username)})"
+
+def remove_member_by_name(chat_id, args):
+    if not args:
+        return "/removemember @username"
+    
+    username = args[0].replace('@', '')
+    
+    if not data_manager.get_all_members(chat_id):
+        return "❌ Нет списка участников!"
+    
+    if data_manager.remove_member(chat_id, username=username):
+        return f"✅ @{esc(username)} удалён"
+    return f"❌ @{esc(username)} не найден"
+
+def list_members_text(chat_id):
+    members = data_manager.get_all_members(chat_id)
+    if not members:
+        return "📭 Список пуст!"
+    
+    active = len([m for m in members if m.get('active', True)])
+    
+    lines = [f"👥 Участники ({active} из {len(members)}):\n\n"]
+    for i, m in enumerate(members, 1):
+        status = "✅" if m.get('active', True) else "❌"
+        username = f"@{esc(m['username'])}" if m.get('username') else "без @"
+        lines.append(f"{i}. {status} {esc(m.get('name', '?'))} {username}\n")
+    return ''.join(lines)
+
+def add_admins(chat_id, admins):
+    added = 0
+    for admin in admins:
+        user = admin.user
+        if user.is_bot or not user.username:
+            continue
+        
+        if not data_manager.find_member(chat_id, username=user.username):
+            data_manager.add_member(chat_id, {
+                'id': user.id,
+                'username': user.username,
+                'name': user.first_name or "Без имени",
+                'active': True,
+                'added_by': 'system',
+                'added_date': str(date.today())
+            })
+            added += 1
+    
+    return f"✅ Добавлено {added} администраторов" if added else "ℹ️ Все уже в списке"
+
+def set_mode(chat_id, args):
+    if not args:
+        mode = data_manager.get_chat_mode(chat_id)
+        return f"Текущий режим: {mode}\nДоступные: clown, pidor"
+    
+    mode = args[0].lower()
+    if mode not in ['clown', 'pidor']:
+        return "❌ clown или pidor"
+    
+    data_manager.set_chat_mode(chat_id, mode)
+    return f"✅ Режим: {mode}"
+
+def set_timezone(chat_id, args):
+    if not args:
+        timezone = data_manager.get_chat_timezone(chat_id)
+        if not timezone:
+            return "Часовой пояс не задан, день считается по времени сервера\n/settimezone Europe/Moscow - задать"
+        return f"Часовой пояс: {esc(timezone)}\n/settimezone off - убрать"
+    
+    name = args[0]
+    if name.lower() == 'off':
+        data_manager.set_chat_timezone(chat_id, None)
+        return "✅ Часовой пояс убран"
+    try:
+        ZoneInfo(name)
+    except Exception:
+        return "❌ Неизвестный часовой пояс. Пример: Europe/Moscow, Asia/Yekaterinburg"
+    
+    data_manager.set_chat_timezone(chat_id, name)
+    return f"✅ Часовой пояс: {esc(name)}"
+
+def auto_draw(chat_id, outbox, timers):
+    """Розыгрыш по расписанию (DrawScheduler): как /clown, но без команды
+    
+    Возвращает False, если сегодня уже выбирали или участников нет.
+    """
+    today = data_manager.chat_today(chat_id)
+    if data_manager.get_last_used(chat_id) == today:
+        return False
+    drawn = draw_winner(chat_id, today)
+    if drawn is None:
+        return False
+    pre_text, result_text = drawn
+    outbox.send(int(chat_id), pre_text, PRIORITY_HIGH)
+    timers.call_later(REVEAL_DELAY, outbox.send, int(chat_id), result_text, PRIORITY_HIGH)
+    logger.info("⏰ Автоматический розыгрыш", extra={'chat_id': chat_id})
+    return True
+
+def timed(command):
+    """Пишет длительность обработчика в метрики и в лог (поля chat_id, command, duration)"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(message):
+            start = time.perf_counter()
+            try:
+                return func(message)
+            finally:
+                duration = time.perf_counter() - start
+                HANDLER_SECONDS.observe(duration, command)
+                logger.debug("Команда обработана", extra={
+                    'chat_id': message.chat.id, 'command': command, 'duration': duration,
+                })
+        return wrapper
+    return decorator
+
+def keyboard(buttons):
+    """Кнопки [(подпись, callback_data), ...] одной строкой inline-клавиатуры telebot"""
+    if not buttons:
+        return None
+    markup = types.InlineKeyboardMarkup()
+    markup.row(*(types.InlineKeyboardButton(label, callback_data=data) for label, data in buttons))
+    return markup
+
+def register_handlers(bot, timers=None, outbox=None):
+    """Регистрирует все обработчики команд
+    
+    timers — TimerQueue для отложенной отправки результата /clown,
+    outbox — Outbox, через который уходят все ответы; если не
+    переданы, создаются свои.
+    """
+    if timers is None:
+        timers = TimerQueue()
+        timers.start()
+    if outbox is None:
+        outbox = Outbox(bot)
+        outbox.start()
+    
+    def reply(message, text, priority=PRIORITY_NORMAL, **kwargs):
+        outbox.send(message.chat.id, text, priority, reply_to=message.message_id, **kwargs)
+
+    @bot.message_handler(commands=['start'])
+    @timed('start')
+    def start(message):
+        logger.debug("/start от %s", message.from_user.id, extra={'chat_id': message.chat.id})
+        reply(message, HELP_TEXT)
+
+    @bot.message_handler(commands=['help'])
+    @timed('help')
+    def help_cmd(message):
+        start(message)
+
+    @bot.message_handler(commands=['clown', 'pidor'])
+    @timed('clown')
+    def clown(message):
+        chat_id = str(message.chat.id)
+        today = data_manager.chat_today(chat_id)
+        
+        logger.debug("🎪 /clown от %s", message.from_user.id, extra={'chat_id': chat_id})
+        
+        if data_manager.get_last_used(chat_id) == today:
+            logger.debug("Уже выбирали сегодня", extra={'chat_id': chat_id})
+            reply(message, today_stats_text(chat_id), PRIORITY_LOW)
+            return
+        
+        drawn = draw_winner(chat_id, today)
+        if drawn is None:
+            reply(message, NO_MEMBERS_TEXT)
+            return
+        
+        pre_text, result_text = drawn
+        # Оба сообщения розыгрыша идут первыми и в порядке постановки
+        reply(message, pre_text, PRIORITY_HIGH)
+        # Результат отправится через REVEAL_DELAY секунд, поток не ждёт
+        timers.call_later(REVEAL_DELAY, outbox.send, message.chat.id, result_text, PRIORITY_HIGH)
+
+    @bot.message_handler(commands=['clownstats', 'pidorstats'])
+    @timed('clownstats')
+    def stats_cmd(message):
+        args = message.text.split()[1:]
+        text, buttons = stats_reply(str(message.chat.id), args)
+        reply(message, text, PRIORITY_LOW, reply_markup=keyboard(buttons))
+
+    @bot.callback_query_handler(func=lambda call: (call.data or '').startswith(STATS_CALLBACK + ':'))
+    @HANDLER_SECONDS.time('stats_page')
+    def stats_page_cb(call):
+        # Кнопка перестаёт «крутиться» сразу, сама страница уходит через outbox
+        try:
+            bot.answer_callback_query(call.id)
+        except Exception as e:
+            logger.error("answer_callback_query error: %s", e)
+        if call.message is None:
+            return
+        result = stats_callback(str(call.message.chat.id), call.data)
+        if result is None:
+            return
+        text, buttons = result
+        outbox.edit(call.message.chat.id, call.message.message_id, text, PRIORITY_LOW, reply_markup=keyboard(buttons))
+
+    @bot.message_handler(commands=['register'])
+    @timed('register')
+    def register(message):
+        reply(message, register_user(str(message.chat.id), message.from_user))
+
+    @bot.message_handler(commands=['unregister'])
+    @timed('unregister')
+    def unregister(message):
+        reply(message, unregister_user(str(message.chat.id), message.from_user.id))
+
+    @bot.message_handler(commands=['addmember'])
+    @timed('addmember')
+    def addmember(message):
+        args = message.text.split()[1:]
+        reply(message, add_member_by_name(str(message.chat.id), args, message.from_user))
+
+    @bot.message_handler(commands=['removemember'])
+    @timed('removemember')
+    def removemember(message):
+        args = message.text.split()[1:]
+        reply(message, remove_member_by_name(str(message.chat.id), args))
+
+    @bot.message_handler(commands=['listmembers'])
+    @timed('listmembers')
+    def listmembers(message):
+        reply(message, list_members_text(str(message.chat.id)), PRIORITY_LOW)
+
+    @bot.message_handler(commands=['initmembers'])
+    @timed('initmembers')
+    def initmembers(message):
+        try:
+            admins = bot.get_chat_administrators(message.chat.id)
+            reply(message, add_admins(str(message.chat.id), admins))
+        except Exception as e:
+            logger.error("initmembers error: %s", e, extra={'chat_id': message.chat.id})
+            reply(message, "❌ Бот должен быть администратором чата!")
+
+    @bot.message_handler(commands=['setmode'])
+    @timed('setmode')
+    def setmode(message):
+        args = message.text.split()[1:]
+        reply(message, set_mode(str(message.chat.id), args))
+
+    @bot.message_handler(commands=['settimezone'])
+    @timed('settimezone')
+    def settimezone(message):
+        args = message.text.split()[1:]
+        reply(message, set_timezone(str(message.chat.id), args))
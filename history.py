@@ -0,0 +1,335 @@
+import gzip
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from datetime import date
+from records import StatsEntry, stats_from_dicts, stats_to_dicts
+from persistent import EMPTY
+from atomic_write import write_json
+
+logger = logging.getLogger(__name__)
+
+PERIODS = ('week', 'month', 'year')
+ROLLUPS_FILE = 'rollups.json'
+
+def period_keys(day):
+    """Ключи периодов дня 'YYYY-MM-DD': ISO-неделя, месяц и год"""
+    year, week, _ = date.fromisoformat(day).isocalendar()
+    return {'week': f"{year}-W{week:02d}", 'month': day[:7], 'year': day[:4]}
+
+class DrawHistory:
+    """История розыгрышей: DATA_DIR/history/<chat_id>/
+    
+    Каждый розыгрыш дописывается строкой в сегмент месяца
+    <YYYY-MM>.jsonl ({"date", "key", "id", "name", "username", "mode"}),
+    по строке на день, а итоги по неделям, месяцам и годам обновляются
+    в памяти — запросы за период читают только их. На диск
+    (rollups.json) итоги пишет flush() из PersistenceScheduler вместе
+    с числом строк, учтённых из каждого сегмента; при загрузке строки
+    сверх этого числа применяются заново, так что падение между записью
+    строки и flush() ничего не теряет. Если итогов нет или файл испорчен, они пересчитываются по
+    всем сегментам. Старые сегменты compact() сжимает в .jsonl.gz.
+    
+    Словари победителей за период (PersistentMap) не меняются после
+    публикации (как данные в data_manager); в памяти держатся итоги max_chats последних
+    чатов.
+    """
+    
+    def __init__(self, directory, max_chats=1000):
+        self.directory = directory
+        self.max_chats = max_chats
+        # chat_id -> {period: {key: {user_key: StatsEntry}}, 'segments': {месяц: строк}}
+        self._rollups = OrderedDict()
+        self._dirty = set()
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+    
+    def chat_dir(self, chat_id):
+        return os.path.join(self.directory, str(chat_id))
+    
+    def record(self, chat_id, day, user_key, winner, mode):
+        """Дописывает розыгрыш дня day и обновляет итоги периодов в памяти
+        
+        Один день — одна строка: если розыгрыш дня уже записан (бот упал
+        до сброса last_used и Telegram повторил /clown), строка заменяется.
+        """
+        chat_id = str(chat_id)
+        line = {
+            'date': day,
+            'key': user_key,
+            'id': winner.get('id'),
+            'name': winner.get('name', 'Неизвестный'),
+            'username': winner.get('username', ''),
+            'mode': mode,
+        }
+        text = json.dumps(line, ensure_ascii=False, separators=(',', ':')) + '\n'
+        with self._lock:
+            rollups = self._load(chat_id)
+            directory = self.chat_dir(chat_id)
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f"{day[:7]}.jsonl")
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    lines = f.readlines()
+            except FileNotFoundError:
+                lines = []
+            index = _find_day(lines, day)
+            if index is None:
+                with open(path, 'a', encoding='utf-8') as f:
+                    f.write(text)
+                _apply(rollups, line)
+                segments = rollups['segments']
+                segments[day[:7]] = segments.get(day[:7], 0) + 1
+                self._dirty.add(chat_id)
+            elif json.loads(lines[index])['key'] != user_key:
+                self._replace(chat_id, rollups, path, lines, index, text)
+                self._dirty.add(chat_id)
+    
+    def rollup(self, chat_id, period, key):
+        """{user_key: StatsEntry} за период ('week', 'month', 'year') с ключом key"""
+        return self.rollups(chat_id)[period].get(key, EMPTY)
+    
+    def periods(self, chat_id, period):
+        """Ключи периодов, за которые есть розыгрыши, по возрастанию"""
+        rollups = self.rollups(chat_id)
+        with self._lock:
+            return sorted(rollups[period])
+    
+    def rollups(self, chat_id):
+        chat_id = str(chat_id)
+        rollups = self._rollups.get(chat_id)
+        if rollups is not None:
+            try:
+                self._rollups.move_to_end(chat_id)
+            except KeyError:
+                pass
+            return rollups
+        with self._lock:
+            return self._load(chat_id)
+    
+    def flush(self):
+        """Пишет итоги изменённых чатов в rollups.json, возвращает число чатов"""
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            snapshots = []
+            for chat_id in dirty:
+                rollups = self._rollups.get(chat_id)
+                if rollups is None:
+                    # Вытеснен из памяти — при загрузке догонит по сегментам
+                    continue
+                # Словари за период не меняются, достаточно скопировать верхний уровень
+                snapshots.append((chat_id, {name: dict(value) for name, value in rollups.items()}))
+        saved = 0
+        for chat_id, rollups in snapshots:
+            try:
+                self._save(chat_id, rollups)
+                saved += 1
+            except Exception as e:
+                logger.error("❌ Ошибка сохранения итогов истории чата %s: %s", chat_id, e)
+                with self._lock:
+                    self._dirty.add(chat_id)
+        return saved
+    
+    def rebuild(self, chat_id):
+        """Пересчитывает итоги чата по всем сегментам истории"""
+        chat_id = str(chat_id)
+        with self._lock:
+            rollups = _empty()
+            self._replay(chat_id, rollups)
+            self._publish(chat_id, rollups)
+            self._save(chat_id, rollups)
+            self._dirty.discard(chat_id)
+            return rollups
+    
+    def compact(self, keep_months=12, today=None):
+        """Сжимает сегменты старше keep_months месяцев, возвращает их число"""
+        today = today or date.today()
+        month = today.year * 12 + today.month - 1 - keep_months
+        oldest = f"{month // 12:04d}-{month % 12 + 1:02d}"
+        compacted = 0
+        for chat_id in os.listdir(self.directory):
+            directory = self.chat_dir(chat_id)
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                if not name.endswith('.jsonl') or name[:7] >= oldest:
+                    continue
+                path = os.path.join(directory, name)
+                with self._lock:
+                    with open(path, 'rb') as src, gzip.open(path + '.gz.tmp', 'wb') as dst:
+                        dst.write(src.read())
+                    os.replace(path + '.gz.tmp', path + '.gz')
+                    os.remove(path)
+                compacted += 1
+        if compacted:
+            logger.info("🗜 История: сжато сегментов: %s", compacted)
+        return compacted
+    
+    def _load(self, chat_id):
+        """Итоги чата из памяти или с диска (под self._lock)"""
+        rollups = self._rollups.get(chat_id)
+        if rollups is not None:
+            return rollups
+        path = os.path.join(self.chat_dir(chat_id), ROLLUPS_FILE)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if 'segments' in data:
+                rollups = {
+                    period: {key: stats_from_dicts(entries) for key, entries in data.get(period, {}).items()}
+                    for period in PERIODS
+                }
+                rollups['segments'] = dict(data['segments'])
+            else:
+                # Без числа учтённых строк неизвестно, что догонять — пересчёт
+                logger.info("Итоги истории чата %s в старом формате, пересчитываем", chat_id)
+                rollups = _empty()
+        except FileNotFoundError:
+            rollups = _empty()
+        except Exception as e:
+            logger.error("❌ Итоги истории чата %s испорчены, пересчитываем: %s", chat_id, e)
+            rollups = _empty()
+        replayed = self._replay(chat_id, rollups)
+        if replayed:
+            logger.info("История чата %s: применено строк сегментов: %d", chat_id, replayed)
+            self._dirty.add(chat_id)
+        self._publish(chat_id, rollups)
+        return rollups
+    
+    def _replay(self, chat_id, rollups):
+        """Применяет строки сегментов сверх rollups['segments'], возвращает их число"""
+        directory = self.chat_dir(chat_id)
+        if not os.path.isdir(directory):
+            return 0
+        segments = rollups['segments']
+        replayed = 0
+        for name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, name)
+            month = name[:7]
+            if name.endswith('.jsonl.gz'):
+                # Сжимаются только старые, уже учтённые сегменты; если сжатие
+                # прервалось, рядом остался исходный .jsonl
+                if month in segments or os.path.exists(path[:-3]):
+                    continue
+                f = gzip.open(path, 'rt', encoding='utf-8')
+            elif name.endswith('.jsonl'):
+                f = open(path, 'r', encoding='utf-8')
+            else:
+                continue
+            applied = segments.get(month, 0)
+            count = 0
+            with f:
+                for line in f:
+                    count += 1
+                    if count <= applied:
+                        continue
+                    try:
+                        _apply(rollups, json.loads(line))
+                        replayed += 1
+                    except ValueError:
+                        logger.warning("⚠️ %s: повреждённая запись, пропуск", path)
+            segments[month] = count
+        return replayed
+    
+    def _replace(self, chat_id, rollups, path, lines, index, text):
+        """Заменяет строку index сегмента path на text (под self._lock)
+        
+        Сначала на диск уходят итоги без строк сегмента начиная с index,
+        потом сегмент переписывается целиком: если упасть между этими
+        шагами, при загрузке хвост применится заново из того файла, что
+        окажется на диске.
+        """
+        month = os.path.basename(path)[:7]
+        tail = _parse(lines[index:])
+        # Словари за период не меняются, достаточно скопировать верхний уровень
+        staged = {name: dict(value) for name, value in rollups.items()}
+        for old in tail:
+            _unapply(staged, old)
+        staged['segments'][month] = index
+        self._save(chat_id, staged)
+        
+        lines[index] = text
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            f.writelines(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + '.tmp', path)
+        for new in _parse(lines[index:]):
+            _apply(staged, new)
+        staged['segments'][month] = len(lines)
+        self._publish(chat_id, staged)
+    
+    def _publish(self, chat_id, rollups):
+        self._rollups[chat_id] = rollups
+        self._rollups.move_to_end(chat_id)
+        while len(self._rollups) > self.max_chats:
+            self._rollups.popitem(last=False)
+    
+    def _save(self, chat_id, rollups):
+        data = {
+            period: {key: stats_to_dicts(entries) for key, entries in rollups[period].items()}
+            for period in PERIODS
+        }
+        data['segments'] = rollups['segments']
+        os.makedirs(self.chat_dir(chat_id), exist_ok=True)
+        write_json(os.path.join(self.chat_dir(chat_id), ROLLUPS_FILE), data, 'history', indent=None)
+
+def _empty():
+    rollups = {period: {} for period in PERIODS}
+    rollups['segments'] = {}
+    return rollups
+
+def _apply(rollups, line):
+    """Добавляет победу line['key'] в итоги (под замком DrawHistory)
+    
+    Словарь победителей периода заменяется новой версией, а не меняется,
+    чтобы уже выданные rollup() не менялись у читателей.
+    """
+    keys = period_keys(line['date'])
+    for period in PERIODS:
+        periods = rollups[period]
+        entries = periods.get(keys[period], EMPTY)
+        entry = entries.get(line['key'])
+        if entry is None:
+            entry = StatsEntry(line.get('name'), line.get('username'))
+        periods[keys[period]] = entries.set(line['key'], entry.won())
+
+def _unapply(rollups, line):
+    """Убирает победу line['key'] из итогов, обратное _apply()"""
+    keys = period_keys(line['date'])
+    for period in PERIODS:
+        periods = rollups[period]
+        entries = periods.get(keys[period], EMPTY)
+        entry = entries.get(line['key'])
+        if entry is None:
+            continue
+        if entry.count > 1:
+            entries = entries.set(line['key'], StatsEntry(entry.name, entry.username, entry.count - 1))
+        else:
+            entries = entries.remove(line['key'])
+        if entries:
+            periods[keys[period]] = entries
+        else:
+            del periods[keys[period]]
+
+def _parse(lines):
+    """Записи строк сегмента; повреждённые пропускаются, как в _replay()"""
+    records = []
+    for text in lines:
+        try:
+            records.append(json.loads(text))
+        except ValueError:
+            pass
+    return records
+
+def _find_day(lines, day):
+    """Номер последней строки сегмента с розыгрышем дня day или None"""
+    for index in range(len(lines) - 1, -1, -1):
+        try:
+            if json.loads(lines[index]).get('date') == day:
+                return index
+        except ValueError:
+            continue
+    return None
@@ -0,0 +1,84 @@
+import json
+import os
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+class Journal:
+    """Append-only журнал изменений (одна JSON-строка на изменение)
+    
+    Каждая запись задаёт итоговое состояние ключа (а не дельту),
+    поэтому повторное применение записи поверх снимка безопасно.
+    При сжатии текущий журнал переименовывается в .old, данные
+    сохраняются в снимки, и только после этого .old удаляется.
+    """
+    
+    def __init__(self, path, fsync=True):
+        self.path = path
+        self.old_path = path + '.old'
+        self.fsync = fsync
+        self.size = 0
+        self.records = 0
+        self._file = None
+        self._lock = threading.Lock()
+    
+    def open(self):
+        self._file = open(self.path, 'ab')
+        self.size = self._file.tell()
+    
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+    
+    def append(self, op, chat_id, payload):
+        """Дописывает одну запись и (по умолчанию) сбрасывает её на диск"""
+        record = {'op': op, 'chat': chat_id}
+        record.update(payload)
+        line = (json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self.size += len(line)
+            self.records += 1
+    
+    def replay(self, apply):
+        """Применяет записи из .old и текущего журнала, возвращает их число"""
+        count = 0
+        for path in (self.old_path, self.path):
+            if not os.path.exists(path):
+                continue
+            with open(path, 'rb') as f:
+                for line_no, line in enumerate(f, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Оборванная запись при падении — дальше читать нечего
+                        logger.warning("⚠️ %s:%s: повреждённая запись, пропуск хвоста", path, line_no)
+                        break
+                    apply(record)
+                    count += 1
+        return count
+    
+    def compact(self, snapshot):
+        """Сжимает журнал: ротация, snapshot() пишет снимки, старый журнал удаляется"""
+        with self._lock:
+            self._file.close()
+            if os.path.exists(self.old_path):
+                # Прошлое сжатие не завершилось — дописываем текущий журнал к .old
+                with open(self.old_path, 'ab') as old, open(self.path, 'rb') as cur:
+                    old.write(cur.read())
+                os.remove(self.path)
+            else:
+                os.replace(self.path, self.old_path)
+            self._file = open(self.path, 'ab')
+            self.size = 0
+            self.records = 0
+        snapshot()
+        os.remove(self.old_path)
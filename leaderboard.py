@@ -0,0 +1,112 @@
+from bisect import bisect_left, bisect_right, insort
+from itertools import accumulate
+from persistent import PersistentMap
+
+class Leaderboard:
+    """Отсортированная статистика одного чата с кешем готовых текстов
+    
+    Порядок — по убыванию count, при равенстве — по порядку появления
+    в статистике (как у sorted() по словарю, см. PersistentMap.order_of).
+    Пары (ключ сортировки, user_key) лежат кусками по CHUNK штук; после
+    победы запись вынимается из своего куска и вставляется в нужный,
+    остальные куски новая таблица делит со старой.
+    
+    Опубликованная таблица не меняется: updated() возвращает новую.
+    """
+    
+    CHUNK = 64
+    
+    def __init__(self, entries):
+        self._entries = PersistentMap.of(entries)
+        order = sorted((self._sort_key(key), key) for key in self._entries)
+        self._chunks = [tuple(order[i:i + self.CHUNK]) for i in range(0, len(order), self.CHUNK)]
+        self._maxes = [chunk[-1] for chunk in self._chunks]
+        self._offsets = None
+        self._rendered = {}
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    @property
+    def entries(self):
+        """Словарь статистики, по которому построена таблица"""
+        return self._entries
+    
+    def _sort_key(self, key):
+        return (-self._entries[key].count, self._entries.order_of(key))
+    
+    def updated(self, entries, key):
+        """Новая таблица по entries, где запись key изменилась или появилась"""
+        board = Leaderboard.__new__(Leaderboard)
+        board._entries = entries
+        board._chunks = list(self._chunks)
+        board._maxes = list(self._maxes)
+        board._offsets = None
+        board._rendered = {}
+        if key in self._entries:
+            board._take((self._sort_key(key), key))
+        board._put((board._sort_key(key), key))
+        return board
+    
+    def _take(self, pair):
+        """Убирает пару из своего куска (только в неопубликованной копии)"""
+        i = bisect_left(self._maxes, pair)
+        chunk = list(self._chunks[i])
+        del chunk[bisect_left(chunk, pair)]
+        if chunk:
+            self._chunks[i] = tuple(chunk)
+            self._maxes[i] = chunk[-1]
+        else:
+            del self._chunks[i]
+            del self._maxes[i]
+    
+    def _put(self, pair):
+        """Вставляет пару в нужный кусок, слишком большой делит (только в копии)"""
+        if not self._chunks:
+            self._chunks.append((pair,))
+            self._maxes.append(pair)
+            return
+        i = min(bisect_left(self._maxes, pair), len(self._chunks) - 1)
+        chunk = list(self._chunks[i])
+        insort(chunk, pair)
+        if len(chunk) > 2 * self.CHUNK:
+            self._chunks[i:i + 1] = [tuple(chunk[:self.CHUNK]), tuple(chunk[self.CHUNK:])]
+            self._maxes[i:i + 1] = [chunk[self.CHUNK - 1], chunk[-1]]
+        else:
+            self._chunks[i] = tuple(chunk)
+            self._maxes[i] = chunk[-1]
+    
+    def _slice(self, start, stop):
+        """user_key с start по stop (не включая) в порядке таблицы"""
+        if self._offsets is None:
+            self._offsets = list(accumulate(len(chunk) for chunk in self._chunks))
+        keys = []
+        i = bisect_right(self._offsets, start)
+        while i < len(self._chunks) and start < stop:
+            first = self._offsets[i] - len(self._chunks[i])
+            part = self._chunks[i][start - first:stop - first]
+            keys.extend(key for _, key in part)
+            start += len(part)
+            i += 1
+        return keys
+    
+    def top(self, limit=None):
+        """[(user_key, entry), ...] по убыванию побед"""
+        keys = self._slice(0, len(self) if limit is None else limit)
+        return [(key, self._entries[key]) for key in keys]
+    
+    def pages(self, size):
+        """Число страниц по size строк (не меньше одной)"""
+        return max(1, -(-len(self) // size))
+    
+    def page(self, number, size):
+        """[(user_key, entry), ...] страницы number (с нуля)"""
+        keys = self._slice(number * size, (number + 1) * size)
+        return [(key, self._entries[key]) for key in keys]
+    
+    def render(self, cache_key, build):
+        """Текст из кеша или build(), если статистика менялась"""
+        text = self._rendered.get(cache_key)
+        if text is None:
+            text = self._rendered[cache_key] = build()
+        return text
@@ -0,0 +1,108 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+# Поля, которые можно передать в extra= и которые попадут в строку лога:
+#   logger.info("Команда обработана", extra={'chat_id': chat_id, 'command': 'clown'})
+STRUCT_FIELDS = ('chat_id', 'command', 'duration')
+
+class StructuredFormatter(logging.Formatter):
+    """Дописывает к сообщению поля из STRUCT_FIELDS, если они заданы"""
+    
+    def format(self, record):
+        text = super().format(record)
+        fields = []
+        for name in STRUCT_FIELDS:
+            value = getattr(record, name, None)
+            if value is None:
+                continue
+            if name == 'duration':
+                value = f"{value * 1000:.1f}ms"
+            fields.append(f"{name}={value}")
+        return f"{text} [{' '.join(fields)}]" if fields else text
+
+class RateLimitFilter(logging.Filter):
+    """Не больше rate записей в секунду с одним шаблоном сообщения
+    
+    Шаблон — это record.msg до подстановки аргументов, поэтому
+    "Чат %s: %s активных" для всех чатов считается одним сообщением.
+    Предупреждения и ошибки проходят всегда. Сколько записей отброшено,
+    дописывается к следующей пропущенной записи с тем же шаблоном.
+    """
+    
+    MAX_TEMPLATES = 10000  # f-строки дают по шаблону на запись, не копим их
+    
+    def __init__(self, rate=20, burst=100):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}  # шаблон -> [токены, время, отброшено]
+        self._lock = threading.Lock()
+    
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or not self.rate:
+            return True
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self.MAX_TEMPLATES:
+                    self._buckets.clear()
+                bucket = self._buckets[key] = [self.burst, now, 0]
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                return False
+            bucket[0] -= 1
+            dropped, bucket[2] = bucket[2], 0
+        if dropped:
+            record.msg = f"{record.msg} (пропущено похожих: {dropped})"
+        return True
+
+class LazyQueueHandler(QueueHandler):
+    """QueueHandler без форматирования в потоке, который пишет в лог
+    
+    Стандартный prepare() подставляет аргументы сразу, чтобы запись
+    можно было передать в другой процесс. Очередь здесь в том же
+    процессе, поэтому запись уходит как есть, а msg % args и
+    форматирование выполняет поток QueueListener. Аргументы должны
+    быть неизменяемыми (числа, строки) или не меняться после вызова.
+    """
+    
+    def prepare(self, record):
+        return record
+
+_listener = None
+
+def start_logging(level, fmt, rate=20, burst=100, stream=None):
+    """Логи через очередь: обработчики только кладут запись, пишет фоновый поток"""
+    global _listener
+    stop_logging()
+    
+    output = logging.StreamHandler(stream)
+    output.setFormatter(StructuredFormatter(fmt))
+    log_queue = queue.SimpleQueue()
+    handler = LazyQueueHandler(log_queue)
+    handler.addFilter(RateLimitFilter(rate, burst))
+    
+    root = logging.getLogger()
+    for old in root.handlers[:]:
+        root.removeHandler(old)
+    root.addHandler(handler)
+    root.setLevel(level)
+    
+    _listener = QueueListener(log_queue, output)
+    _listener.start()
+    atexit.register(stop_logging)
+
+def stop_logging():
+    """Дописывает очередь и останавливает фоновый поток"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -1,55 +1,100 @@
-import sys
-import atexit
-import signal
-import logging
-from config import setup_logging
-from data_manager import load_all_data, save_all_data
-from handlers import register_handlers
-from bot_runner import BotRunner
-
-setup_logging()
-logger = logging.getLogger(__name__)
-
-def cleanup(runner=None):
-    logger.info("Сохранение данных...")
-    save_all_data()
-    if runner:
-        runner.stop()
-    logger.info("Бот завершил работу")
-
-def main():
-    logger.info("=" * 50)
-    logger.info("CLOWN BOT")
-    logger.info("=" * 50)
-    
-    # Загружаем данные
-    logger.info("📂 Загрузка данных...")
-    load_all_data()
-    logger.info("✅ Данные загружены")
-    
-    # Создаём бота
-    runner = BotRunner()
-    
-    # Регистрируем обработчики
-    register_handlers(runner.bot)
-    logger.info("✅ Обработчики зарегистрированы")
-    
-    # Настраиваем graceful shutdown
-    def sig_handler(sig, frame):
-        logger.info(f"Сигнал {sig}")
-        cleanup(runner)
-        sys.exit(0)
-    
-    atexit.register(lambda: cleanup(runner))
-    signal.signal(signal.SIGINT, sig_handler)
-    signal.signal(signal.SIGTERM, sig_handler)
-    
-    # Запускаем
-    try:
-        runner.start()
-    except Exception as e:
-        logger.error(f"❌ Ошибка: {e}", exc_info=True)
-        cleanup(runner)
-
-if __name__ == '__main__':
+import sys
+import atexit
+import signal
+import logging
+from config import (
+    setup_logging, STORAGE_MODE, JOURNAL_COMPACT_BYTES, HOT_CHATS, BOT_RUNTIME, METRICS_LISTEN, METRICS_PORT,
+    AUTO_DRAW, AUTO_DRAW_WINDOW, AUTO_DRAW_BATCH, AUTO_DRAW_PAUSE,
+)
+from data_manager import configure_storage, load_all_data, persist, close_storage
+from persistence import PersistenceScheduler
+from metrics import MetricsServer
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+_cleaned_up = False
+
+def cleanup(runner=None, scheduler=None, draws=None):
+    # Вызывается после start(), из обработчика сигнала и из atexit — работает один раз
+    global _cleaned_up
+    if _cleaned_up:
+        return
+    _cleaned_up = True
+    if draws:
+        draws.stop()
+    if runner:
+        runner.stop()
+    logger.info("Сохранение данных...")
+    if scheduler:
+        scheduler.stop()
+    else:
+        persist(force=True)
+    close_storage()
+    logger.info("Бот завершил работу")
+
+def main():
+    logger.info("=" * 50)
+    logger.info("CLOWN BOT")
+    logger.info("=" * 50)
+    
+    # Загружаем данные
+    logger.info("📂 Загрузка данных...")
+    configure_storage(STORAGE_MODE, compact_bytes=JOURNAL_COMPACT_BYTES, hot_chats=HOT_CHATS)
+    load_all_data()
+    logger.info("✅ Данные загружены")
+    
+    # Фоновое сохранение изменений
+    scheduler = PersistenceScheduler()
+    scheduler.start()
+    
+    # Метрики для Prometheus
+    if METRICS_PORT:
+        MetricsServer(METRICS_LISTEN, METRICS_PORT).start()
+    
+    # Создаём бота и регистрируем обработчики
+    if BOT_RUNTIME == 'async':
+        from async_bot_runner import AsyncBotRunner
+        from async_handlers import register_async_handlers
+        runner = AsyncBotRunner()
+        register_async_handlers(runner.application)
+    else:
+        from bot_runner import BotRunner
+        from handlers import register_handlers
+        runner = BotRunner()
+        register_handlers(runner.bot, runner.timers, runner.outbox)
+        scheduler.add_checkpoint(runner.tracker)
+    logger.info("✅ Обработчики зарегистрированы")
+    
+    # Розыгрыш по расписанию идёт через шард чата, по очереди с его командами
+    draws = None
+    if AUTO_DRAW and BOT_RUNTIME != 'async':
+        from draw_scheduler import DrawScheduler
+        from handlers import auto_draw
+        draws = DrawScheduler(
+            lambda chat_id: runner.dispatcher.call(chat_id, auto_draw, chat_id, runner.outbox, runner.timers),
+            AUTO_DRAW_WINDOW, AUTO_DRAW_BATCH, AUTO_DRAW_PAUSE,
+        )
+        draws.start()
+    
+    # Настраиваем graceful shutdown
+    def sig_handler(sig, frame):
+        logger.info("Сигнал %s", sig)
+        cleanup(runner, scheduler, draws)
+        sys.exit(0)
+    
+    atexit.register(lambda: cleanup(runner, scheduler, draws))
+    if BOT_RUNTIME != 'async':
+        # asyncio-движок сам ловит SIGINT/SIGTERM и возвращается из start()
+        signal.signal(signal.SIGINT, sig_handler)
+        signal.signal(signal.SIGTERM, sig_handler)
+    
+    # Запускаем
+    try:
+        runner.start()
+    except Exception as e:
+        logger.error("❌ Ошибка: %s", e, exc_info=True)
+    cleanup(runner, scheduler, draws)
+
+if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,113 @@
+from records import Member
+from persistent import PersistentMap
+
+class MemberIndex:
+    """Участники одного чата с индексами по id и username
+    
+    Порядок добавления сохраняется (для /listmembers и JSON), поиск и
+    удаление — по индексам, список активных кешируется до изменения.
+    Опубликованный индекс не меняют: изменения делаются в copy(). Все
+    три словаря — persistent.PersistentMap, поэтому copy() ничего не
+    копирует, а add()/remove() стоят O(log n), а не O(размера чата).
+    Участники хранятся как records.Member, to_list() отдаёт словари.
+    """
+    
+    def __init__(self, members=()):
+        members = [Member.of(member) for member in members]
+        by_id = {}
+        by_username = {}
+        for seq, member in enumerate(members):
+            if member.get('id') is not None:
+                by_id.setdefault(member['id'], []).append(seq)
+            if 'username' in member:
+                by_username.setdefault(member['username'], []).append(seq)
+        self._next = len(members)
+        self._members = PersistentMap(enumerate(members))  # seq -> Member
+        self._by_id = PersistentMap((key, tuple(seqs)) for key, seqs in by_id.items())  # id -> (seq, ...)
+        self._by_username = PersistentMap((key, tuple(seqs)) for key, seqs in by_username.items())
+        self._active = None
+    
+    def __len__(self):
+        return len(self._members)
+    
+    def __iter__(self):
+        return iter(self._members.values())
+    
+    def copy(self):
+        """Копия для изменения: словари неизменяемые и остаются общими"""
+        index = MemberIndex.__new__(MemberIndex)
+        index._next = self._next
+        index._members = self._members
+        index._by_id = self._by_id
+        index._by_username = self._by_username
+        index._active = self._active
+        return index
+    
+    def add(self, member):
+        member = Member.of(member)
+        seq = self._next
+        self._next += 1
+        self._members = self._members.set(seq, member)
+        if member.get('id') is not None:
+            self._by_id = self._by_id.set(member['id'], self._by_id.get(member['id'], ()) + (seq,))
+        if 'username' in member:
+            username = member['username']
+            self._by_username = self._by_username.set(username, self._by_username.get(username, ()) + (seq,))
+        self._active = None
+    
+    def remove(self, field, value):
+        """Удаляет всех участников с member[field] == value, возвращает их число"""
+        seqs = self._bucket(field).get(value)
+        if not seqs:
+            return 0
+        self._set_bucket(field, self._bucket(field).remove(value))
+        # Убираем удалённых и из второго индекса
+        other_field = 'username' if field == 'id' else 'id'
+        other = self._bucket(other_field)
+        for seq in seqs:
+            member = self._members[seq]
+            self._members = self._members.remove(seq)
+            other_value = member.get(other_field)
+            other_seqs = other.get(other_value)
+            if other_seqs is not None:
+                other_seqs = tuple(s for s in other_seqs if s != seq)
+                other = other.set(other_value, other_seqs) if other_seqs else other.remove(other_value)
+        self._set_bucket(other_field, other)
+        self._active = None
+        return len(seqs)
+    
+    def find(self, field, value):
+        """Первый участник с member[field] == value или None"""
+        seqs = self._bucket(field).get(value)
+        return self._members[seqs[0]] if seqs else None
+    
+    def contains(self, member):
+        """Есть ли точно такая же запись (для повторного проигрывания журнала)"""
+        for field in ('id', 'username'):
+            value = member.get(field)
+            if value is None:
+                continue
+            return any(self._members[seq] == member for seq in self._bucket(field).get(value, ()))
+        return member in self._members.values()
+    
+    def active(self):
+        """Кортеж активных участников, пересчитывается только после изменений"""
+        if self._active is None:
+            self._active = tuple(m for m in self._members.values() if m.get('active', True))
+        return self._active
+    
+    def to_list(self):
+        return [member.to_dict() for member in self._members.values()]
+    
+    def _bucket(self, field):
+        if field == 'id':
+            return self._by_id
+        if field == 'username':
+            return self._by_username
+        raise ValueError(f"Нет индекса по полю {field}")
+    
+    def _set_bucket(self, field, bucket):
+        if field == 'id':
+            self._by_id = bucket
+        else:
+            self._by_username = bucket
@@ -0,0 +1,206 @@
+import bisect
+import functools
+import logging
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Registry:
+    """Набор метрик, отдаётся целиком в текстовом формате Prometheus"""
+    
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+    
+    def register(self, metric):
+        # Повторная регистрация заменяет метрику (например, новый BotRunner)
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+    
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = Registry()
+
+class Counter:
+    """Монотонный счётчик с метками"""
+    
+    kind = 'counter'
+    
+    def __init__(self, name, help, labels=(), registry=REGISTRY):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        registry.register(self)
+    
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+    
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labels, key)} {_number(value)}" for key, value in values]
+
+class Gauge:
+    """Текущее значение, которое считается функцией в момент запроса
+    
+    С labels func() возвращает {(значения меток, ...): значение} —
+    по строке на каждый ключ в том же порядке.
+    """
+    
+    kind = 'gauge'
+    
+    def __init__(self, name, help, func, labels=(), registry=REGISTRY):
+        self.name = name
+        self.help = help
+        self.func = func
+        self.labels = tuple(labels)
+        registry.register(self)
+    
+    def samples(self):
+        try:
+            value = self.func()
+        except Exception as e:
+            logger.error("Метрика %s: %s", self.name, e)
+            return []
+        if not self.labels:
+            return [f"{self.name} {_number(value)}"]
+        return [f"{self.name}{_labels(self.labels, key)} {_number(v)}" for key, v in value.items()]
+
+class Histogram:
+    """Распределение значений по корзинам (по умолчанию — секунды)"""
+    
+    kind = 'histogram'
+    
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}  # метки -> [счётчики по корзинам..., сумма, число]
+        self._lock = threading.Lock()
+        registry.register(self)
+    
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(labels)
+            if row is None:
+                row = self._values[labels] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                row[index] += 1
+            row[-2] += value
+            row[-1] += 1
+    
+    def time(self, *labels):
+        """Декоратор: записывает длительность каждого вызова функции"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.observe(time.perf_counter() - start, *labels)
+            return wrapper
+        return decorator
+    
+    def samples(self):
+        with self._lock:
+            rows = sorted((key, list(row)) for key, row in self._values.items())
+        lines = []
+        for key, row in rows:
+            cumulative = 0
+            for bound, count in zip(self.buckets, row):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(self.labels, key, [('le', _number(bound))])} {cumulative}")
+            lines.append(f"{self.name}_bucket{_labels(self.labels, key, [('le', '+Inf')])} {row[-1]}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, key)} {_number(row[-2])}")
+            lines.append(f"{self.name}_count{_labels(self.labels, key)} {row[-1]}")
+        return lines
+
+# Метрики бота
+HANDLER_SECONDS = Histogram('clown_handler_seconds', 'Время обработки команды', ['command'])
+STORAGE_SECONDS = Histogram('clown_storage_seconds', 'Время чтения/записи файла данных', ['op', 'file'])
+STORAGE_BYTES = Counter('clown_storage_bytes_total', 'Прочитано/записано байт в файлы данных', ['op', 'file'])
+SEND_SECONDS = Histogram('clown_send_seconds', 'Время вызова sendMessage')
+SEND_ERRORS = Counter('clown_send_errors_total', 'Ошибки sendMessage по коду ответа', ['code'])
+POLL_SECONDS = Histogram('clown_poll_seconds', 'Время запроса getUpdates (с ожиданием long polling)')
+POLL_ERRORS = Counter('clown_poll_errors_total', 'Неудачные запросы getUpdates')
+UPDATE_LAG_SECONDS = Histogram('clown_update_lag_seconds', 'Задержка от отправки сообщения до получения обновления ботом')
+
+class MetricsServer:
+    """HTTP-сервер, отдающий метрики на GET /metrics"""
+    
+    def __init__(self, host, port, registry=REGISTRY):
+        self.registry = registry
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+    
+    @property
+    def port(self):
+        return self._server.server_address[1]
+    
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='metrics', daemon=True)
+        self._thread.start()
+        logger.info("📊 Метрики: http://%s:%s/metrics", self._server.server_address[0], self.port)
+    
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join()
+    
+    def _make_handler(self):
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_response(404)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                body = server.registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, format, *args):
+                logger.debug("Метрики: " + format % args)
+        
+        return Handler
@@ -0,0 +1,235 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from telebot import apihelper, types
+from metrics import SEND_SECONDS, SEND_ERRORS
+
+logger = logging.getLogger(__name__)
+
+# Приоритеты: меньше — раньше
+PRIORITY_HIGH = 0  # результат розыгрыша
+PRIORITY_NORMAL = 1  # обычные ответы на команды
+PRIORITY_LOW = 2  # длинные списки и статистика
+
+class TokenBucket:
+    """rate токенов в секунду, не больше capacity про запас"""
+    
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._stamp = time.monotonic()
+    
+    def wait_time(self, now):
+        """Сколько ждать до свободного токена (0 — можно отправлять)"""
+        self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+        if self._tokens >= 1:
+            return 0
+        return (1 - self._tokens) / self.rate
+    
+    def take(self):
+        self._tokens -= 1
+    
+    def refill_time(self, now):
+        """Сколько ждать, пока запас не восстановится полностью"""
+        self.wait_time(now)
+        return (self.capacity - self._tokens) / self.rate
+
+class _Chat:
+    """Очередь сообщений одного чата и его лимит"""
+    
+    def __init__(self, rate, capacity):
+        self.heap = []
+        self.bucket = TokenBucket(rate, capacity)
+        self.paused_until = 0
+        self.wake = None  # время действующей записи чата в _sleeping
+        self.state = 'idle'  # idle, ready, sleeping, sending
+
+class Outbox:
+    """Очередь исходящих сообщений с учётом лимитов Telegram
+    
+    Обработчики ставят сообщение в очередь и сразу возвращаются.
+    Отправка ограничена общим лимитом бота и лимитом каждого чата
+    (token bucket), сначала уходят сообщения с меньшим priority.
+    В одном чате одновременно отправляется не больше одного сообщения,
+    поэтому порядок внутри чата сохраняется. На 429 чат ставится на
+    паузу retry_after, сообщение возвращается в очередь; если 429
+    пришли из flood_chats разных чатов, пока действует пауза первого,
+    это ограничение всего бота — на retry_after встаёт общий лимит
+    и отправка во все чаты. Чат без
+    сообщений забывается, когда его лимит восстановился и пауза
+    кончилась, так что _chats не растёт с каждым чатом.
+    """
+    
+    def __init__(self, bot, global_rate=30, chat_rate=20 / 60, chat_burst=3, workers=8, flood_chats=2):
+        self.bot = bot
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.flood_chats = flood_chats
+        # Без запаса: общий лимит выдерживается и в первую секунду всплеска
+        self._global = TokenBucket(global_rate, 1)
+        self._global_paused_until = 0
+        self._rate_limited = {}  # chat_id -> до какого времени действует его 429
+        self._chats = {}
+        self._ready = []  # (priority, seq, chat_id) — чаты, которые можно отправлять
+        self._sleeping = []  # (время, chat_id) — чаты, ждущие лимит, retry_after или забвения
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='outbox')
+    
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name='outbox', daemon=True)
+        self._thread.start()
+    
+    def send(self, chat_id, text, priority=PRIORITY_NORMAL, reply_to=None, **kwargs):
+        """Ставит сообщение в очередь; reply_to — message_id для ответа"""
+        if reply_to is not None:
+            kwargs['reply_parameters'] = types.ReplyParameters(reply_to, allow_sending_without_reply=True)
+        self._put(chat_id, priority, 'send', text, kwargs)
+    
+    def edit(self, chat_id, message_id, text, priority=PRIORITY_NORMAL, **kwargs):
+        """Ставит в очередь правку текста сообщения (те же лимиты, что и у отправки)"""
+        kwargs['message_id'] = message_id
+        self._put(chat_id, priority, 'edit', text, kwargs)
+    
+    def _put(self, chat_id, priority, method, text, kwargs):
+        with self._cond:
+            chat = self._chats.get(chat_id)
+            if chat is None:
+                chat = self._chats[chat_id] = _Chat(self.chat_rate, self.chat_burst)
+            item = (priority, next(self._seq), text, kwargs, method)
+            heapq.heappush(chat.heap, item)
+            if chat.state == 'idle':
+                self._schedule(chat_id, chat, time.monotonic())
+            elif chat.state == 'ready' and chat.heap[0] is item:
+                # Более срочное сообщение: лишняя запись в _ready пропустится
+                heapq.heappush(self._ready, (priority, item[1], chat_id))
+            self._cond.notify_all()
+    
+    def pending(self):
+        with self._cond:
+            return sum(len(chat.heap) for chat in self._chats.values())
+    
+    def stop(self, timeout=10):
+        """Остановка; ждёт отправки очереди не дольше timeout секунд"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._has_work() and time.monotonic() < deadline:
+                self._cond.wait(0.1)
+            self._running = False
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join()
+        left = self.pending()
+        if left:
+            logger.warning("Не отправлено сообщений: %s", left)
+        self._pool.shutdown(wait=True)
+    
+    def _has_work(self):
+        return any(chat.heap or chat.state == 'sending' for chat in self._chats.values())
+    
+    def _schedule(self, chat_id, chat, now):
+        """Ставит чат в _ready или _sleeping по его лимиту (под _cond)
+        
+        Чат без сообщений остаётся idle до восстановления лимита (с
+        записью в _sleeping), а потом удаляется из _chats.
+        """
+        if chat.heap:
+            wait = max(chat.paused_until - now, chat.bucket.wait_time(now))
+        else:
+            wait = max(chat.paused_until - now, chat.bucket.refill_time(now))
+            if wait <= 0:
+                del self._chats[chat_id]
+                return
+        if wait > 0:
+            chat.state = 'sleeping' if chat.heap else 'idle'
+            chat.wake = now + wait
+            heapq.heappush(self._sleeping, (chat.wake, chat_id))
+        else:
+            chat.state = 'ready'
+            chat.wake = None
+            priority, seq = chat.heap[0][:2]
+            heapq.heappush(self._ready, (priority, seq, chat_id))
+    
+    def _on_rate_limited(self, chat_id, now, retry_after):
+        """Учитывает 429 чата; при flood_chats чатах сразу ставит на паузу всю отправку (под _cond)"""
+        self._rate_limited = {c: until for c, until in self._rate_limited.items() if until > now}
+        self._rate_limited[chat_id] = now + retry_after
+        if len(self._rate_limited) >= self.flood_chats and self._global_paused_until < now + retry_after:
+            self._global_paused_until = now + retry_after
+            logger.warning("429 из %d чатов, вся отправка на паузе %sс", len(self._rate_limited), retry_after)
+    
+    def _run(self):
+        with self._cond:
+            while self._running:
+                now = time.monotonic()
+                while self._sleeping and self._sleeping[0][0] <= now:
+                    wake, chat_id = heapq.heappop(self._sleeping)
+                    chat = self._chats.get(chat_id)
+                    # Запись устарела: чат уже забыт, снова в работе или спит до другого времени
+                    if chat is not None and chat.wake == wake and chat.state in ('sleeping', 'idle'):
+                        self._schedule(chat_id, chat, now)
+                
+                while self._ready and getattr(self._chats.get(self._ready[0][2]), 'state', None) != 'ready':
+                    heapq.heappop(self._ready)
+                
+                wait = self._sleeping[0][0] - now if self._sleeping else None
+                if self._ready:
+                    global_wait = max(self._global.wait_time(now), self._global_paused_until - now)
+                    if not global_wait:
+                        self._dispatch(heapq.heappop(self._ready)[2])
+                        continue
+                    wait = global_wait if wait is None else min(wait, global_wait)
+                self._cond.wait(wait)
+    
+    def _dispatch(self, chat_id):
+        chat = self._chats[chat_id]
+        item = heapq.heappop(chat.heap)
+        chat.state = 'sending'
+        chat.bucket.take()
+        self._global.take()
+        self._pool.submit(self._send, chat_id, item)
+    
+    def _send(self, chat_id, item):
+        _, _, text, kwargs, method = item
+        retry_after = None
+        start = time.perf_counter()
+        try:
+            if method == 'edit':
+                self.bot.edit_message_text(text, chat_id, **kwargs)
+            else:
+                self.bot.send_message(chat_id, text, **kwargs)
+        except apihelper.ApiTelegramException as e:
+            SEND_ERRORS.inc(str(e.error_code))
+            if method == 'edit' and 'message is not modified' in (e.description or ''):
+                # Повторное нажатие той же кнопки — текст уже такой
+                pass
+            elif e.error_code == 429:
+                retry_after = (e.result_json.get('parameters') or {}).get('retry_after', 1)
+            else:
+                logger.error("❌ Не удалось отправить в чат %s: %s", chat_id, e)
+        except Exception as e:
+            SEND_ERRORS.inc('network')
+            logger.error("❌ Не удалось отправить в чат %s: %s", chat_id, e)
+        SEND_SECONDS.observe(time.perf_counter() - start)
+        
+        with self._cond:
+            chat = self._chats[chat_id]
+            now = time.monotonic()
+            if retry_after is not None:
+                logger.warning("429, пауза %sс", retry_after, extra={'chat_id': chat_id})
+                chat.paused_until = now + retry_after
+                heapq.heappush(chat.heap, item)
+                self._on_rate_limited(chat_id, now, retry_after)
+            self._schedule(chat_id, chat, now)
+            self._cond.notify_all()
@@ -0,0 +1,82 @@
+import logging
+import threading
+import time
+import data_manager
+from config import FLUSH_INTERVAL, FLUSH_MAX_DIRTY, HISTORY_KEEP_MONTHS, HISTORY_COMPACT_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+class PersistenceScheduler:
+    """Фоновое сохранение изменённых данных (write-behind)
+    
+    Обработчики только помечают хранилища изменёнными через
+    data_manager.mark_dirty(), а этот поток раз в interval секунд
+    (или раньше, если набралось max_dirty изменений) пишет на диск
+    только изменённые файлы. В режиме журнала тот же поток сжимает
+    журнал в снимки, когда он вырастает больше порога, и раз в
+    HISTORY_COMPACT_INTERVAL сжимает старые сегменты истории розыгрышей.
+    
+    Контрольные точки (add_checkpoint) сохраняются после каждого сброса:
+    их completed() берётся до записи данных, а save() — после неё.
+    """
+    
+    def __init__(self, interval=FLUSH_INTERVAL, max_dirty=FLUSH_MAX_DIRTY):
+        self.interval = interval
+        self.max_dirty = max_dirty
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._checkpoints = []
+        self._next_compact = time.monotonic() + HISTORY_COMPACT_INTERVAL
+    
+    def start(self):
+        """Запуск фонового потока"""
+        data_manager.set_dirty_listener(self._on_dirty)
+        self._thread = threading.Thread(target=self._run, name='persistence', daemon=True)
+        self._thread.start()
+        logger.info("💾 Отложенное сохранение: каждые %sс или %s изменений", self.interval, self.max_dirty)
+    
+    def add_checkpoint(self, checkpoint):
+        """Например, UpdateTracker: offset пишется только после данных"""
+        self._checkpoints.append(checkpoint)
+    
+    def stop(self):
+        """Остановка потока и финальный сброс изменений"""
+        if not self._stopped.is_set():
+            self._stopped.set()
+            self._wakeup.set()
+            if self._thread:
+                self._thread.join()
+            data_manager.set_dirty_listener(None)
+        self.flush(force=True)
+    
+    def flush(self, force=False):
+        """Сохраняет изменённые хранилища (в режиме журнала — сжимает его)"""
+        try:
+            # Всё, что обработано до этой точки, попадёт на диск ниже
+            marks = [(checkpoint, checkpoint.completed()) for checkpoint in self._checkpoints]
+            stores = data_manager.persist(force)
+            if stores:
+                logger.debug("Сброшены хранилища: %s", ', '.join(stores))
+            for checkpoint, mark in marks:
+                checkpoint.save(mark)
+        except Exception as e:
+            logger.error("❌ Ошибка отложенного сохранения: %s", e)
+    
+    def _on_dirty(self, dirty_count):
+        if dirty_count >= self.max_dirty:
+            self._wakeup.set()
+    
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            if self._stopped.is_set():
+                break
+            self.flush()
+            if time.monotonic() >= self._next_compact:
+                self._next_compact = time.monotonic() + HISTORY_COMPACT_INTERVAL
+                try:
+                    data_manager.compact_history(HISTORY_KEEP_MONTHS)
+                except Exception as e:
+                    logger.error("❌ Ошибка сжатия истории: %s", e)
@@ -0,0 +1,172 @@
+from collections.abc import Mapping
+
+# Неизменяемый словарь со структурным разделением (hash array mapped trie):
+# set()/remove() копируют только путь от корня до листа — O(log32 n)
+# узлов по 32 ссылки, — а остальное дерево общее со старой версией.
+# Узел — список из 32 детей, лист — маленький dict {key: (seq, value)}.
+
+_BITS = 5
+_WIDTH = 1 << _BITS
+_MASK = _WIDTH - 1
+_LEAF = 8  # больше ключей в листе — делим его на узел
+_MAX_SHIFT = 60  # глубже хеш кончается, лист растёт без деления
+_HASH_MASK = (1 << 64) - 1
+
+def _hash(key):
+    return hash(key) & _HASH_MASK
+
+def _get(node, h, key):
+    shift = 0
+    while type(node) is list:
+        node = node[(h >> shift) & _MASK]
+        shift += _BITS
+    if node is None:
+        return None
+    return node.get(key)
+
+def _set(node, h, shift, key, item, copy=True):
+    """Узел с key -> item; copy=False меняет узлы на месте (при делении листа)"""
+    if node is None:
+        return {key: item}
+    if type(node) is list:
+        i = (h >> shift) & _MASK
+        child = _set(node[i], h, shift + _BITS, key, item, copy)
+        if copy:
+            node = list(node)
+        node[i] = child
+        return node
+    leaf = dict(node) if copy else node
+    leaf[key] = item
+    if len(leaf) <= _LEAF or shift >= _MAX_SHIFT:
+        return leaf
+    split = [None] * _WIDTH
+    for other, other_item in leaf.items():
+        split = _set(split, _hash(other), shift, other, other_item, copy=False)
+    return split
+
+def _build(entries, shift):
+    """Дерево из [(hash, key, item), ...] с разными ключами"""
+    if len(entries) <= _LEAF or shift >= _MAX_SHIFT:
+        return {key: item for _, key, item in entries}
+    slots = [[] for _ in range(_WIDTH)]
+    for entry in entries:
+        slots[(entry[0] >> shift) & _MASK].append(entry)
+    return [_build(slot, shift + _BITS) if slot else None for slot in slots]
+
+def _remove(node, h, shift, key):
+    """Узел без key (None, если он опустел)"""
+    if type(node) is list:
+        i = (h >> shift) & _MASK
+        child = _remove(node[i], h, shift + _BITS, key)
+        node = list(node)
+        node[i] = child
+        return node if any(node) else None
+    leaf = dict(node)
+    del leaf[key]
+    return leaf or None
+
+def _items(node, out):
+    if type(node) is list:
+        for child in node:
+            if child is not None:
+                _items(child, out)
+    else:
+        out.extend(node.items())
+
+class PersistentMap(Mapping):
+    """Словарь, который не меняется: set() и remove() возвращают новый
+    
+    Новая версия делит со старой всё, кроме пути к изменённому ключу,
+    поэтому запись в большой чат не копирует его целиком. Обход — в
+    порядке первого добавления ключа, как у dict; при замене значения
+    ключ остаётся на своём месте (order_of() не меняется).
+    """
+    
+    __slots__ = ('_root', '_len', '_next', '_order')
+    
+    def __init__(self, items=()):
+        # Повторный ключ, как в dict, остаётся на месте первого
+        data = dict(items)
+        self._len = self._next = len(data)
+        self._order = None
+        entries = [(_hash(key), key, (seq, value)) for seq, (key, value) in enumerate(data.items())]
+        self._root = _build(entries, 0) if entries else None
+    
+    @classmethod
+    def of(cls, items):
+        return items if isinstance(items, cls) else cls(items)
+    
+    def __len__(self):
+        return self._len
+    
+    def __getitem__(self, key):
+        item = _get(self._root, _hash(key), key)
+        if item is None:
+            raise KeyError(key)
+        return item[1]
+    
+    def get(self, key, default=None):
+        item = _get(self._root, _hash(key), key)
+        return default if item is None else item[1]
+    
+    def __contains__(self, key):
+        return _get(self._root, _hash(key), key) is not None
+    
+    def __iter__(self):
+        return (key for key, _ in self._ordered())
+    
+    def items(self):
+        return self._ordered()
+    
+    def values(self):
+        return tuple(value for _, value in self._ordered())
+    
+    def order_of(self, key):
+        """Номер ключа в порядке добавления (для сортировки «как в dict»)"""
+        item = _get(self._root, _hash(key), key)
+        if item is None:
+            raise KeyError(key)
+        return item[0]
+    
+    def set(self, key, value):
+        h = _hash(key)
+        old = _get(self._root, h, key)
+        result = PersistentMap.__new__(PersistentMap)
+        result._order = None
+        if old is None:
+            seq = self._next
+            result._next = self._next + 1
+            result._len = self._len + 1
+        else:
+            seq = old[0]
+            result._next = self._next
+            result._len = self._len
+        result._root = _set(self._root, h, 0, key, (seq, value))
+        return result
+    
+    def remove(self, key):
+        """Новый словарь без key (этот же, если ключа нет)"""
+        h = _hash(key)
+        if _get(self._root, h, key) is None:
+            return self
+        result = PersistentMap.__new__(PersistentMap)
+        result._order = None
+        result._next = self._next
+        result._len = self._len - 1
+        result._root = _remove(self._root, h, 0, key)
+        return result
+    
+    def _ordered(self):
+        """((key, value), ...) в порядке добавления, считается один раз на версию"""
+        if self._order is None:
+            items = []
+            if self._root is not None:
+                _items(self._root, items)
+            items.sort(key=lambda pair: pair[1][0])
+            self._order = tuple((key, item[1]) for key, item in items)
+        return self._order
+    
+    def __repr__(self):
+        return f"PersistentMap({dict(self._ordered())!r})"
+
+EMPTY = PersistentMap()
@@ -0,0 +1,121 @@
+import html
+import json
+import logging
+import os
+import random
+import string
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PRE = ("Кто же сегодня будет выбран? 🤔",)
+DEFAULT_RESULT = "{name} ({username})"
+TEMPLATE_FIELDS = ('name', 'username')
+
+class Template:
+    """Шаблон результата, разобранный один раз при загрузке
+    
+    Текст шаблона — HTML (в нём можно использовать разметку),
+    подставляемые значения экранируются.
+    """
+    
+    def __init__(self, source):
+        self.source = source
+        self._parts = []
+        for literal, field, spec, conversion in string.Formatter().parse(source):
+            if field is not None and field not in TEMPLATE_FIELDS:
+                raise ValueError(f"неизвестное поле {{{field}}} в шаблоне {source!r}")
+            self._parts.append((literal, field, spec or ''))
+    
+    def render(self, **values):
+        chunks = []
+        for literal, field, spec in self._parts:
+            chunks.append(literal)
+            if field is not None:
+                chunks.append(html.escape(format(values[field], spec), quote=False))
+        return ''.join(chunks)
+
+class Phrases:
+    """Фразы одного режима: варианты интриги и шаблон результата"""
+    
+    def __init__(self, pre=DEFAULT_PRE, result=DEFAULT_RESULT):
+        self.pre = tuple(pre) or DEFAULT_PRE
+        self.result = Template(result)
+    
+    def random_pre(self):
+        return random.choice(self.pre)
+    
+    def render_result(self, name, username):
+        return self.result.render(name=name, username=username)
+
+class PhraseBook:
+    """Режимы фраз из phrases.json с подхватом изменений файла
+    
+    Раз в check_interval секунд сверяет mtime файла и при изменении
+    собирает новый набор целиком, после чего подменяет его одним
+    присваиванием. Если файл испорчен, остаётся прежний набор.
+    """
+    
+    def __init__(self, path, check_interval=5):
+        self.path = path
+        self.check_interval = check_interval
+        self._modes = {}
+        self._mtime = None
+        self._next_check = 0
+        self._reload_lock = threading.Lock()
+    
+    def __contains__(self, mode):
+        self._check()
+        return mode in self._modes
+    
+    def modes(self):
+        return list(self._modes)
+    
+    def get(self, mode):
+        """Фразы режима mode, иначе 'default', иначе встроенные"""
+        self._check()
+        modes = self._modes
+        phrases = modes.get(mode) or modes.get('default')
+        return phrases if phrases is not None else _FALLBACK
+    
+    def load(self):
+        """Загружает файл; True, если набор фраз обновлён"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            logger.info("⚠️ Файл %s не найден", self.path)
+            return False
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            modes = {
+                mode: Phrases(spec.get('pre', DEFAULT_PRE), spec.get('result', DEFAULT_RESULT))
+                for mode, spec in data.items()
+            }
+        except Exception as e:
+            logger.error("❌ Ошибка загрузки %s, фразы не изменены: %s", self.path, e)
+            self._mtime = mtime
+            return False
+        self._modes = modes
+        self._mtime = mtime
+        logger.info("Загружены режимы фраз: %s", list(modes))
+        return True
+    
+    def _check(self):
+        now = time.monotonic()
+        if now < self._next_check or not self._reload_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_check = now + self.check_interval
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except OSError:
+                return
+            if mtime != self._mtime:
+                logger.info("🔄 %s изменён, перечитываем фразы", self.path)
+                self.load()
+        finally:
+            self._reload_lock.release()
+
+_FALLBACK = Phrases()
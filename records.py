@@ -0,0 +1,120 @@
+import sys
+from persistent import PersistentMap
+
+# Компактные записи вместо словарей: участник и строка статистики.
+# В памяти — объекты со __slots__ и интернированными строками, на диск
+# и в журнал уходят обычные словари той же формы, что и раньше.
+
+_MISSING = object()
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+class Member:
+    """Участник чата
+    
+    Поля, которых не было в исходной записи (например, id у добавленных
+    через /addmember), не появляются и в to_dict(); незнакомые ключи
+    сохраняются в extra.
+    """
+    
+    FIELDS = ('id', 'username', 'name', 'active', 'added_by', 'added_date')
+    __slots__ = FIELDS + ('extra',)
+    
+    def __init__(self, data):
+        for field in self.FIELDS:
+            setattr(self, field, _intern(data.get(field, _MISSING)))
+        extra = {key: value for key, value in data.items() if key not in self.FIELDS}
+        self.extra = extra or None
+    
+    @classmethod
+    def of(cls, member):
+        return member if isinstance(member, cls) else cls(member)
+    
+    def get(self, key, default=None):
+        if key in self.FIELDS:
+            value = getattr(self, key)
+        elif self.extra:
+            value = self.extra.get(key, _MISSING)
+        else:
+            value = _MISSING
+        return default if value is _MISSING else value
+    
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+    
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+    
+    def to_dict(self):
+        data = {}
+        for field in self.FIELDS:
+            value = getattr(self, field)
+            if value is not _MISSING:
+                data[field] = value
+        if self.extra:
+            data.update(self.extra)
+        return data
+    
+    def __eq__(self, other):
+        if isinstance(other, Member):
+            other = other.to_dict()
+        return self.to_dict() == other
+    
+    __hash__ = None
+    
+    def __repr__(self):
+        return f"Member({self.to_dict()!r})"
+
+class StatsEntry:
+    """Строка статистики: имя, username и число побед; не меняется после создания"""
+    
+    __slots__ = ('name', 'username', 'count')
+    
+    def __init__(self, name, username, count=0):
+        self.name = _intern(name)
+        self.username = _intern(username)
+        self.count = count
+    
+    @classmethod
+    def of(cls, entry):
+        if isinstance(entry, cls):
+            return entry
+        return cls(entry.get('name'), entry.get('username'), entry.get('count', 0))
+    
+    def won(self):
+        """Та же запись с ещё одной победой"""
+        return StatsEntry(self.name, self.username, self.count + 1)
+    
+    def get(self, key, default=None):
+        if key in self.__slots__:
+            return getattr(self, key)
+        return default
+    
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+    
+    def to_dict(self):
+        return {'name': self.name, 'username': self.username, 'count': self.count}
+    
+    def __eq__(self, other):
+        if isinstance(other, StatsEntry):
+            other = other.to_dict()
+        return self.to_dict() == other
+    
+    __hash__ = None
+    
+    def __repr__(self):
+        return f"StatsEntry({self.name!r}, {self.username!r}, {self.count})"
+
+def stats_from_dicts(entries):
+    """{user_key: dict} -> PersistentMap {user_key: StatsEntry}"""
+    return PersistentMap((key, StatsEntry.of(entry)) for key, entry in entries.items())
+
+def stats_to_dicts(entries):
+    return {key: entry.to_dict() for key, entry in entries.items()}
@@ -0,0 +1,177 @@
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS members (
+    pos INTEGER PRIMARY KEY AUTOINCREMENT,
+    chat_id TEXT NOT NULL,
+    user_id INTEGER,
+    username TEXT,
+    name TEXT,
+    active INTEGER NOT NULL DEFAULT 1,
+    added_by TEXT,
+    added_date TEXT
+);
+CREATE INDEX IF NOT EXISTS members_chat_user ON members (chat_id, user_id);
+CREATE INDEX IF NOT EXISTS members_chat_username ON members (chat_id, username);
+
+CREATE TABLE IF NOT EXISTS stats (
+    chat_id TEXT NOT NULL,
+    user_key TEXT NOT NULL,
+    name TEXT,
+    username TEXT,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (chat_id, user_key)
+);
+CREATE INDEX IF NOT EXISTS stats_leaderboard ON stats (chat_id, count DESC);
+
+CREATE TABLE IF NOT EXISTS last_used (
+    chat_id TEXT PRIMARY KEY,
+    day TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS settings (
+    chat_id TEXT PRIMARY KEY,
+    mode TEXT NOT NULL,
+    timezone TEXT
+);
+"""
+
+class SqliteStorage:
+    """Хранение участников, статистики, last_used и режимов в SQLite (WAL)
+    
+    Каждое изменение — одна короткая транзакция по индексу
+    (chat_id, user_id) / (chat_id, username), чаты читаются по одному.
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        # Базы, созданные до появления часовых поясов
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(settings)")]
+        if 'timezone' not in columns:
+            self._conn.execute("ALTER TABLE settings ADD COLUMN timezone TEXT")
+        logger.info("🗄 SQLite: %s", path)
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
+    
+    def is_empty(self):
+        with self._lock:
+            for table in ('members', 'stats', 'last_used', 'settings'):
+                if self._conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone():
+                    return False
+        return True
+    
+    def load_chat(self, chat_id):
+        """Возвращает (members, stats, last_used, settings) одного чата"""
+        with self._lock:
+            members = [
+                _member_from_row(row) for row in self._conn.execute(
+                    "SELECT user_id, username, name, active, added_by, added_date "
+                    "FROM members WHERE chat_id = ? ORDER BY pos", (chat_id,))
+            ]
+            stats = {
+                key: {'name': name, 'username': username, 'count': count}
+                for key, name, username, count in self._conn.execute(
+                    "SELECT user_key, name, username, count FROM stats "
+                    "WHERE chat_id = ? ORDER BY count DESC", (chat_id,))
+            }
+            row = self._conn.execute("SELECT day FROM last_used WHERE chat_id = ?", (chat_id,)).fetchone()
+            day = row[0] if row else None
+            row = self._conn.execute("SELECT mode, timezone FROM settings WHERE chat_id = ?", (chat_id,)).fetchone()
+        settings = {}
+        if row:
+            settings['mode'] = row[0]
+            if row[1]:
+                settings['timezone'] = row[1]
+        return members, stats, day, settings
+    
+    def timezones(self):
+        """{chat_id: timezone} чатов, у которых задан часовой пояс"""
+        with self._lock:
+            return dict(self._conn.execute("SELECT chat_id, timezone FROM settings WHERE timezone IS NOT NULL"))
+    
+    def apply(self, op, chat_id, payload):
+        """Записывает одно изменение (те же операции, что и в журнале)"""
+        with self._lock, self._conn:
+            self._apply(op, chat_id, payload)
+    
+    def import_data(self, chat_members, clown_stats, last_used, group_settings):
+        """Одноразовый перенос данных из JSON-файлов в одной транзакции"""
+        with self._lock, self._conn:
+            for chat_id, members in chat_members.items():
+                for member in members:
+                    self._apply('member_add', chat_id, {'member': member})
+            for chat_id, entries in clown_stats.items():
+                for key, entry in entries.items():
+                    self._apply('win', chat_id, {'key': key, 'entry': entry})
+            for chat_id, day in last_used.items():
+                self._apply('last_used', chat_id, {'day': day})
+            for chat_id, settings in group_settings.items():
+                if 'mode' in settings:
+                    self._apply('mode', chat_id, {'mode': settings['mode']})
+                if settings.get('timezone'):
+                    self._apply('timezone', chat_id, {'timezone': settings['timezone']})
+    
+    def _apply(self, op, chat_id, payload):
+        conn = self._conn
+        if op == 'member_add':
+            m = payload['member']
+            conn.execute(
+                "INSERT INTO members (chat_id, user_id, username, name, active, added_by, added_date) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (chat_id, m.get('id'), m.get('username'), m.get('name'),
+                 1 if m.get('active', True) else 0, m.get('added_by'), m.get('added_date')))
+        elif op == 'member_remove':
+            if 'id' in payload:
+                conn.execute("DELETE FROM members WHERE chat_id = ? AND user_id = ?", (chat_id, payload['id']))
+            else:
+                conn.execute("DELETE FROM members WHERE chat_id = ? AND username = ?", (chat_id, payload['username']))
+        elif op == 'win':
+            e = payload['entry']
+            conn.execute(
+                "INSERT INTO stats (chat_id, user_key, name, username, count) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (chat_id, user_key) DO UPDATE SET "
+                "name = excluded.name, username = excluded.username, count = excluded.count",
+                (chat_id, payload['key'], e.get('name'), e.get('username'), e.get('count', 0)))
+        elif op == 'last_used':
+            conn.execute(
+                "INSERT INTO last_used (chat_id, day) VALUES (?, ?) "
+                "ON CONFLICT (chat_id) DO UPDATE SET day = excluded.day",
+                (chat_id, payload['day']))
+        elif op == 'mode':
+            conn.execute(
+                "INSERT INTO settings (chat_id, mode) VALUES (?, ?) "
+                "ON CONFLICT (chat_id) DO UPDATE SET mode = excluded.mode",
+                (chat_id, payload['mode']))
+        elif op == 'timezone':
+            # Режим по умолчанию, если строки чата ещё нет
+            conn.execute(
+                "INSERT INTO settings (chat_id, mode, timezone) VALUES (?, 'clown', ?) "
+                "ON CONFLICT (chat_id) DO UPDATE SET timezone = excluded.timezone",
+                (chat_id, payload['timezone']))
+        else:
+            raise ValueError(f"Неизвестная операция: {op}")
+
+def _member_from_row(row):
+    user_id, username, name, active, added_by, added_date = row
+    member = {}
+    if user_id is not None:
+        member['id'] = user_id
+    member.update({
+        'username': username,
+        'name': name,
+        'active': bool(active),
+        'added_by': added_by,
+        'added_date': added_date,
+    })
+    return member
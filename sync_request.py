@@ -1,112 +1,150 @@
-import logging
-from typing import Optional, Tuple, Union
-import requests
-from telegram.request import BaseRequest
-from telegram.request._baserequest import DefaultValue, RequestData
-
-logger = logging.getLogger(__name__)
-
-class SyncRequest(BaseRequest):
-    """Синхронный запрос через библиотеку requests"""
-    
-    def __init__(
-        self,
-        connect_timeout: float = 5.0,
-        read_timeout: float = 5.0,
-        write_timeout: float = 5.0,
-        pool_timeout: float = 1.0,
-    ):
-        self._connect_timeout = connect_timeout
-        self._read_timeout = read_timeout
-        self._write_timeout = write_timeout
-        self._pool_timeout = pool_timeout
-    
-    @property
-    def read_timeout(self) -> float:
-        return self._read_timeout
-    
-    @property
-    def write_timeout(self) -> float:
-        return self._write_timeout
-    
-    @property
-    def connect_timeout(self) -> float:
-        return self._connect_timeout
-    
-    @property
-    def pool_timeout(self) -> float:
-        return self._pool_timeout
-    
-    async def initialize(self) -> None:
-        logger.debug("SyncRequest initialized")
-    
-    async def shutdown(self) -> None:
-        logger.debug("SyncRequest shutdown")
-    
-    async def do_request(
-        self,
-        method: str,
-        url: str,
-        headers: Optional[dict] = None,
-        data: Optional[bytes] = None,
-        timeout: Optional[float] = None,
-        **kwargs
-    ) -> Tuple[int, bytes]:
-        """Выполняет HTTP запрос синхронно"""
-        
-        logger.info(f"SyncRequest: {method} {url}")
-        
-        # Извлекаем request_data
-        request_data = kwargs.get('request_data')
-        
-        # Преобразуем RequestData в bytes
-        if isinstance(request_data, RequestData):
-            # RequestData имеет метод json_bytes или параметры
-            if hasattr(request_data, 'json_bytes'):
-                data = request_data.json_bytes
-            elif hasattr(request_data, 'parameters'):
-                import json
-                data = json.dumps(request_data.parameters).encode('utf-8')
-            elif hasattr(request_data, 'multipart_data'):
-                data = request_data.multipart_data
-            else:
-                # Пробуем преобразовать в JSON
-                import json
-                data = json.dumps(request_data.__dict__).encode('utf-8')
-        elif request_data is not None:
-            data = request_data
-        elif data is None:
-            data = b''
-        
-        # Извлекаем таймауты
-        connect_timeout = kwargs.get('connect_timeout', self._connect_timeout)
-        read_timeout = kwargs.get('read_timeout', self._read_timeout)
-        write_timeout = kwargs.get('write_timeout', self._write_timeout)
-        
-        # Заменяем DefaultValue
-        if isinstance(connect_timeout, DefaultValue):
-            connect_timeout = self._connect_timeout
-        if isinstance(read_timeout, DefaultValue):
-            read_timeout = self._read_timeout
-        if isinstance(write_timeout, DefaultValue):
-            write_timeout = self._write_timeout
-        
-        # Формируем таймаут
-        if timeout is None:
-            timeout = connect_timeout + read_timeout + write_timeout
-        
-        try:
-            response = requests.request(
-                method=method,
-                url=url,
-                headers=headers,
-                data=data,
-                timeout=timeout,
-            )
-            
-            logger.info(f"SyncRequest response: {response.status_code}")
-            return response.status_code, response.content
-            
-        except Exception as e:
-            logger.error(f"SyncRequest error: {e}")
-            raise
\ No newline at end of file
+import logging
+import re
+import threading
+from typing import Optional, Tuple, Union
+import requests
+from requests.adapters import HTTPAdapter
+from telegram.error import TimedOut
+from telegram.request import BaseRequest
+from telegram.request._baserequest import DefaultValue, RequestData
+
+logger = logging.getLogger(__name__)
+
+# В URL запроса Bot API стоит токен бота: в логи он попасть не должен
+_TOKEN_RE = re.compile(r'/bot[^/\s]+/')
+
+def _hide_token(text: str) -> str:
+    return _TOKEN_RE.sub('/bot***/', text)
+
+class SyncRequest(BaseRequest):
+    """Синхронный запрос через библиотеку requests
+    
+    Держит одну requests.Session с пулом keep-alive соединений на всё
+    время жизни объекта. Одновременных запросов не больше
+    connection_pool_size, ожидание свободного соединения — не дольше
+    pool_timeout.
+    """
+    
+    def __init__(
+        self,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 5.0,
+        write_timeout: float = 5.0,
+        pool_timeout: float = 1.0,
+        connection_pool_size: int = 8,
+    ):
+        self._connect_timeout = connect_timeout
+        self._read_timeout = read_timeout
+        self._write_timeout = write_timeout
+        self._pool_timeout = pool_timeout
+        self._pool_size = connection_pool_size
+        self._slots = threading.BoundedSemaphore(connection_pool_size)
+        self._session = None
+        self._session_lock = threading.Lock()
+    
+    @property
+    def read_timeout(self) -> float:
+        return self._read_timeout
+    
+    @property
+    def write_timeout(self) -> float:
+        return self._write_timeout
+    
+    @property
+    def connect_timeout(self) -> float:
+        return self._connect_timeout
+    
+    @property
+    def pool_timeout(self) -> float:
+        return self._pool_timeout
+    
+    def _get_session(self) -> requests.Session:
+        with self._session_lock:
+            if self._session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self._pool_size)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                self._session = session
+            return self._session
+    
+    async def initialize(self) -> None:
+        self._get_session()
+        logger.debug("SyncRequest initialized (пул %s)", self._pool_size)
+    
+    async def shutdown(self) -> None:
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+        logger.debug("SyncRequest shutdown")
+    
+    async def do_request(
+        self,
+        url: str,
+        method: str,
+        headers: Optional[dict] = None,
+        data: Optional[bytes] = None,
+        timeout: Optional[float] = None,
+        **kwargs
+    ) -> Tuple[int, bytes]:
+        """Выполняет HTTP запрос синхронно"""
+        
+        logger.debug("SyncRequest: %s %s", method, url.rsplit('/', 1)[-1])
+        
+        # Извлекаем request_data
+        request_data = kwargs.get('request_data')
+        files = None
+        
+        # Как HTTPXRequest: параметры — полями формы (значения уже в JSON),
+        # файлы — multipart. Тело json_bytes без Content-Type Bot API не разбирает
+        if isinstance(request_data, RequestData):
+            data = request_data.json_parameters
+            files = request_data.multipart_data or None
+        elif request_data is not None:
+            data = request_data
+        elif data is None:
+            data = b''
+        
+        # Извлекаем таймауты
+        connect_timeout = kwargs.get('connect_timeout', self._connect_timeout)
+        read_timeout = kwargs.get('read_timeout', self._read_timeout)
+        write_timeout = kwargs.get('write_timeout', self._write_timeout)
+        pool_timeout = kwargs.get('pool_timeout', self._pool_timeout)
+        
+        # Заменяем DefaultValue
+        if isinstance(connect_timeout, DefaultValue):
+            connect_timeout = self._connect_timeout
+        if isinstance(read_timeout, DefaultValue):
+            read_timeout = self._read_timeout
+        if isinstance(write_timeout, DefaultValue):
+            write_timeout = self._write_timeout
+        if isinstance(pool_timeout, DefaultValue):
+            pool_timeout = self._pool_timeout
+        
+        # requests не умеет отдельный таймаут записи: (connect, read),
+        # запись тела укладывается в read
+        if timeout is None:
+            timeout = (connect_timeout, read_timeout)
+        
+        # Ждём свободное соединение из пула не дольше pool_timeout
+        if not self._slots.acquire(timeout=pool_timeout):
+            raise TimedOut(f"Пул соединений занят дольше {pool_timeout}с")
+        try:
+            response = self._get_session().request(
+                method=method,
+                url=url,
+                headers=headers,
+                data=data,
+                files=files,
+                timeout=timeout,
+            )
+            
+            logger.debug("SyncRequest response: %s", response.status_code)
+            return response.status_code, response.content
+            
+        except Exception as e:
+            logger.error("SyncRequest error: %s", _hide_token(str(e)))
+            raise
+        finally:
+            self._slots.release()
\ No newline at end of file
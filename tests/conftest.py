@@ -0,0 +1,58 @@
+import os
+import tempfile
+from collections import OrderedDict
+
+# До импорта data_manager: иначе файлы данных по умолчанию лягут рядом с кодом
+os.environ.setdefault('DATA_DIR', tempfile.mkdtemp(prefix='clown-tests-'))
+os.environ.setdefault('BOT_TOKEN', '123:test')
+
+import pytest
+import data_manager
+
+# Пути data_manager, которые тест переносит в свой tmp_path
+FILES = {
+    'STATS_FILE': 'clown_stats.json',
+    'LAST_USED_FILE': 'last_used.json',
+    'MEMBERS_FILE': 'chat_members.json',
+    'GROUP_SETTINGS_FILE': 'group_settings.json',
+    'JOURNAL_FILE': 'journal.log',
+    'SQLITE_FILE': 'clown.db',
+    'CHATS_DIR': 'chats',
+    'HISTORY_DIR': 'history',
+}
+
+def _forget():
+    """Пустые данные в памяти, как у только что запущенного бота"""
+    for name in ('last_used', 'chat_members', 'clown_stats', 'group_settings', '_leaderboards', '_period_boards'):
+        setattr(data_manager, name, {})
+    data_manager._dirty_stores = set()
+    data_manager._dirty_chats = set()
+    data_manager._dirty_count = 0
+    data_manager._loaded_chats = OrderedDict()
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """data_manager с данными в tmp_path; после теста всё возвращается как было"""
+    for name, filename in FILES.items():
+        monkeypatch.setattr(data_manager, name, str(tmp_path / filename))
+    for name in ('last_used', 'chat_members', 'clown_stats', 'group_settings', '_leaderboards', '_period_boards',
+                 '_dirty_stores', '_dirty_chats', '_dirty_count', '_loaded_chats', 'storage_mode', 'hot_chats_limit'):
+        monkeypatch.setattr(data_manager, name, getattr(data_manager, name))
+    _forget()
+    yield tmp_path
+    data_manager.close_storage()
+
+@pytest.fixture
+def reopen(data_dir):
+    """reopen(mode) — перезапуск бота: закрыть хранилище, забыть память, загрузить заново
+    
+    Несохранённое при этом теряется, как при падении; чистое завершение —
+    data_manager.persist(force=True) перед reopen().
+    """
+    def reopen(mode):
+        data_manager.close_storage()
+        _forget()
+        data_manager.configure_storage(mode)
+        data_manager.load_all_data()
+    
+    return reopen
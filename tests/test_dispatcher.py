@@ -0,0 +1,67 @@
+import random
+import threading
+import time
+from types import SimpleNamespace
+from dispatcher import ChatDispatcher
+
+def update(update_id, chat_id):
+    return SimpleNamespace(update_id=update_id, message=SimpleNamespace(chat=SimpleNamespace(id=chat_id)))
+
+def test_updates_of_one_chat_stay_in_order():
+    handled = []
+    done = []
+    lock = threading.Lock()
+    
+    def handle(updates):
+        # Случайная пауза, чтобы шарды обгоняли друг друга
+        time.sleep(random.random() / 1000)
+        with lock:
+            handled.extend(updates)
+    
+    dispatcher = ChatDispatcher(handle, shards=4, done=done.append)
+    dispatcher.start()
+    batch = [update(i, -100 - random.randrange(10)) for i in range(500)]
+    dispatcher.submit(batch)
+    dispatcher.stop()
+    
+    for chat_id in {u.message.chat.id for u in batch}:
+        expected = [u.update_id for u in batch if u.message.chat.id == chat_id]
+        assert [u.update_id for u in handled if u.message.chat.id == chat_id] == expected
+    assert sorted(done) == list(range(500))
+
+def test_call_runs_in_chat_order_and_failures_are_done():
+    events = []
+    
+    def handle(updates):
+        if updates[0].update_id == 2:
+            raise RuntimeError("сбой обработчика")
+        events.append(updates[0].update_id)
+    
+    done = []
+    dispatcher = ChatDispatcher(handle, shards=2, done=done.append)
+    dispatcher.start()
+    dispatcher.submit([update(1, -7), update(2, -7)])
+    dispatcher.call(-7, events.append, 'отложенное')
+    dispatcher.submit([update(3, -7)])
+    dispatcher.stop()
+    
+    assert events == [1, 'отложенное', 3]
+    # Упавшее обновление тоже считается обработанным, иначе offset встанет
+    assert done == [1, 2, 3]
+
+def test_queue_depth_is_exported_per_shard():
+    from bot_runner import BotRunner
+    from metrics import REGISTRY
+    runner = BotRunner()
+    runner.dispatcher = ChatDispatcher(lambda updates: None, shards=3)
+    runner.dispatcher.submit([update(1, 3), update(2, 6), update(3, 4)])
+    
+    lines = [line for line in REGISTRY.render().splitlines() if line.startswith('clown_dispatch_queue')]
+    
+    assert lines == [
+        'clown_dispatch_queue{shard="0"} 2',
+        'clown_dispatch_queue{shard="1"} 1',
+        'clown_dispatch_queue{shard="2"} 0',
+    ]
+    runner.timers.stop()
+    runner.outbox.stop()
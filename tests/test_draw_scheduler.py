@@ -0,0 +1,75 @@
+import threading
+from datetime import datetime
+from zoneinfo import ZoneInfo
+import data_manager
+from draw_scheduler import DrawScheduler
+
+def at(text, timezone):
+    return datetime.fromisoformat(text).replace(tzinfo=ZoneInfo(timezone)).timestamp()
+
+def test_next_run_is_local_midnight():
+    scheduler = DrawScheduler(draw=None, window=0)
+    now = at('2026-03-01 23:00', 'Asia/Tokyo')
+    
+    assert scheduler.next_run('-1', 'Asia/Tokyo', now) == at('2026-03-02 00:00', 'Asia/Tokyo')
+    # Та же минута в другом поясе — другая полночь
+    assert scheduler.next_run('-1', 'Europe/Berlin', now) == at('2026-03-02 00:00', 'Europe/Berlin')
+
+def test_next_run_across_daylight_saving():
+    scheduler = DrawScheduler(draw=None, window=0)
+    first = scheduler.next_run('-1', 'Europe/Berlin', at('2026-03-28 12:00', 'Europe/Berlin'))
+    second = scheduler.next_run('-1', 'Europe/Berlin', first)
+    
+    # В ночь перевода часов сутки короче на час
+    assert second - first == 23 * 3600
+    assert datetime.fromtimestamp(second, ZoneInfo('Europe/Berlin')).hour == 0
+
+def test_offset_is_stable_and_within_window():
+    scheduler = DrawScheduler(draw=None, window=600)
+    now = at('2026-03-01 12:00', 'UTC')
+    midnight = at('2026-03-02 00:00', 'UTC')
+    offsets = {scheduler.next_run(str(-i), 'UTC', now) - midnight for i in range(100)}
+    
+    assert all(0 <= offset < 600 for offset in offsets)
+    assert len(offsets) > 50
+    assert scheduler.next_run('-7', 'UTC', now) == scheduler.next_run('-7', 'UTC', now)
+
+def test_catch_up_after_restart():
+    scheduler = DrawScheduler(draw=None, window=0)
+    now = at('2026-03-01 09:00', 'UTC')
+    
+    assert scheduler.next_run('-1', 'UTC', now, catch_up=True) == now
+    assert scheduler.next_run('-1', 'UTC', now) == at('2026-03-02 00:00', 'UTC')
+
+def test_scheduler_follows_timezone_changes(data_dir):
+    data_manager.set_chat_timezone('-1', 'Asia/Tokyo')
+    data_manager.set_chat_timezone('-2', 'Нет/Такого')
+    drawn = []
+    ready = threading.Event()
+    
+    def draw(chat_id):
+        drawn.append(chat_id)
+        ready.set()
+    
+    scheduler = DrawScheduler(draw, window=0)
+    scheduler.start()
+    try:
+        # Сегодняшняя полночь уже прошла: розыгрыш догоняется сразу
+        assert ready.wait(5)
+        assert drawn == ['-1']
+        assert scheduler.scheduled() == 1
+        
+        data_manager.set_chat_timezone('-3', 'Europe/Moscow')
+        assert scheduler.scheduled() == 2
+        data_manager.set_chat_timezone('-1', None)
+        assert scheduler.scheduled() == 1
+    finally:
+        scheduler.stop()
+    assert drawn == ['-1']
+
+def test_chat_today_uses_timezone(data_dir):
+    data_manager.set_chat_timezone('-1', 'Pacific/Kiritimati')
+    data_manager.set_chat_timezone('-2', 'Pacific/Pago_Pago')
+    
+    # UTC+14 и UTC-11: в эти сутки дни у чатов всегда разные
+    assert data_manager.chat_today('-1') != data_manager.chat_today('-2')
@@ -0,0 +1,104 @@
+import os
+from datetime import date
+import pytest
+import data_manager
+import history
+from history import DrawHistory
+
+ANN = {'id': 1, 'username': 'ann', 'name': 'Ann'}
+BOB = {'id': 2, 'username': 'bob', 'name': 'Bob'}
+
+def counts(entries):
+    return {key: entry.count for key, entry in entries.items()}
+
+def draw(chat_id, day, winner):
+    """Как в handlers: статистика, last_used, потом история"""
+    data_manager.increment_win(chat_id, winner)
+    data_manager.set_last_used(chat_id, day)
+    data_manager.record_draw(chat_id, day, winner)
+
+def test_redraw_after_crash_replaces_the_day(reopen):
+    reopen('chats')
+    draw('-1', '2026-05-04', ANN)
+    
+    # Падение до сброса: статистики и last_used нет, строка истории уже записана
+    reopen('chats')
+    assert data_manager.get_chat_stats('-1') == {}
+    draw('-1', '2026-05-04', BOB)
+    
+    stats = {key: entry.count for key, entry in data_manager.get_chat_stats('-1').items()}
+    _, board = data_manager.get_period_leaderboard('-1', 'month', '2026-05')
+    assert stats == {'bob': 1}
+    assert counts(board.entries) == stats
+    
+    data_manager.persist(force=True)
+    reopen('chats')
+    assert counts(data_manager.draw_history.rollup('-1', 'week', '2026-W19')) == {'bob': 1}
+    with open(os.path.join(data_manager.draw_history.chat_dir('-1'), '2026-05.jsonl'), encoding='utf-8') as f:
+        assert len(f.readlines()) == 1
+
+def test_rollups_per_period(tmp_path):
+    draws = DrawHistory(str(tmp_path))
+    draws.record('-1', '2025-12-29', 'ann', ANN, 'clown')
+    draws.record('-1', '2026-01-01', 'bob', BOB, 'clown')
+    draws.record('-1', '2026-01-02', 'ann', ANN, 'clown')
+    # Тот же победитель дня повторно ничего не меняет
+    draws.record('-1', '2026-01-02', 'ann', ANN, 'clown')
+    
+    # 29.12.2025 — уже первая ISO-неделя 2026 года
+    assert counts(draws.rollup('-1', 'week', '2026-W01')) == {'ann': 2, 'bob': 1}
+    assert counts(draws.rollup('-1', 'month', '2025-12')) == {'ann': 1}
+    assert counts(draws.rollup('-1', 'month', '2026-01')) == {'bob': 1, 'ann': 1}
+    assert counts(draws.rollup('-1', 'year', '2026')) == {'bob': 1, 'ann': 1}
+    assert draws.periods('-1', 'month') == ['2025-12', '2026-01']
+    assert draws.rollup('-1', 'month', '2026-02') == {}
+
+def test_segments_are_replayed_after_restart(tmp_path):
+    draws = DrawHistory(str(tmp_path))
+    draws.record('-1', '2026-01-01', 'ann', ANN, 'clown')
+    draws.flush()
+    draws.record('-1', '2026-01-02', 'bob', BOB, 'clown')
+    draws.record('-1', '2026-01-02', 'ann', ANN, 'clown')
+    
+    # Последние записи не сброшены во flush(): итоги догоняются по сегменту
+    restarted = DrawHistory(str(tmp_path))
+    assert counts(restarted.rollup('-1', 'month', '2026-01')) == {'ann': 2}
+    assert restarted.rollups('-1')['segments'] == {'2026-01': 2}
+
+def test_replace_is_safe_if_interrupted(tmp_path, monkeypatch):
+    draws = DrawHistory(str(tmp_path))
+    draws.record('-1', '2026-01-01', 'ann', ANN, 'clown')
+    draws.record('-1', '2026-01-02', 'ann', ANN, 'clown')
+    draws.flush()
+    real_replace = os.replace
+    
+    def crash(src, dst):
+        if dst.endswith('.jsonl'):
+            raise OSError("падение")
+        real_replace(src, dst)
+    
+    monkeypatch.setattr(history.os, 'replace', crash)
+    with pytest.raises(OSError):
+        draws.record('-1', '2026-01-02', 'bob', BOB, 'clown')
+    monkeypatch.undo()
+    
+    # Сегмент остался старым, итоги на диске догоняют его
+    assert counts(DrawHistory(str(tmp_path)).rollup('-1', 'month', '2026-01')) == {'ann': 2}
+    assert counts(draws.rollup('-1', 'month', '2026-01')) == {'ann': 2}
+
+def test_compaction_keeps_rollups(tmp_path):
+    draws = DrawHistory(str(tmp_path))
+    draws.record('-1', '2025-01-10', 'ann', ANN, 'clown')
+    draws.record('-1', '2025-02-10', 'bob', BOB, 'clown')
+    draws.record('-1', '2026-01-10', 'ann', ANN, 'clown')
+    draws.flush()
+    
+    assert draws.compact(keep_months=11, today=date(2026, 1, 15)) == 1
+    
+    directory = draws.chat_dir('-1')
+    assert sorted(os.listdir(directory)) == ['2025-01.jsonl.gz', '2025-02.jsonl', '2026-01.jsonl', 'rollups.json']
+    restarted = DrawHistory(str(tmp_path))
+    assert counts(restarted.rollup('-1', 'year', '2025')) == {'ann': 1, 'bob': 1}
+    # Пересчёт с нуля читает и сжатые сегменты
+    os.remove(os.path.join(directory, 'rollups.json'))
+    assert counts(DrawHistory(str(tmp_path)).rebuild('-1')['year']['2025']) == {'ann': 1, 'bob': 1}
@@ -0,0 +1,41 @@
+import pytest
+import data_manager
+
+ANN = {'id': 1, 'username': 'ann', 'name': 'Ann', 'active': True}
+BOB = {'id': 2, 'username': 'bob', 'name': 'Bob', 'active': True}
+CARL = {'id': 3, 'username': 'carl', 'name': 'Carl', 'active': True}
+
+def usernames(chat_id):
+    return [member['username'] for member in data_manager.get_all_members(chat_id)]
+
+@pytest.mark.parametrize('mode', ['sqlite', 'chats'])
+def test_least_recently_used_chat_is_evicted(reopen, mode):
+    data_manager.configure_storage(mode, hot_chats=2)
+    reopen(mode)
+    data_manager.add_member('-1', ANN)
+    data_manager.add_member('-2', BOB)
+    data_manager.get_chat_stats('-1')
+    
+    data_manager.add_member('-3', CARL)
+    
+    assert list(data_manager._loaded_chats) == ['-1', '-3']
+    assert '-2' not in data_manager.chat_members
+    # Вытесненный чат подгружается заново при следующем обращении
+    assert usernames('-2') == ['bob']
+    assert list(data_manager._loaded_chats) == ['-3', '-2']
+
+@pytest.mark.parametrize('mode', ['sqlite', 'chats'])
+def test_evicted_chat_is_written_back(reopen, mode):
+    data_manager.configure_storage(mode, hot_chats=1)
+    reopen(mode)
+    data_manager.add_member('-1', ANN)
+    data_manager.increment_win('-1', ANN)
+    data_manager.set_chat_mode('-1', 'pidor')
+    
+    data_manager.get_chat_stats('-2')
+    
+    # Без сброса на диск: изменения чата записаны при вытеснении
+    reopen(mode)
+    assert usernames('-1') == ['ann']
+    assert data_manager.get_chat_stats('-1')['ann'].count == 1
+    assert data_manager.get_chat_mode('-1') == 'pidor'
@@ -0,0 +1,62 @@
+import os
+import pytest
+import data_manager
+
+CHAT = '-1001'
+ANN = {'id': 1, 'username': 'ann', 'name': 'Ann', 'active': True}
+BOB = {'id': 2, 'username': 'bob', 'name': 'Bob', 'active': True}
+
+def usernames(chat_id):
+    return [member['username'] for member in data_manager.get_all_members(chat_id)]
+
+def test_journal_replays_over_snapshot(reopen):
+    reopen('journal')
+    data_manager.add_member(CHAT, ANN)
+    data_manager.increment_win(CHAT, ANN)
+    data_manager.compact_journal()
+    # Дальше — только в журнале поверх снимка
+    data_manager.add_member(CHAT, BOB)
+    data_manager.increment_win(CHAT, ANN)
+    data_manager.set_chat_mode(CHAT, 'pidor')
+    
+    reopen('journal')
+    
+    assert usernames(CHAT) == ['ann', 'bob']
+    assert data_manager.get_chat_stats(CHAT)['ann'].count == 2
+    assert data_manager.get_chat_mode(CHAT) == 'pidor'
+    # Проигранный журнал сразу свёрнут в снимки
+    assert os.path.getsize(data_manager.JOURNAL_FILE) == 0
+    assert not os.path.exists(data_manager.JOURNAL_FILE + '.old')
+
+@pytest.mark.parametrize('snapshot_written', [False, True])
+def test_journal_replays_interrupted_compaction(reopen, monkeypatch, snapshot_written):
+    reopen('journal')
+    data_manager.add_member(CHAT, ANN)
+    data_manager.increment_win(CHAT, ANN)
+    
+    save_all_data = data_manager.save_all_data
+    
+    def crash():
+        if snapshot_written:
+            save_all_data()
+        raise OSError("падение посреди сжатия")
+    
+    with monkeypatch.context() as m:
+        m.setattr(data_manager, 'save_all_data', crash)
+        with pytest.raises(OSError):
+            data_manager.compact_journal()
+    assert os.path.exists(data_manager.JOURNAL_FILE + '.old')
+    data_manager.add_member(CHAT, BOB)
+    data_manager.increment_win(CHAT, ANN)
+    
+    reopen('journal')
+    
+    # Записи из .old применены поверх снимка, в том числе уже попавшие в него
+    assert usernames(CHAT) == ['ann', 'bob']
+    assert data_manager.get_chat_stats(CHAT)['ann'].count == 2
+    assert not os.path.exists(data_manager.JOURNAL_FILE + '.old')
+    
+    reopen('journal')
+    
+    assert usernames(CHAT) == ['ann', 'bob']
+    assert data_manager.get_chat_stats(CHAT)['ann'].count == 2
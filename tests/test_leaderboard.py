@@ -0,0 +1,57 @@
+import random
+import pytest
+from leaderboard import Leaderboard
+from persistent import PersistentMap
+from records import StatsEntry
+
+def reference_order(entries):
+    """Порядок таблицы по определению: больше побед выше, при равенстве — кто раньше в статистике"""
+    order = list(entries)
+    return sorted(order, key=lambda key: (-entries[key].count, order.index(key)))
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    # Маленькие куски, чтобы деление и удаление кусков случались в каждом тесте
+    monkeypatch.setattr(Leaderboard, 'CHUNK', 4)
+
+def test_leaderboard_order_after_updated(small_chunks):
+    rng = random.Random(7)
+    entries = PersistentMap((f"u{i}", StatsEntry(f"User {i}", f"u{i}", rng.randrange(5))) for i in range(40))
+    board = Leaderboard(entries)
+    for _ in range(500):
+        key = f"u{rng.randrange(60)}"
+        entry = entries.get(key) or StatsEntry(key, key)
+        entries = entries.set(key, entry.won())
+        old, old_order = board, [key for key, _ in board.top()]
+        board = board.updated(entries, key)
+        
+        assert [key for key, _ in board.top()] == reference_order(entries)
+        # Опубликованная таблица не меняется
+        assert [key for key, _ in old.top()] == old_order
+    assert [key for key, _ in Leaderboard(entries).top()] == reference_order(entries)
+
+def test_leaderboard_pages_cover_the_table(small_chunks):
+    entries = PersistentMap((f"u{i}", StatsEntry(f"User {i}", f"u{i}", i % 7)) for i in range(23))
+    board = Leaderboard(entries).updated(entries.set('u5', entries['u5'].won()), 'u5')
+    
+    assert board.pages(5) == 5
+    pages = [board.page(number, 5) for number in range(board.pages(5))]
+    assert [len(page) for page in pages] == [5, 5, 5, 5, 3]
+    assert [pair for page in pages for pair in page] == board.top()
+    assert board.top(3) == board.page(0, 5)[:3]
+    assert board.page(5, 5) == []
+
+def test_leaderboard_render_cache_is_per_version():
+    entries = PersistentMap({'ann': StatsEntry('Ann', 'ann', 1)})
+    board = Leaderboard(entries)
+    calls = []
+    
+    def build():
+        calls.append(1)
+        return f"текст {len(calls)}"
+    
+    assert board.render(('clown', 0), build) == "текст 1"
+    assert board.render(('clown', 0), build) == "текст 1"
+    new = board.updated(entries.set('ann', entries['ann'].won()), 'ann')
+    assert new.render(('clown', 0), build) == "текст 2"
+    assert board.render(('clown', 0), build) == "текст 1"
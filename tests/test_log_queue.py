@@ -0,0 +1,47 @@
+import io
+import logging
+import log_queue
+from log_queue import RateLimitFilter, start_logging, stop_logging
+
+def record(msg, *args, level=logging.INFO):
+    return logging.LogRecord('bot', level, __file__, 1, msg, args, None)
+
+def test_rate_limit_per_template(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(log_queue.time, 'monotonic', lambda: now[0])
+    limiter = RateLimitFilter(rate=2, burst=3)
+    
+    passed = [limiter.filter(record("Чат %s", chat_id)) for chat_id in range(5)]
+    
+    assert passed == [True, True, True, False, False]
+    # Другой шаблон и предупреждения считаются отдельно
+    assert limiter.filter(record("Другое %s", 1))
+    assert limiter.filter(record("Чат %s", 6, level=logging.WARNING))
+    
+    now[0] += 0.5
+    late = record("Чат %s", 7)
+    assert limiter.filter(late)
+    assert late.getMessage() == "Чат 7 (пропущено похожих: 2)"
+    assert not limiter.filter(record("Чат %s", 8))
+
+def test_zero_rate_disables_limit():
+    limiter = RateLimitFilter(rate=0, burst=0)
+    
+    assert all(limiter.filter(record("Чат %s", i)) for i in range(1000))
+
+def test_queue_writes_structured_fields():
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    stream = io.StringIO()
+    try:
+        start_logging(logging.INFO, '%(levelname)s %(message)s', stream=stream)
+        logging.getLogger('bot').info("Команда %s", 'clown', extra={'chat_id': -5, 'duration': 0.25})
+        stop_logging()
+    finally:
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+        for handler in handlers:
+            root.addHandler(handler)
+        root.setLevel(level)
+    
+    assert stream.getvalue() == "INFO Команда clown [chat_id=-5 duration=250.0ms]\n"
@@ -0,0 +1,71 @@
+import random
+from member_index import MemberIndex
+
+def member(seq, user_id=None, username=None, active=True):
+    data = {'name': f"User {seq}", 'active': active}
+    if user_id is not None:
+        data['id'] = user_id
+    if username is not None:
+        data['username'] = username
+    return data
+
+def check_index(index, expected):
+    """Индекс совпадает со списком expected: порядок, поиск по обоим полям, активные"""
+    assert index.to_list() == expected
+    assert len(index) == len(expected)
+    for field in ('id', 'username'):
+        for value in {m[field] for m in expected if field in m}:
+            assert index.find(field, value) == next(m for m in expected if m.get(field) == value)
+    assert [m.to_dict() for m in index.active()] == [m for m in expected if m['active']]
+
+def test_member_remove_updates_both_indexes():
+    index = MemberIndex([member(0, 1, 'ann'), member(1, 2, 'bob'), member(2, None, 'carl')])
+    
+    assert index.remove('id', 1) == 1
+    
+    assert index.find('id', 1) is None
+    assert index.find('username', 'ann') is None
+    assert not index.contains(member(0, 1, 'ann'))
+    check_index(index, [member(1, 2, 'bob'), member(2, None, 'carl')])
+
+def test_member_remove_takes_every_duplicate():
+    # /addmember без id и /register того же человека — две записи
+    index = MemberIndex([member(0, None, 'ann'), member(1, 2, 'bob'), member(2, 1, 'ann')])
+    
+    assert index.remove('username', 'ann') == 2
+    assert index.remove('username', 'ann') == 0
+    
+    assert index.find('id', 1) is None
+    check_index(index, [member(1, 2, 'bob')])
+
+def test_member_copy_leaves_published_index_unchanged():
+    index = MemberIndex([member(0, 1, 'ann'), member(1, 2, 'bob')])
+    active = index.active()
+    
+    changed = index.copy()
+    changed.remove('username', 'bob')
+    changed.add(member(2, 3, 'carl', active=False))
+    
+    check_index(index, [member(0, 1, 'ann'), member(1, 2, 'bob')])
+    assert index.active() is active
+    check_index(changed, [member(0, 1, 'ann'), member(2, 3, 'carl', active=False)])
+
+def test_member_index_random_operations():
+    rng = random.Random(3)
+    expected = []
+    index = MemberIndex()
+    for seq in range(2000):
+        if expected and rng.random() < 0.4:
+            field = rng.choice(('id', 'username'))
+            value = rng.choice([m[field] for m in expected if field in m] or [0])
+            removed = [m for m in expected if m.get(field) == value]
+            expected = [m for m in expected if m.get(field) != value]
+            assert index.remove(field, value) == len(removed)
+        else:
+            new = member(seq, rng.choice((None, rng.randrange(50))), rng.choice((None, f"u{rng.randrange(50)}")),
+                         active=rng.random() < 0.8)
+            expected.append(new)
+            index.add(new)
+        index = index.copy()
+    check_index(index, expected)
+    check_index(MemberIndex(expected), expected)
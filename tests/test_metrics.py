@@ -0,0 +1,61 @@
+import urllib.error
+import urllib.request
+from metrics import Counter, Gauge, Histogram, MetricsServer, Registry, CONTENT_TYPE
+
+def test_text_format():
+    registry = Registry()
+    errors = Counter('errors_total', 'Ошибки', ['code'], registry=registry)
+    errors.inc('429')
+    errors.inc('429', amount=2)
+    errors.inc('say "hi"\n')
+    Gauge('pending', 'В очереди', lambda: 7, registry=registry)
+    Gauge('queue', 'Очередь шарда', lambda: {('0',): 1, ('1',): 0}, ['shard'], registry=registry)
+    seconds = Histogram('seconds', 'Время', ['command'], buckets=(0.1, 1), registry=registry)
+    seconds.observe(0.05, 'clown')
+    seconds.observe(0.5, 'clown')
+    seconds.observe(3, 'clown')
+    
+    assert registry.render().splitlines() == [
+        '# HELP errors_total Ошибки',
+        '# TYPE errors_total counter',
+        'errors_total{code="429"} 3',
+        'errors_total{code="say \\"hi\\"\\n"} 1',
+        '# HELP pending В очереди',
+        '# TYPE pending gauge',
+        'pending 7',
+        '# HELP queue Очередь шарда',
+        '# TYPE queue gauge',
+        'queue{shard="0"} 1',
+        'queue{shard="1"} 0',
+        '# HELP seconds Время',
+        '# TYPE seconds histogram',
+        'seconds_bucket{command="clown",le="0.1"} 1',
+        'seconds_bucket{command="clown",le="1"} 2',
+        'seconds_bucket{command="clown",le="+Inf"} 3',
+        'seconds_sum{command="clown"} 3.55',
+        'seconds_count{command="clown"} 3',
+    ]
+
+def test_broken_gauge_is_skipped():
+    registry = Registry()
+    Gauge('broken', 'Падает', lambda: 1 / 0, registry=registry)
+    
+    assert registry.render().splitlines() == ['# HELP broken Падает', '# TYPE broken gauge']
+
+def test_server_serves_metrics():
+    registry = Registry()
+    Gauge('up', 'Работает', lambda: 1, registry=registry)
+    server = MetricsServer('127.0.0.1', 0, registry=registry)
+    server.start()
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.port}/metrics") as response:
+            assert response.headers['Content-Type'] == CONTENT_TYPE
+            assert response.read().decode('utf-8') == registry.render()
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{server.port}/other")
+            status = 200
+        except urllib.error.HTTPError as e:
+            status = e.code
+        assert status == 404
+    finally:
+        server.stop()
@@ -0,0 +1,80 @@
+import threading
+import time
+from telebot import apihelper
+from outbox import Outbox, PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW
+
+class FakeBot:
+    """Запоминает отправки; для текстов из rate_limited один раз отвечает 429"""
+    
+    def __init__(self, rate_limited=(), retry_after=0.2):
+        self.attempts = []
+        self.rate_limited = set(rate_limited)
+        self.retry_after = retry_after
+        self._lock = threading.Lock()
+    
+    def send_message(self, chat_id, text, **kwargs):
+        with self._lock:
+            self.attempts.append((time.monotonic(), chat_id, text))
+            if text in self.rate_limited:
+                self.rate_limited.discard(text)
+                raise apihelper.ApiTelegramException('sendMessage', None, {
+                    'error_code': 429,
+                    'description': 'Too Many Requests: retry after 1',
+                    'parameters': {'retry_after': self.retry_after},
+                })
+    
+    def texts(self, chat_id):
+        return [text for _, chat, text in self.attempts if chat == chat_id]
+
+def test_higher_priority_goes_first():
+    bot = FakeBot()
+    outbox = Outbox(bot, global_rate=1000, chat_rate=1000, chat_burst=3)
+    outbox.send(1, 'список', priority=PRIORITY_LOW)
+    outbox.send(1, 'ответ', priority=PRIORITY_NORMAL)
+    outbox.send(1, 'клоун дня', priority=PRIORITY_HIGH)
+    outbox.send(1, 'ещё ответ', priority=PRIORITY_NORMAL)
+    
+    outbox.start()
+    outbox.stop(timeout=5)
+    
+    assert bot.texts(1) == ['клоун дня', 'ответ', 'ещё ответ', 'список']
+
+def test_rate_limited_message_is_requeued():
+    bot = FakeBot(rate_limited={'первое'})
+    outbox = Outbox(bot, global_rate=1000, chat_rate=1000, chat_burst=3)
+    outbox.start()
+    outbox.send(1, 'первое')
+    outbox.send(1, 'второе')
+    outbox.send(2, 'другой чат')
+    
+    outbox.stop(timeout=5)
+    
+    # Сообщение вернулось в очередь на своё место, чат ждал retry_after
+    assert bot.texts(1) == ['первое', 'первое', 'второе']
+    first, retry = [at for at, chat, _ in bot.attempts if chat == 1][:2]
+    assert retry - first >= bot.retry_after - 0.01
+    # Пауза касается только этого чата
+    assert bot.texts(2) == ['другой чат']
+    assert [at for at, chat, _ in bot.attempts if chat == 2][0] < retry
+    assert outbox.pending() == 0
+
+def test_rate_limits_in_several_chats_pause_everything():
+    bot = FakeBot(rate_limited={'первый чат', 'второй чат'})
+    outbox = Outbox(bot, global_rate=1000, chat_rate=1000, chat_burst=3, flood_chats=2)
+    outbox.start()
+    outbox.send(1, 'первый чат')
+    outbox.send(2, 'второй чат')
+    deadline = time.monotonic() + 5
+    while len(bot.attempts) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.05)
+    outbox.send(3, 'третий чат')
+    
+    outbox.stop(timeout=5)
+    
+    # Третий чат 429 не получал, но ждёт вместе со всеми
+    first_429 = min(at for at, _, _ in bot.attempts)
+    third = [at for at, chat, _ in bot.attempts if chat == 3][0]
+    assert third - first_429 >= bot.retry_after - 0.06
+    assert bot.texts(1) == ['первый чат', 'первый чат']
+    assert bot.texts(2) == ['второй чат', 'второй чат']
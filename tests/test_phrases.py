@@ -0,0 +1,55 @@
+import json
+import os
+import pytest
+from phrases import PhraseBook, Template
+
+def write(path, data, mtime_ns):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    # Явный mtime: на быстрой файловой системе две записи подряд могут совпасть
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+def test_template_escapes_values_but_keeps_markup():
+    template = Template("<b>{name}</b> (@{username})")
+    
+    assert template.render(name="<script>&", username="a_b") == "<b>&lt;script&gt;&amp;</b> (@a_b)"
+
+def test_template_rejects_unknown_fields():
+    with pytest.raises(ValueError):
+        Template("{name} {password}")
+
+def test_phrase_book_reloads_changed_file(tmp_path):
+    path = str(tmp_path / 'phrases.json')
+    write(path, {'clown': {'pre': ["раз"], 'result': "{name}"}}, 1_000_000_000)
+    book = PhraseBook(path, check_interval=0)
+    book.load()
+    assert book.get('clown').pre == ("раз",)
+    
+    write(path, {'clown': {'pre': ["два"], 'result': "<i>{name}</i>"}, 'default': {}}, 2_000_000_000)
+    
+    assert book.get('clown').pre == ("два",)
+    assert book.get('clown').render_result("A&B", "") == "<i>A&amp;B</i>"
+    assert 'default' in book
+
+def test_phrase_book_keeps_old_phrases_on_broken_file(tmp_path):
+    path = str(tmp_path / 'phrases.json')
+    write(path, {'clown': {'pre': ["раз"]}}, 1_000_000_000)
+    book = PhraseBook(path, check_interval=0)
+    book.load()
+    
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{"clown": ')
+    os.utime(path, ns=(2_000_000_000, 2_000_000_000))
+    assert book.get('clown').pre == ("раз",)
+    
+    write(path, {'clown': {'result': "{nickname}"}}, 3_000_000_000)
+    assert book.get('clown').pre == ("раз",)
+
+def test_unknown_mode_falls_back_to_default(tmp_path):
+    path = str(tmp_path / 'phrases.json')
+    write(path, {'default': {'pre': ["по умолчанию"]}}, 1_000_000_000)
+    book = PhraseBook(path, check_interval=0)
+    book.load()
+    
+    assert book.get('nope').pre == ("по умолчанию",)
+    assert PhraseBook(str(tmp_path / 'missing.json')).get('clown').render_result("x", "y") == "x (y)"
@@ -0,0 +1,52 @@
+import json
+import data_manager
+
+CHAT = '-1001'
+OTHER = '-1002'
+ANN = {'id': 1, 'username': 'ann', 'name': 'Ann', 'active': True}
+BOB = {'id': 2, 'username': 'bob', 'name': 'Bob', 'active': True}
+CARL = {'username': 'carl', 'name': 'Carl', 'active': True, 'added_by': 'ann', 'added_date': '2026-10-01'}
+
+def usernames(chat_id):
+    return [member['username'] for member in data_manager.get_all_members(chat_id)]
+
+def write_legacy_files():
+    """Общие JSON-файлы в формате до разделения по чатам"""
+    files = {
+        data_manager.MEMBERS_FILE: {CHAT: [ANN, BOB], OTHER: [CARL]},
+        data_manager.STATS_FILE: {CHAT: {'ann': {'name': 'Ann', 'username': 'ann', 'count': 3}}},
+        data_manager.LAST_USED_FILE: {CHAT: '2026-10-01'},
+        # Старый формат настроек — только строка режима
+        data_manager.GROUP_SETTINGS_FILE: {CHAT: 'pidor', OTHER: {'mode': 'clown', 'timezone': 'Europe/Moscow'}},
+    }
+    for path, data in files.items():
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+
+def test_json_to_sqlite_round_trip(reopen):
+    write_legacy_files()
+    
+    reopen('sqlite')
+    
+    assert usernames(CHAT) == ['ann', 'bob']
+    assert data_manager.get_all_members(OTHER).to_list() == [CARL]
+    assert data_manager.get_chat_stats(CHAT)['ann'].to_dict() == {'name': 'Ann', 'username': 'ann', 'count': 3}
+    assert data_manager.get_last_used(CHAT) == '2026-10-01'
+    assert data_manager.get_chat_mode(CHAT) == 'pidor'
+    assert data_manager.scheduled_chats() == {OTHER: 'Europe/Moscow'}
+    
+    data_manager.remove_member(CHAT, user_id=2)
+    data_manager.add_member(CHAT, CARL)
+    data_manager.increment_win(CHAT, ANN)
+    data_manager.set_chat_timezone(CHAT, 'Asia/Tokyo')
+    data_manager.persist(force=True)
+    
+    reopen('sqlite')
+    
+    # Изменения сохранены, а общие файлы больше не переносятся поверх них
+    assert usernames(CHAT) == ['ann', 'carl']
+    assert data_manager.get_chat_stats(CHAT)['ann'].count == 4
+    assert data_manager.get_chat_mode(CHAT) == 'pidor'
+    assert data_manager.get_chat_timezone(CHAT) == 'Asia/Tokyo'
+    assert data_manager.get_all_members(OTHER).to_list() == [CARL]
+    assert data_manager.scheduled_chats() == {CHAT: 'Asia/Tokyo', OTHER: 'Europe/Moscow'}
@@ -0,0 +1,78 @@
+import time
+import pytest
+import data_manager
+import handlers
+from benchmark import FakeBot, make_callback, make_message
+from outbox import Outbox
+from timers import TimerQueue
+
+CHAT = '-9'
+
+@pytest.fixture
+def chat(reopen):
+    """40 участников, у u<i> i + 1 побед: три страницы по 15 строк"""
+    reopen('chats')
+    for i in range(40):
+        member = {'id': i, 'username': f'u{i}', 'name': f'N{i}', 'active': True}
+        data_manager.add_member(CHAT, member)
+        for _ in range(i + 1):
+            data_manager.increment_win(CHAT, member)
+        if i < 20:
+            data_manager.record_draw(CHAT, f'2026-05-{i + 1:02d}', member)
+    return CHAT
+
+def test_pages_and_buttons(chat):
+    text, buttons = handlers.stats_reply(chat)
+    assert text.splitlines()[2] == "1. N39 (@u39) - 40 раз(а)"
+    assert text.endswith("Страница 1 из 3")
+    assert buttons == [("Вперёд ▶️", "stats:1")]
+    
+    text, buttons = handlers.stats_callback(chat, 'stats:1')
+    assert text.splitlines()[2] == "16. N24 (@u24) - 25 раз(а)"
+    assert buttons == [("◀️ Назад", "stats:0"), ("Вперёд ▶️", "stats:2")]
+    
+    # Номер за последней страницей — последняя страница
+    text, buttons = handlers.stats_callback(chat, 'stats:99')
+    assert text.endswith("Страница 3 из 3")
+    assert buttons == [("◀️ Назад", "stats:1")]
+
+def test_page_cache_is_reset_by_a_win(chat):
+    page = handlers.stats_callback(chat, 'stats:1')[0]
+    assert handlers.stats_callback(chat, 'stats:1')[0] is page
+    
+    data_manager.increment_win(chat, {'id': 1, 'username': 'u1', 'name': 'N1'})
+    
+    assert handlers.stats_callback(chat, 'stats:1')[0] is not page
+
+def test_period_pages_keep_the_period(chat):
+    text, buttons = handlers.stats_reply(chat, ['месяц', '2026-05'])
+    assert text.startswith("🏆 Статистика 🤡 клоунов за месяц 2026-05:")
+    assert buttons == [("Вперёд ▶️", "stats:1:month:2026-05")]
+    
+    text, buttons = handlers.stats_callback(chat, buttons[0][1])
+    assert text.endswith("Страница 2 из 2")
+    assert buttons == [("◀️ Назад", "stats:0:month:2026-05")]
+    assert handlers.stats_reply(chat, ['month', '2026-06']) == ("За месяц 2026-06 побед пока нет", [])
+
+@pytest.mark.parametrize('data', ['stats:x', 'stats:0:week:zzz', 'stats:0:day:2026', 'other:1', 'stats:1:month'])
+def test_foreign_callback_data_is_ignored(chat, data):
+    assert handlers.stats_callback(chat, data) is None
+
+def test_button_edits_the_message(chat):
+    bot = FakeBot()
+    timers = TimerQueue()
+    timers.start()
+    outbox = Outbox(bot)
+    outbox.start()
+    try:
+        handlers.register_handlers(bot, timers, outbox)
+        bot.handlers['clownstats'](make_message(CHAT, '/clownstats'))
+        bot.handlers['callback_query'](make_callback(CHAT, 'stats:2'))
+        deadline = time.monotonic() + 5
+        while len(bot.sent) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        outbox.stop()
+        timers.stop()
+    
+    assert [text.splitlines()[-1] for _, text in bot.sent] == ["Страница 1 из 3", "Страница 3 из 3"]
@@ -0,0 +1,55 @@
+import asyncio
+import logging
+import pytest
+from telegram import Bot, ReplyParameters
+from fake_api import FakeBotAPI
+from sync_request import SyncRequest
+
+@pytest.fixture
+def api():
+    api = FakeBotAPI()
+    api.start()
+    yield api
+    api.stop()
+
+async def send(api, request):
+    bot = Bot('123:fake', base_url=api.url + '/bot', request=request, get_updates_request=SyncRequest())
+    async with bot:
+        return await bot.send_message(-100, "привет", reply_parameters=ReplyParameters(7))
+
+def test_send_message_with_parameters(api):
+    message = asyncio.run(send(api, SyncRequest()))
+    
+    assert message.chat.id == -100
+    assert message.text == "привет"
+    assert api.counters['sends'] == 1
+
+def test_session_is_reused(api):
+    request = SyncRequest(connection_pool_size=2)
+    
+    async def twice():
+        await request.initialize()
+        session = request._get_session()
+        for _ in range(2):
+            code, _ = await request.do_request(api.url + '/bot123:fake/getMe', 'POST')
+            assert code == 200
+        assert request._get_session() is session
+        await request.shutdown()
+    
+    asyncio.run(twice())
+
+def test_token_is_not_logged(api, caplog):
+    caplog.set_level(logging.DEBUG, logger='sync_request')
+    request = SyncRequest()
+    
+    async def calls():
+        await request.initialize()
+        await request.do_request(api.url + '/bot123:secret/getMe', 'POST')
+        with pytest.raises(Exception):
+            await request.do_request('http://127.0.0.1:1/bot123:secret/getMe', 'POST')
+        await request.shutdown()
+    
+    asyncio.run(calls())
+    
+    assert 'getMe' in caplog.text
+    assert 'secret' not in caplog.text
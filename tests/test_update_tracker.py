@@ -0,0 +1,65 @@
+from types import SimpleNamespace
+import pytest
+import data_manager
+from persistence import PersistenceScheduler
+from update_tracker import UpdateTracker
+
+def updates(*ids):
+    return [SimpleNamespace(update_id=update_id) for update_id in ids]
+
+def ids(batch):
+    return [update.update_id for update in batch]
+
+@pytest.fixture
+def tracker(tmp_path):
+    tracker = UpdateTracker(str(tmp_path / 'update_offset.json'))
+    tracker.load()
+    return tracker
+
+def test_tracker_drops_repeated_updates(tracker):
+    assert ids(tracker.fresh(updates(5, 6, 5))) == [5, 6]
+    assert ids(tracker.fresh(updates(6, 7))) == [7]
+    assert tracker.offset == 8
+
+def test_tracker_forgets_ids_beyond_window(tmp_path):
+    tracker = UpdateTracker(str(tmp_path / 'update_offset.json'), window=2)
+    tracker.fresh(updates(1, 2, 3))
+    
+    assert ids(tracker.fresh(updates(1, 3))) == [1]
+
+def test_tracker_saves_only_processed_prefix(tracker):
+    tracker.fresh(updates(10, 11, 12))
+    tracker.done(11)
+    tracker.done(12)
+    
+    # 10 ещё в очереди шарда: после падения оно должно прийти снова
+    assert tracker.completed() == 9
+    tracker.save()
+    assert data_manager.load_json_file(tracker.path) == {'last_update_id': 9}
+    tracker.done(10)
+    tracker.save()
+    # Отметка, взятая до сброса данных, не откатывает уже сохранённую
+    tracker.save(11)
+    
+    restarted = UpdateTracker(tracker.path)
+    restarted.load()
+    assert data_manager.load_json_file(tracker.path) == {'last_update_id': 12}
+    assert restarted.offset == 13
+
+def test_offset_is_saved_only_after_data(tracker, monkeypatch):
+    scheduler = PersistenceScheduler()
+    scheduler.add_checkpoint(tracker)
+    tracker.fresh(updates(1, 2))
+    tracker.done(1)
+    tracker.done(2)
+    
+    def broken(force=False):
+        raise OSError("диск заполнен")
+    
+    monkeypatch.setattr(data_manager, 'persist', broken)
+    scheduler.flush()
+    assert data_manager.load_json_file(tracker.path) == {}
+    
+    monkeypatch.setattr(data_manager, 'persist', lambda force=False: [])
+    scheduler.flush()
+    assert data_manager.load_json_file(tracker.path) == {'last_update_id': 2}
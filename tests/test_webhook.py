@@ -0,0 +1,64 @@
+import json
+import urllib.error
+import urllib.request
+import pytest
+from update_tracker import UpdateTracker
+from webhook import WebhookServer, SECRET_HEADER
+
+@pytest.fixture
+def tracker(tmp_path):
+    tracker = UpdateTracker(str(tmp_path / 'update_offset.json'))
+    tracker.load()
+    return tracker
+
+UPDATE = {
+    'update_id': 100,
+    'message': {
+        'message_id': 5,
+        'date': 0,
+        'chat': {'id': -100, 'type': 'group'},
+        'from': {'id': 7, 'is_bot': False, 'first_name': 'Ann', 'username': 'ann'},
+        'text': '/register',
+    },
+}
+
+@pytest.fixture
+def webhook(tracker):
+    received = []
+    server = WebhookServer(None, '127.0.0.1', 0, '/telegram', 's3cret', tracker=tracker, dispatch=received.extend)
+    server.start()
+    server.received = received
+    yield server
+    server.stop()
+
+def post(server, path='/telegram', secret='s3cret', body=UPDATE):
+    headers = {'Content-Type': 'application/json'}
+    if secret is not None:
+        headers[SECRET_HEADER] = secret
+    request = urllib.request.Request(f"http://127.0.0.1:{server.port}{path}", data=json.dumps(body).encode(), headers=headers)
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+def test_webhook_rejects_wrong_secret(webhook):
+    assert post(webhook, secret='wrong') == 403
+    assert post(webhook, secret=None) == 403
+    assert webhook.received == []
+
+def test_webhook_unknown_path(webhook):
+    assert post(webhook, path='/other') == 404
+    assert webhook.received == []
+
+def test_webhook_accepts_update_once(webhook):
+    assert post(webhook) == 200
+    # Повторная доставка того же обновления отвечает 200, но не обрабатывается
+    assert post(webhook) == 200
+    
+    assert [update.update_id for update in webhook.received] == [100]
+    assert webhook.received[0].message.text == '/register'
+
+def test_webhook_requires_secret():
+    with pytest.raises(ValueError):
+        WebhookServer(None, '127.0.0.1', 0, '/telegram', '')
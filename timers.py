@@ -0,0 +1,77 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+class TimerQueue:
+    """Отложенный запуск задач (например, отправка результата /clown)
+    
+    Один поток ждёт ближайший срок в куче и передаёт созревшие задачи
+    в небольшой пул, так что обработчики не держат поток в time.sleep().
+    """
+    
+    def __init__(self, workers=4):
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='timer')
+    
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name='timers', daemon=True)
+        self._thread.start()
+    
+    def call_later(self, delay, func, *args, **kwargs):
+        """Запускает func(*args, **kwargs) через delay секунд"""
+        when = time.monotonic() + delay
+        with self._cond:
+            heapq.heappush(self._heap, (when, next(self._seq), func, args, kwargs))
+            self._cond.notify()
+    
+    def pending(self):
+        with self._cond:
+            return len(self._heap)
+    
+    def stop(self, run_pending=True):
+        """Остановка; оставшиеся задачи по умолчанию выполняются сразу"""
+        with self._cond:
+            self._running = False
+            leftover = [heapq.heappop(self._heap) for _ in range(len(self._heap))]
+            self._cond.notify()
+        if self._thread:
+            self._thread.join()
+        if run_pending:
+            for _, _, func, args, kwargs in leftover:
+                self._call(func, args, kwargs)
+        elif leftover:
+            logger.warning("Отменено отложенных задач: %d", len(leftover))
+        self._pool.shutdown(wait=True)
+    
+    def _run(self):
+        with self._cond:
+            while self._running:
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                delay = self._heap[0][0] - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                _, _, func, args, kwargs = heapq.heappop(self._heap)
+                self._pool.submit(self._call, func, args, kwargs)
+    
+    @staticmethod
+    def _call(func, args, kwargs):
+        try:
+            func(*args, **kwargs)
+        except Exception as e:
+            logger.error("❌ Ошибка отложенной задачи %s: %s", getattr(func, '__name__', func), e)
@@ -0,0 +1,83 @@
+import logging
+import threading
+from collections import deque
+import data_manager
+
+logger = logging.getLogger(__name__)
+
+OFFSET_FILE = data_manager.get_path("update_offset.json")
+
+class UpdateTracker:
+    """Смещение getUpdates на диске и отсев повторно доставленных обновлений
+    
+    На диск пишется только update_id, до которого включительно все
+    обновления уже обработаны (шард сообщил done()), и только после
+    сброса данных на диск (см. PersistenceScheduler.add_checkpoint),
+    поэтому после падения обновления из очередей шардов и не
+    сохранённые изменения придут от Telegram заново. Окно из window
+    последних id нужно только для отсева повторов — после рестарта
+    или повторной доставки webhook.
+    """
+    
+    def __init__(self, path=OFFSET_FILE, window=10000):
+        self.path = path
+        self.last_update_id = None  # последний полученный, для offset
+        self._seen = set()
+        self._order = deque()
+        self._window = window
+        self._pending = set()  # получены, но ещё не обработаны
+        self._saved_id = None
+        self._lock = threading.Lock()
+    
+    @property
+    def offset(self):
+        """offset для следующего getUpdates"""
+        return None if self.last_update_id is None else self.last_update_id + 1
+    
+    def load(self):
+        data = data_manager.load_json_file(self.path)
+        self.last_update_id = data.get('last_update_id')
+        self._saved_id = self.last_update_id
+        if self.last_update_id is not None:
+            logger.info("Продолжаем с update_id %s", self.last_update_id + 1)
+    
+    def completed(self):
+        """Наибольший update_id, до которого включительно всё обработано"""
+        with self._lock:
+            if self._pending:
+                return min(self._pending) - 1
+            return self.last_update_id
+    
+    def save(self, last_id=None):
+        """Пишет на диск last_id (по умолчанию completed()); вызывать после сброса данных"""
+        if last_id is None:
+            last_id = self.completed()
+        with self._lock:
+            if last_id is None or (self._saved_id is not None and last_id <= self._saved_id):
+                return
+            self._saved_id = last_id
+        data_manager.save_json_file(self.path, {'last_update_id': last_id})
+    
+    def fresh(self, updates):
+        """Оставляет только ещё не полученные обновления и запоминает их"""
+        result = []
+        with self._lock:
+            for update in updates:
+                update_id = update.update_id
+                if update_id in self._seen:
+                    logger.info("Повтор обновления %s, пропуск", update_id)
+                    continue
+                self._seen.add(update_id)
+                self._order.append(update_id)
+                if len(self._order) > self._window:
+                    self._seen.discard(self._order.popleft())
+                if self.last_update_id is None or update_id > self.last_update_id:
+                    self.last_update_id = update_id
+                self._pending.add(update_id)
+                result.append(update)
+        return result
+    
+    def done(self, update_id):
+        """Обновление обработано (или обработка упала) — вызывает шард"""
+        with self._lock:
+            self._pending.discard(update_id)
@@ -0,0 +1,93 @@
+import hmac
+import logging
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from telebot import types
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+MAX_BODY = 1024 * 1024
+
+class WebhookServer:
+    """Встроенный HTTP-сервер для приёма обновлений от Telegram
+    
+    Принимает POST на path, сверяет заголовок секрета (обязателен) и передаёт
+    обновление в dispatch (по умолчанию bot.process_new_updates()) —
+    те же обработчики, что и при polling. TLS обычно завершается на
+    reverse proxy перед ботом.
+    """
+    
+    def __init__(self, bot, host, port, path, secret, tracker=None, dispatch=None):
+        if not secret:
+            raise ValueError("Webhook без секрета принимал бы обновления от кого угодно")
+        self.bot = bot
+        self.tracker = tracker
+        self.dispatch = dispatch or bot.process_new_updates
+        self.path = path
+        self.secret = secret
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+    
+    @property
+    def port(self):
+        return self._server.server_address[1]
+    
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='webhook', daemon=True)
+        self._thread.start()
+        logger.info("🌐 Webhook слушает %s:%s%s", self._server.server_address[0], self.port, self.path)
+    
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join()
+    
+    def handle_update(self, body):
+        updates = [types.Update.de_json(body.decode('utf-8'))]
+        if self.tracker is not None:
+            # Telegram повторяет доставку, если не получил 200 вовремя
+            updates = self.tracker.fresh(updates)
+        if updates:
+            self.dispatch(updates)
+    
+    def _make_handler(self):
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if self.path != server.path:
+                    self._respond(404)
+                    return
+                token = self.headers.get(SECRET_HEADER, '')
+                if not hmac.compare_digest(token.encode('utf-8'), server.secret.encode('utf-8')):
+                    logger.warning("Webhook: неверный секрет от %s", self.client_address[0])
+                    self._respond(403)
+                    return
+                length = int(self.headers.get('Content-Length') or 0)
+                if length <= 0 or length > MAX_BODY:
+                    self._respond(400)
+                    return
+                body = self.rfile.read(length)
+                try:
+                    server.handle_update(body)
+                except Exception as e:
+                    logger.error("Webhook: ошибка обработки обновления: %s", e)
+                    self._respond(400)
+                    return
+                self._respond(200)
+            
+            def do_GET(self):
+                self._respond(405)
+            
+            def _respond(self, code):
+                self.send_response(code)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+            
+            def log_message(self, format, *args):
+                logger.debug("Webhook: " + format % args)
+        
+        return Handler